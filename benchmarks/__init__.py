@@ -0,0 +1,3 @@
+"""
+Benchmark delle parti più costose del pipeline
+"""
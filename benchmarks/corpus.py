@@ -0,0 +1,83 @@
+"""
+Corpus di storie per i benchmark: storie sintetiche con testo noto
+oppure una directory di immagini reali con la trascrizione accanto
+"""
+import os
+import glob
+import difflib
+from typing import List, Tuple
+
+from utils.image_processing import create_long_image
+
+# Menu di esempio, nello stile delle storie della mensa
+SAMPLE_MENUS = [
+    "MENU PRANZO\nPRIMI\nPASTA AL POMODORO\nRISOTTO AI FUNGHI\nSECONDI\nPOLLO ARROSTO\nFRITTATA DI ZUCCHINE",
+    "MENU CENA\nPRIMI\nMINESTRONE DI VERDURE\nPENNE ALL'ARRABBIATA\nSECONDI\nMERLUZZO GRATINATO\nHAMBURGER DI CECI",
+    "CONTORNI\nPATATE AL FORNO\nINSALATA MISTA\nSPINACI SALTATI\nDESSERT\nTORTA DI MELE\nFRUTTA FRESCA",
+    "PIZZA\nMARGHERITA\nDIAVOLA\nQUATTRO FORMAGGI\nORARIO 11:30 - 14:30",
+]
+
+# Colori di sfondo/testo delle storie sintetiche (testo chiaro su colore e viceversa)
+SAMPLE_STYLES = [
+    ((255, 140, 0), (255, 255, 255)),
+    ((255, 255, 255), (30, 30, 30)),
+    ((20, 60, 120), (255, 230, 0)),
+]
+
+
+def synthetic_corpus(directory: str) -> List[Tuple[str, str]]:
+    """
+    Genera storie sintetiche 1080x1920 con testo noto.
+
+    Args:
+        directory: Directory in cui salvare le immagini
+
+    Returns:
+        Lista di coppie (percorso immagine, testo atteso)
+    """
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for i, text in enumerate(SAMPLE_MENUS):
+        for j, (bg_color, text_color) in enumerate(SAMPLE_STYLES):
+            path = os.path.join(directory, f"story_{i}_{j}.jpg")
+            if not os.path.exists(path):
+                create_long_image(text, path, bg_color=bg_color, text_color=text_color, add_logo=False)
+            corpus.append((path, text))
+    return corpus
+
+
+def load_corpus(directory: str) -> List[Tuple[str, str]]:
+    """
+    Carica un corpus di immagini reali: ogni `nome.jpg` ha accanto `nome.txt` con il testo atteso.
+
+    Args:
+        directory: Directory del corpus
+
+    Returns:
+        Lista di coppie (percorso immagine, testo atteso)
+    """
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jpg"))):
+        truth = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(truth):
+            with open(truth, "r", encoding="utf-8") as f:
+                corpus.append((path, f.read()))
+    return corpus
+
+
+def char_accuracy(expected: str, actual: str) -> float:
+    """
+    Accuratezza a livello di carattere tra testo atteso e testo estratto
+    (maiuscole e spazi non contano).
+
+    Args:
+        expected: Testo atteso
+        actual: Testo estratto
+
+    Returns:
+        Valore tra 0 e 1
+    """
+    def normalize(text: str) -> str:
+        return " ".join(text.upper().split())
+
+    return difflib.SequenceMatcher(None, normalize(expected), normalize(actual)).ratio()
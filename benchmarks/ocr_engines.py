@@ -0,0 +1,74 @@
+"""
+Benchmark dei motori OCR: latenza per immagine di pytesseract e tesserocr.
+
+Uso:
+    python -m benchmarks.ocr_engines [--corpus DIR] [--preset gray] [--rounds 3]
+
+La prima chiamata di ogni motore è riportata a parte: per tesserocr include il caricamento del modello.
+"""
+import argparse
+import statistics
+import time
+import cv2
+
+from core.ocr import preprocess, crop_text_regions, get_preset
+from core.ocr_engines import ENGINES, TESSEROCR_SUPPORT, close_engines, get_engine
+from benchmarks.corpus import synthetic_corpus, load_corpus, char_accuracy
+
+
+def run(engine_name, crops, rounds):
+    """
+    Esegue l'OCR di tutte le immagini `rounds` volte con lo stesso motore.
+
+    Returns:
+        (ms prima chiamata, ms mediani per immagine, accuratezza media)
+    """
+    close_engines()
+    start = time.perf_counter()
+    engine = get_engine(engine_name)
+    engine.image_to_string(crops[0][0][0])
+    first = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    accuracy = 0.0
+    for _ in range(rounds):
+        for regions, expected in crops:
+            start = time.perf_counter()
+            text = "\n".join(engine.image_to_string(region) for region in regions)
+            latencies.append((time.perf_counter() - start) * 1000)
+            accuracy += char_accuracy(expected, text)
+
+    close_engines()
+    return first, statistics.median(latencies), accuracy / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dei motori OCR")
+    parser.add_argument("--corpus", help="Directory con immagini .jpg e trascrizioni .txt")
+    parser.add_argument("--preset", default="gray", help="Preset di preprocessing")
+    parser.add_argument("--rounds", type=int, default=3, help="Ripetizioni del corpus per motore")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus("download/benchmark")
+    if not corpus:
+        parser.error("Corpus vuoto")
+
+    # Preprocessing una volta sola: si misura solo il motore
+    crops = []
+    for path, expected in corpus:
+        prepared = preprocess(cv2.imread(path), args.preset)
+        regions = crop_text_regions(prepared) if get_preset(args.preset).get("crop") else [prepared]
+        crops.append((regions, expected))
+
+    engines = [name for name in ENGINES if name != "tesserocr" or TESSEROCR_SUPPORT]
+    print(f"Corpus: {len(corpus)} immagini, preset {args.preset}, {args.rounds} ripetizioni")
+    print(f"{'motore':<13}{'1a chiamata ms':>16}{'ms/immagine':>13}{'accuratezza':>13}")
+    for name in engines:
+        first, median, accuracy = run(name, crops, args.rounds)
+        print(f"{name:<13}{first:>16.1f}{median:>13.1f}{accuracy:>12.1%}")
+    if not TESSEROCR_SUPPORT:
+        print("tesserocr non installato: pip install tesserocr")
+
+
+if __name__ == "__main__":
+    main()
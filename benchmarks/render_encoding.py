@@ -0,0 +1,62 @@
+"""
+Benchmark delle codifiche delle immagini create: byte per immagine, tempo di codifica
+e differenza media dai pixel originali (indicatore della leggibilità del testo).
+
+Uso:
+    python -m benchmarks.render_encoding [--budget 153600] [--rounds 3]
+
+I byte sono quelli caricati su Telegram per ogni iscritto che non ha ancora il file_id dell'immagine.
+"""
+import argparse
+import io
+import statistics
+import time
+import numpy as np
+from PIL import Image
+
+from config import RENDER_ENCODINGS, RENDER_BYTE_BUDGET
+from utils.image_processing import encode_image, render_text_image
+from benchmarks.corpus import SAMPLE_MENUS, SAMPLE_STYLES
+
+
+def run(encoding, images, budget, rounds):
+    """
+    Codifica tutte le immagini `rounds` volte con la stessa codifica.
+
+    Returns:
+        (KB medi per immagine, ms mediani di codifica, errore medio per pixel)
+    """
+    sizes, latencies, errors = [], [], []
+    for _ in range(rounds):
+        for image, pixels in images:
+            start = time.perf_counter()
+            data = encode_image(image, encoding, budget)
+            latencies.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(data) / 1024)
+    for image, pixels in images:
+        decoded = np.asarray(Image.open(io.BytesIO(encode_image(image, encoding, budget))).convert("RGB"))
+        errors.append(np.abs(decoded.astype(np.int16) - pixels).mean())
+    return statistics.mean(sizes), statistics.median(latencies), statistics.mean(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark delle codifiche delle immagini create")
+    parser.add_argument("--budget", type=int, default=RENDER_BYTE_BUDGET, help="Byte massimi in modalità adaptive")
+    parser.add_argument("--rounds", type=int, default=3, help="Ripetizioni del corpus per codifica")
+    args = parser.parse_args()
+
+    images = []
+    for text in SAMPLE_MENUS:
+        for bg_color, text_color in SAMPLE_STYLES:
+            image = render_text_image(text, bg_color=bg_color, text_color=text_color)
+            images.append((image, np.asarray(image).astype(np.int16)))
+
+    print(f"Corpus: {len(images)} immagini, budget adaptive {args.budget // 1024} KB, {args.rounds} ripetizioni")
+    print(f"{'codifica':<16}{'KB/immagine':>13}{'ms/immagine':>13}{'errore medio':>14}")
+    for encoding in [*RENDER_ENCODINGS, "adaptive"]:
+        size, latency, error = run(encoding, images, args.budget, args.rounds)
+        print(f"{encoding:<16}{size:>13.1f}{latency:>13.1f}{error:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
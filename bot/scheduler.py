@@ -4,8 +4,8 @@ Scheduler per esecuzione periodica di task
 import schedule
 import time
 from threading import Thread
-from typing import Callable
-from config import SCHEDULE_TIMES
+from typing import Callable, Optional
+from config import SCHEDULE_TIMES, PREPARE_LEAD_MINUTES
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -31,20 +31,53 @@ class BotScheduler:
         schedule.every().day.at(time_str).do(task)
         logger.info(f"⏰ Task schedulato per le {time_str}")
     
-    def add_default_schedules(self, task: Callable) -> None:
+    def add_interval_task(self, task: Callable, seconds: int, jitter: float = 0.0) -> None:
+        """
+        Aggiunge un task da eseguire periodicamente, con intervallo casuale attorno a `seconds`.
+        
+        Args:
+            task: Funzione da eseguire
+            seconds: Intervallo medio tra due esecuzioni
+            jitter: Variazione relativa dell'intervallo (es. 0.2 = ±20%)
+        """
+        low = max(1, round(seconds * (1 - jitter)))
+        high = max(low, round(seconds * (1 + jitter)))
+        schedule.every(low).to(high).seconds.do(task)
+        logger.info(f"🔁 Task periodico ogni {low}-{high} secondi")
+    
+    def add_default_schedules(self, task: Callable, prepare_task: Optional[Callable] = None) -> None:
         """
         Aggiunge gli orari di default dalla configurazione.
         
         Args:
             task: Funzione da eseguire agli orari configurati
+            prepare_task: Funzione da eseguire PREPARE_LEAD_MINUTES minuti prima di ogni orario
         """
         for schedule_time in SCHEDULE_TIMES:
+            if prepare_task is not None:
+                hour, minute = self.lead_time(schedule_time["hour"], schedule_time["minute"], PREPARE_LEAD_MINUTES)
+                self.add_daily_task(prepare_task, hour, minute)
             self.add_daily_task(
                 task,
                 schedule_time["hour"],
                 schedule_time["minute"]
             )
     
+    @staticmethod
+    def lead_time(hour: int, minute: int, lead_minutes: int) -> tuple:
+        """
+        Calcola l'orario che precede di `lead_minutes` minuti quello dato, anche a cavallo della mezzanotte.
+        
+        Args:
+            hour: Ora di riferimento (0-23)
+            minute: Minuto di riferimento (0-59)
+            lead_minutes: Minuti di anticipo
+        
+        Returns:
+            Tupla (ora, minuto)
+        """
+        return divmod((hour * 60 + minute - lead_minutes) % (24 * 60), 60)
+    
     def _run(self) -> None:
         """Loop interno dello scheduler"""
         logger.info("▶️ Scheduler avviato")
@@ -14,15 +14,67 @@ __all__ = [
     'SUBSCRIBERS_FILE',
     'DOWNLOAD_DIR',
     'CREATED_IMAGES_DIR',
+    'STORY_LEDGER_FILE',
+    'STORY_POLL_INTERVAL',
+    'OCR_PREPROCESS',
+    'OCR_ENGINE',
+    'RENDER_ENCODING',
+    'RENDER_LAYOUT',
+    'OCR_CACHE_FILE',
+    'TRANSLATION_CACHE_FILE',
+    'TELEGRAM_FILE_ID_CACHE_FILE',
+    'RENDER_CACHE_DIR',
     'MAX_RETRIES',
     'IMAGE_WIDTH',
     'IMAGE_HEIGHT',
     'MIN_FONT_SIZE',
     'MAX_FONT_SIZE',
     'IMAGE_MARGIN',
+    'DIVIDER_WIDTH',
     'BG_COLOR',
     'TEXT_COLOR',
+    'RENDER_CACHE_MAX_ENTRIES',
+    'RENDER_CACHE_MAX_BYTES',
+    'RENDER_WORKERS',
+    'RENDER_ENCODINGS',
+    'RENDER_ADAPTIVE_ENCODINGS',
+    'RENDER_BYTE_BUDGET',
+    'RENDER_MIN_QUALITY',
     'TELEGRAM_BATCH_SIZE',
+    'FILE_ID_CACHE_MAX_ENTRIES',
+    'FILE_ID_CACHE_MAX_AGE',
+    'TELEGRAM_GLOBAL_RATE',
+    'TELEGRAM_GROUP_RATE',
+    'TELEGRAM_PRIVATE_RATE',
+    'FANOUT_CONCURRENCY',
     'RETRY_DELAY',
     'SCHEDULE_TIMES',
+    'PREPARE_LEAD_MINUTES',
+    'STORY_POLL_JITTER',
+    'DOWNLOAD_CONCURRENCY',
+    'DOWNLOAD_TIMEOUT',
+    'STORY_TTL',
+    'PERSIST_DOWNLOADS',
+    'DEDUP_HASH_SIZE',
+    'DEDUP_MAX_DISTANCE',
+    'OCR_WORKERS',
+    'OCR_THREADS_PER_WORKER',
+    'OCR_CACHE_MAX_ENTRIES',
+    'OCR_CACHE_MAX_AGE',
+    'OCR_PRESETS',
+    'OCR_MAX_REGIONS',
+    'OCR_REGION_PADDING',
+    'OCR_MAX_REGION_COVERAGE',
+    'MENU_GATE',
+    'MENU_GATE_WIDTH',
+    'MENU_GATE_THRESHOLDS',
+    'TRANSLATION_CACHE_SIZE',
+    'TRANSLATION_CACHE_MAX_ENTRIES',
+    'TRANSLATION_CACHE_MAX_AGE',
+    'TRANSLATION_CHUNK_CHARS',
+    'TRANSLATION_BATCH_LINGER',
+    'PIPELINE_QUEUE_SIZE',
+    'PIPELINE_CONCURRENCY',
+    'PIPELINE_DELIVER_BATCH',
+    'PIPELINE_TRANSLATE_BATCH',
 ]
\ No newline at end of file
@@ -8,13 +8,37 @@ IMAGE_HEIGHT = 1920
 MIN_FONT_SIZE = 40
 MAX_FONT_SIZE = 80
 IMAGE_MARGIN = 60  # Margine dai bordi
+DIVIDER_WIDTH = 4  # pixel della linea tra originale e traduzione nelle immagini combinate
 
 # Colori (RGB)
 BG_COLOR = (255, 140, 0)  # Arancione
 TEXT_COLOR = (255, 255, 255)  # Bianco
 
+# Cache delle immagini create (stesso testo e stessi parametri = stessa immagine)
+RENDER_CACHE_MAX_ENTRIES = 200
+RENDER_CACHE_MAX_BYTES = 100 * 1024 * 1024  # 100 MB
+RENDER_WORKERS = None  # Thread per il rendering in parallelo (None = numero di core)
+# Codifica delle immagini create (scelta con RENDER_ENCODING). Le storie sono sfondi piatti con testo:
+# una palette di pochi colori non perde nulla e pesa ~6 volte meno del JPEG a qualità 95
+# (benchmarks.render_encoding: 22 KB contro 146 KB)
+RENDER_ENCODINGS = {
+    "jpeg": {"format": "JPEG", "quality": 95},
+    "jpeg-optimized": {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True},
+    "png": {"format": "PNG", "colors": 16},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},  # Più lenta da codificare
+}
+RENDER_ADAPTIVE_ENCODINGS = ("png", "jpeg-optimized")  # Candidate della modalità "adaptive"
+RENDER_BYTE_BUDGET = 150 * 1024  # byte massimi per immagine in modalità "adaptive"
+RENDER_MIN_QUALITY = 60  # Qualità JPEG minima per restare nel budget mantenendo il testo leggibile
+
 # Telegram
 TELEGRAM_BATCH_SIZE = 10  # Limite Telegram per media group
+FILE_ID_CACHE_MAX_ENTRIES = 1000  # file_id di immagini già caricate da ricordare
+FILE_ID_CACHE_MAX_AGE = 30 * 24 * 3600  # secondi (30 giorni)
+TELEGRAM_GLOBAL_RATE = 30  # messaggi/s per l'intero bot
+TELEGRAM_GROUP_RATE = 20 / 60  # messaggi/s per singolo gruppo (20 al minuto)
+TELEGRAM_PRIVATE_RATE = 1  # messaggi/s per singola chat privata
+FANOUT_CONCURRENCY = 8  # Chat servite in parallelo
 
 # Timing
 RETRY_DELAY = 2  # secondi
@@ -23,4 +47,61 @@ RETRY_DELAY = 2  # secondi
 SCHEDULE_TIMES = [
     {"hour": 11, "minute": 25},  # Pranzo
     {"hour": 20, "minute": 0}     # Cena
-]
\ No newline at end of file
+]
+PREPARE_LEAD_MINUTES = 10  # Minuti di anticipo della preparazione rispetto all'invio
+STORY_POLL_JITTER = 0.2  # Variazione casuale dell'intervallo di polling (±20%)
+
+# Download storie
+DOWNLOAD_CONCURRENCY = 6  # Download simultanei massimi
+DOWNLOAD_TIMEOUT = 30  # secondi per singola storia
+STORY_TTL = 24 * 3600  # secondi di vita di una storia Instagram
+PERSIST_DOWNLOADS = True  # Salva le miniature su disco (in background) per riusarle tra esecuzioni
+# Storie quasi identiche (ripubblicate con sticker o ricompresse) elaborate e inviate una sola volta.
+# 16x16 = 256 bit: con 8x8 menu diversi sullo stesso modello grafico risultano quasi identici
+DEDUP_HASH_SIZE = 16
+# Bit diversi massimi tra due storie candidate duplicate. Cambiare un piatto sullo stesso modello
+# sposta l'impronta di ~5 bit: oltre all'impronta serve l'immagine identica o lo stesso testo OCR
+DEDUP_MAX_DISTANCE = 12
+
+# OCR
+OCR_WORKERS = None  # Processi OCR (None = numero di core)
+OCR_THREADS_PER_WORKER = 1  # Thread tesseract per processo, evita oversubscription
+OCR_CACHE_MAX_ENTRIES = 500  # Voci massime nella cache OCR
+OCR_CACHE_MAX_AGE = 7 * 24 * 3600  # secondi (7 giorni)
+# Preprocessing prima di tesseract (preset scelto con OCR_PREPROCESS)
+OCR_PRESETS = {
+    "none": {},  # Immagine originale a colori
+    "gray": {"grayscale": True, "max_height": 1280, "crop": True},
+    "binary": {"grayscale": True, "max_height": 1280, "threshold": True, "crop": True},
+    "clean": {"grayscale": True, "max_height": 1280, "threshold": True, "denoise": True, "crop": True},
+}
+OCR_MAX_REGIONS = 4  # Oltre questo numero di blocchi di testo si usa un unico ritaglio che li contiene tutti
+OCR_REGION_PADDING = 12  # pixel di margine attorno a ogni blocco di testo
+OCR_MAX_REGION_COVERAGE = 0.8  # Se i blocchi coprono più di questa frazione si usa l'intera immagine
+# Filtro pre-OCR: le storie che non sembrano menu non passano da tesseract.
+# Disattivato finché le soglie non sono verificate su un campione di storie reali
+MENU_GATE = False
+MENU_GATE_WIDTH = 270  # pixel di larghezza dell'immagine ridotta su cui si calcolano le feature
+MENU_GATE_THRESHOLDS = {
+    "min_edge_density": 0.002,  # Sotto questa frazione di pixel di bordo il frame è vuoto o sfocato
+    "min_text_lines": 2,  # Righe di testo minime per considerarla un menu
+}
+
+# Traduzioni
+TRANSLATION_CACHE_SIZE = 256  # Traduzioni tenute in memoria (LRU)
+TRANSLATION_CACHE_MAX_ENTRIES = 2000  # Voci massime nella cache su disco
+TRANSLATION_CACHE_MAX_AGE = 30 * 24 * 3600  # secondi (30 giorni)
+TRANSLATION_CHUNK_CHARS = 4500  # Caratteri massimi per richiesta (limite Google: 5000)
+TRANSLATION_BATCH_LINGER = 0.2  # secondi di attesa per raccogliere più storie da tradurre insieme
+
+# Pipeline (fetch → ocr → translate → render → deliver)
+PIPELINE_QUEUE_SIZE = 8  # Elementi massimi in coda tra due stadi
+PIPELINE_CONCURRENCY = {
+    "fetch": DOWNLOAD_CONCURRENCY,
+    "ocr": None,  # None = numero di processi del pool OCR
+    "translate": 1,  # Un batch alla volta: le righe ripetute si traducono una volta sola
+    "render": 2,
+    "deliver": 1,  # Un solo invio alla volta: le gallerie arrivano in ordine
+}
+PIPELINE_DELIVER_BATCH = 5  # Storie pronte raggruppate nella stessa galleria
+PIPELINE_TRANSLATE_BATCH = 20  # Storie tradotte con la stessa richiesta
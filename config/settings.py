@@ -22,6 +22,26 @@ SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'data/subscribers.json')
 
 DOWNLOAD_DIR = "download/stories"
 CREATED_IMAGES_DIR = "download/created_images"
+STORY_LEDGER_FILE = os.getenv('STORY_LEDGER_FILE', 'data/story_ledger.json')
+
+# Polling storie (secondi tra un controllo e l'altro, 0 = disattivato)
+STORY_POLL_INTERVAL = int(os.getenv('STORY_POLL_INTERVAL', '0'))
+
+# OCR (preset di preprocessing, vedi OCR_PRESETS; motore: pytesseract o tesserocr)
+OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', 'gray')
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'pytesseract')
+
+# Codifica delle immagini create (vedi RENDER_ENCODINGS, oppure adaptive)
+RENDER_ENCODING = os.getenv('RENDER_ENCODING', 'jpeg')
+# Impaginazione: separate (due immagini per storia), stacked (originale sopra, traduzione sotto)
+# o split (affiancate in un'unica immagine)
+RENDER_LAYOUT = os.getenv('RENDER_LAYOUT', 'separate')
+
+# Cache
+OCR_CACHE_FILE = os.getenv('OCR_CACHE_FILE', 'data/ocr_cache.sqlite3')
+TRANSLATION_CACHE_FILE = os.getenv('TRANSLATION_CACHE_FILE', 'data/translation_cache.sqlite3')
+TELEGRAM_FILE_ID_CACHE_FILE = os.getenv('TELEGRAM_FILE_ID_CACHE_FILE', 'data/telegram_file_ids.sqlite3')
+RENDER_CACHE_DIR = os.getenv('RENDER_CACHE_DIR', 'data/render_cache')
 
 # Retry
 MAX_RETRIES = 3
\ No newline at end of file
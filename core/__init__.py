@@ -1,6 +1,15 @@
 """
 Core business logic package
 """
-from .story_processor import download_and_send_stories
+from .story_processor import download_and_send_stories, prepare_stories, poll_stories, deliver_stories
+from .ocr import OCRExecutor, get_ocr_executor, shutdown_ocr_executor
 
-__all__ = ['download_and_send_stories']
\ No newline at end of file
+__all__ = [
+    'download_and_send_stories',
+    'prepare_stories',
+    'poll_stories',
+    'deliver_stories',
+    'OCRExecutor',
+    'get_ocr_executor',
+    'shutdown_ocr_executor',
+]
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Invio concorrente delle gallerie a tutte le chat iscritte
+"""
+import time
+import asyncio
+from typing import Dict, List, Union
+
+from config import FANOUT_CONCURRENCY
+from services import TelegramService
+from services.telegram_service import ImageSource
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def _send_to_chat(
+    telegram: TelegramService,
+    semaphore: asyncio.Semaphore,
+    chat_id: Union[int, str],
+    images: List[ImageSource]
+) -> bool:
+    """
+    Invia la galleria a una singola chat in un thread, senza bloccare l'event loop.
+
+    Args:
+        telegram: Servizio Telegram condiviso
+        semaphore: Semaforo che limita le chat servite in parallelo
+        chat_id: Chat destinataria
+        images: Immagini da inviare
+
+    Returns:
+        True se l'invio è riuscito
+    """
+    async with semaphore:
+        try:
+            logger.info(f"🚀 Invio galleria a chat_id={chat_id}")
+            success = await asyncio.to_thread(telegram.send_media_group, str(chat_id), images)
+        except Exception as e:
+            logger.error(f"❌ Errore invio a {chat_id}: {e}")
+            return False
+
+    if success:
+        logger.info(f"✅ Invio completato a {chat_id}")
+    else:
+        logger.error(f"❌ Invio fallito a {chat_id}")
+    return success
+
+
+async def fan_out(
+    telegram: TelegramService,
+    chat_ids: List[Union[int, str]],
+    images: List[ImageSource],
+    concurrency: int = FANOUT_CONCURRENCY
+) -> Dict[str, float]:
+    """
+    Invia le immagini a tutte le chat in parallelo, nel rispetto dei limiti Telegram
+    applicati dal rate limiter del servizio.
+
+    La prima chat viene servita da sola: il suo invio carica le immagini e ne ricava
+    i file_id, che le chat successive riusano senza ricaricare i file.
+
+    Args:
+        telegram: Servizio Telegram (con rate limiter per invii concorrenti)
+        chat_ids: Chat destinatarie
+        images: Immagini da inviare
+
+    Returns:
+        Dict con:
+        - sent (int): Chat servite con successo
+        - failed (int): Chat non raggiunte
+        - elapsed (float): Durata totale del fan-out in secondi
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    results: List[bool] = []
+    if chat_ids:
+        results.append(await _send_to_chat(telegram, semaphore, chat_ids[0], images))
+        results.extend(await asyncio.gather(
+            *(_send_to_chat(telegram, semaphore, chat_id, images) for chat_id in chat_ids[1:])
+        ))
+
+    stats = {
+        "sent": sum(1 for ok in results if ok),
+        "failed": sum(1 for ok in results if not ok),
+        "elapsed": time.perf_counter() - start,
+    }
+    logger.info(
+        f"📬 Fan-out completato: {stats['sent']} chat servite, {stats['failed']} fallite "
+        f"in {stats['elapsed']:.2f}s"
+    )
+    return stats
@@ -0,0 +1,92 @@
+"""
+Filtro rapido prima dell'OCR: scarta le storie che chiaramente non contengono un menu
+(foto dei piatti, promozioni, repost) usando statistiche calcolate su un'immagine ridotta
+"""
+import cv2
+import numpy as np
+from typing import Dict, Optional, Union
+
+from config import MENU_GATE_THRESHOLDS, MENU_GATE_WIDTH
+
+
+def menu_features(image: np.ndarray, width: int = MENU_GATE_WIDTH) -> Dict[str, float]:
+    """
+    Calcola le feature del filtro su una copia ridotta dell'immagine.
+
+    Args:
+        image: Immagine BGR
+        width: Larghezza della copia ridotta
+
+    Returns:
+        Dict con:
+        - edge_density (float): Frazione di pixel di bordo (Canny)
+        - text_lines (int): Righe di testo candidate (componenti larghe e basse)
+    """
+    height = max(1, round(image.shape[0] * width / image.shape[1]))
+    small = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    edges = cv2.Canny(gray, 80, 200)
+    edge_density = cv2.countNonZero(edges) / edges.size
+
+    # Bordi dei caratteri uniti orizzontalmente: ogni riga di testo diventa una componente larga e bassa
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    _, strokes = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(strokes, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    # RETR_CCOMP: anche le righe dentro un riquadro (il cui bordo le conterrebbe) restano contorni esterni;
+    # i buchi (parent != -1) non sono righe
+    contours, hierarchy = cv2.findContours(lines, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+
+    text_lines = 0
+    for contour, (_, _, _, parent) in zip(contours, hierarchy[0] if hierarchy is not None else []):
+        if parent != -1:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        if (w >= 3 * h and 0.006 * height <= h <= 0.06 * height and w >= 0.1 * width
+                and cv2.contourArea(contour) >= 0.4 * w * h):
+            text_lines += 1
+
+    return {"edge_density": edge_density, "text_lines": text_lines}
+
+
+def looks_like_menu(image: np.ndarray, thresholds: Optional[Dict[str, float]] = None) -> bool:
+    """
+    Decide se vale la pena passare l'immagine all'OCR.
+
+    Args:
+        image: Immagine BGR
+        thresholds: Soglie del filtro (default: MENU_GATE_THRESHOLDS)
+
+    Returns:
+        False se l'immagine non sembra contenere un menu
+    """
+    thresholds = thresholds or MENU_GATE_THRESHOLDS
+    features = menu_features(image)
+    return (features["edge_density"] >= thresholds["min_edge_density"]
+            and features["text_lines"] >= thresholds["min_text_lines"])
+
+
+def classify_story(source: Union[str, bytes]) -> bool:
+    """
+    Applica il filtro a un'immagine su disco o in memoria.
+    Eseguita all'interno dei processi worker OCR.
+
+    Args:
+        source: Percorso dell'immagine o suo contenuto
+
+    Returns:
+        True se l'immagine va passata all'OCR
+    """
+    from core.ocr import decode_image
+    return looks_like_menu(decode_image(source))
+
+
+def gate_signature() -> str:
+    """
+    Descrive la configurazione del filtro; fa parte della chiave di cache delle decisioni.
+
+    Returns:
+        Stringa che identifica soglie e risoluzione del filtro
+    """
+    options = ",".join(f"{key}={value}" for key, value in sorted(MENU_GATE_THRESHOLDS.items()))
+    return f"gate:{MENU_GATE_WIDTH}:{options}"
@@ -0,0 +1,449 @@
+"""
+Estrazione testo (OCR) delle storie in un pool di processi
+"""
+import os
+import time
+import asyncio
+import cv2
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from config import (
+    OCR_WORKERS, OCR_THREADS_PER_WORKER, OCR_PREPROCESS, OCR_PRESETS,
+    OCR_MAX_REGIONS, OCR_REGION_PADDING, OCR_MAX_REGION_COVERAGE,
+    OCR_CACHE_FILE, OCR_CACHE_MAX_ENTRIES, OCR_CACHE_MAX_AGE, MENU_GATE
+)
+from core.menu_gate import classify_story, gate_signature
+from core.ocr_engines import get_engine, resolve_engine_name
+from data.sqlite_cache import SQLiteCache
+from utils.file_operations import hash_bytes, hash_file
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _init_worker(threads: int, engine: Optional[str] = None) -> None:
+    """
+    Inizializza un processo worker OCR limitando i thread interni di tesseract e OpenCV,
+    così che N worker non si contendano gli stessi core.
+
+    Args:
+        threads: Numero di thread concessi a ogni worker
+        engine: Motore OCR da caricare subito, così la prima storia non ne paga l'avvio
+    """
+    os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    cv2.setNumThreads(threads)
+    if engine is not None:
+        get_engine(engine)
+
+
+def get_preset(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Restituisce le opzioni di un preset di preprocessing.
+
+    Args:
+        name: Nome del preset (default: OCR_PREPROCESS)
+
+    Returns:
+        Opzioni del preset
+
+    Raises:
+        ValueError: Se il preset non esiste
+    """
+    name = name or OCR_PREPROCESS
+    if name not in OCR_PRESETS:
+        raise ValueError(f"Preset OCR sconosciuto: {name} (disponibili: {', '.join(OCR_PRESETS)})")
+    return OCR_PRESETS[name]
+
+
+def preprocess(image: np.ndarray, preset: Optional[str] = None) -> np.ndarray:
+    """
+    Prepara un'immagine BGR per tesseract secondo il preset scelto:
+    scala di grigi, riduzione a un'altezza massima, rimozione rumore e
+    binarizzazione adattiva (con testo scuro su sfondo chiaro).
+
+    Args:
+        image: Immagine BGR letta con OpenCV
+        preset: Nome del preset (default: OCR_PREPROCESS)
+
+    Returns:
+        Immagine da passare a tesseract
+    """
+    options = get_preset(preset)
+
+    if not options.get("grayscale"):
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    else:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    max_height = options.get("max_height")
+    height, width = image.shape[:2]
+    if max_height and height > max_height:
+        scale = max_height / height
+        image = cv2.resize(image, (max(1, round(width * scale)), max_height), interpolation=cv2.INTER_AREA)
+
+    if options.get("grayscale") and options.get("denoise"):
+        image = cv2.medianBlur(image, 3)
+
+    if options.get("grayscale") and options.get("threshold"):
+        # Tesseract rende meglio con testo scuro su sfondo chiaro: il testo è la classe minoritaria
+        _, mask = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if cv2.countNonZero(mask) < mask.size / 2:
+            image = cv2.bitwise_not(image)
+        image = cv2.adaptiveThreshold(
+            image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10
+        )
+
+    return image
+
+
+def _merge_boxes(boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """Unisce i rettangoli (x1, y1, x2, y2) che si sovrappongono"""
+    merged: List[Tuple[int, int, int, int]] = []
+    for box in sorted(boxes, key=lambda b: (b[1], b[0])):
+        for i, other in enumerate(merged):
+            if box[0] <= other[2] and other[0] <= box[2] and box[1] <= other[3] and other[1] <= box[3]:
+                merged[i] = (min(box[0], other[0]), min(box[1], other[1]),
+                             max(box[2], other[2]), max(box[3], other[3]))
+                break
+        else:
+            merged.append(box)
+    # Un'unione può creare nuove sovrapposizioni
+    return merged if len(merged) == len(boxes) else _merge_boxes(merged)
+
+
+def find_text_regions(image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """
+    Individua i blocchi di testo con operazioni morfologiche: gradiente (bordi dei caratteri),
+    binarizzazione e chiusura con un kernel largo che unisce caratteri in righe e righe in blocchi.
+
+    Args:
+        image: Immagine in scala di grigi o RGB
+
+    Returns:
+        Rettangoli (x1, y1, x2, y2) dei blocchi, dall'alto verso il basso;
+        lista vuota se conviene leggere l'immagine intera
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    height, width = gray.shape
+
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(edges) == 0:
+        return []
+
+    connect = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 30), max(3, height // 60)))
+    blocks = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, connect)
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        # Scarta frammenti troppo piccoli per contenere una riga di testo
+        if w < width * 0.05 or h < height * 0.01:
+            continue
+        # Un blocco di testo chiuso è pieno; le texture delle foto danno contorni frastagliati
+        if cv2.contourArea(contour) < 0.45 * w * h:
+            continue
+        pad = OCR_REGION_PADDING
+        boxes.append((max(0, x - pad), max(0, y - pad), min(width, x + w + pad), min(height, y + h + pad)))
+
+    boxes = _merge_boxes(boxes)
+    covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+    if not boxes or covered > OCR_MAX_REGION_COVERAGE * width * height:
+        return []
+
+    if len(boxes) > OCR_MAX_REGIONS:
+        # Troppi blocchi: un solo ritaglio che li contiene tutti
+        boxes = [(min(b[0] for b in boxes), min(b[1] for b in boxes),
+                  max(b[2] for b in boxes), max(b[3] for b in boxes))]
+    return sorted(boxes, key=lambda b: (b[1], b[0]))
+
+
+def crop_text_regions(image: np.ndarray) -> List[np.ndarray]:
+    """
+    Ritaglia i blocchi di testo da passare a tesseract.
+
+    Args:
+        image: Immagine preprocessata
+
+    Returns:
+        Ritagli in ordine di lettura; l'immagine intera se non si trovano blocchi
+    """
+    boxes = find_text_regions(image)
+    if not boxes:
+        return [image]
+    return [image[y1:y2, x1:x2] for x1, y1, x2, y2 in boxes]
+
+
+def ocr_signature(preset: Optional[str] = None, engine: Optional[str] = None) -> str:
+    """
+    Descrive la configurazione OCR in uso; fa parte della chiave di cache,
+    così un cambio di configurazione invalida i risultati precedenti.
+
+    Args:
+        preset: Nome del preset di preprocessing (default: OCR_PREPROCESS)
+        engine: Nome del motore OCR (default: OCR_ENGINE)
+
+    Returns:
+        Stringa che identifica la configurazione OCR
+    """
+    name = preset or OCR_PREPROCESS
+    options = ",".join(f"{key}={value}" for key, value in sorted(get_preset(name).items()))
+    return f"{resolve_engine_name(engine)}:{name}:{options}"
+
+
+def ocr_cache_key(digest: str, preset: Optional[str] = None, engine: Optional[str] = None) -> str:
+    """
+    Costruisce la chiave di cache OCR per un'immagine.
+
+    Args:
+        digest: Impronta SHA-256 dei byte dell'immagine
+        preset: Nome del preset di preprocessing (default: OCR_PREPROCESS)
+        engine: Nome del motore OCR (default: OCR_ENGINE)
+
+    Returns:
+        Chiave di cache
+    """
+    return f"{digest}:{ocr_signature(preset, engine)}"
+
+
+def decode_image(source: Union[str, bytes]) -> np.ndarray:
+    """
+    Carica un'immagine BGR da file o direttamente dai byte scaricati, senza passare dal disco.
+
+    Args:
+        source: Percorso dell'immagine o suo contenuto
+
+    Returns:
+        Immagine BGR
+
+    Raises:
+        ValueError: Se l'immagine non è leggibile
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Impossibile decodificare l'immagine in memoria")
+        return image
+
+    image = cv2.imread(source)
+    if image is None:
+        raise ValueError(f"Impossibile leggere l'immagine: {source}")
+    return image
+
+
+def extract_text(source: Union[str, bytes], preset: Optional[str] = None, engine: Optional[str] = None) -> str:
+    """
+    Estrae il testo da un'immagine con tesseract.
+    Eseguita all'interno dei processi worker.
+
+    Args:
+        source: Percorso dell'immagine o suo contenuto in memoria
+        preset: Nome del preset di preprocessing (default: OCR_PREPROCESS)
+        engine: Nome del motore OCR (default: OCR_ENGINE)
+
+    Returns:
+        Testo estratto (senza spazi iniziali/finali)
+
+    Raises:
+        ValueError: Se l'immagine non è leggibile
+    """
+    prepared = preprocess(decode_image(source), preset)
+    crops = crop_text_regions(prepared) if get_preset(preset).get("crop") else [prepared]
+
+    ocr = get_engine(engine)
+    texts = (ocr.image_to_string(crop).strip() for crop in crops)
+    return "\n".join(text for text in texts if text)
+
+
+class OCRExecutor:
+    """Esegue l'OCR fuori dall'event loop, in parallelo su più core"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        cache: Optional[SQLiteCache] = None,
+        preset: Optional[str] = None,
+        engine: Optional[str] = None,
+        gate: Optional[bool] = None
+    ):
+        """
+        Args:
+            max_workers: Numero di processi worker (default: OCR_WORKERS o numero di core)
+            executor: Executor da usare al posto del pool di processi (utile nei test)
+            cache: Cache dei testi estratti, indicizzata per contenuto dell'immagine
+            preset: Preset di preprocessing (default: OCR_PREPROCESS)
+            engine: Motore OCR (default: OCR_ENGINE)
+            gate: Scarta prima dell'OCR le immagini che non sembrano menu (default: MENU_GATE)
+        """
+        self.max_workers = max_workers or OCR_WORKERS or os.cpu_count() or 1
+        self.cache = cache
+        self.preset = preset or OCR_PREPROCESS
+        get_preset(self.preset)
+        self.engine = resolve_engine_name(engine)
+        self.gate = MENU_GATE if gate is None else gate
+        self._executor = executor
+        # Statistiche del filtro pre-OCR
+        self.gate_checked = 0
+        self.gate_rejected = 0
+        self.ocr_runs = 0
+        self.ocr_seconds = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        """Pool di processi, creato alla prima richiesta"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(OCR_THREADS_PER_WORKER, self.engine)
+            )
+            logger.info(f"🧠 Pool OCR avviato con {self.max_workers} processi ({self.engine})")
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Esegue una funzione nel pool senza bloccare l'event loop. Un worker terminato
+        (memoria esaurita, crash di tesserocr, eccezione non serializzabile) rende il pool
+        inutilizzabile: in quel caso il pool viene ricreato e il compito riprovato una volta.
+
+        Args:
+            func: Funzione da eseguire nel pool
+            *args: Argomenti della funzione
+
+        Returns:
+            Risultato della funzione
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool as e:
+            # Più compiti falliscono insieme: solo il primo sostituisce il pool
+            if self._executor is executor:
+                logger.warning(f"⚠️ Pool OCR interrotto ({e}), lo riavvio")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def extract(self, source: Union[str, bytes], digest: Optional[str] = None) -> Optional[str]:
+        """
+        Estrae il testo da una singola immagine senza bloccare l'event loop.
+
+        Args:
+            source: Percorso dell'immagine o suo contenuto in memoria
+            digest: Impronta SHA-256 dell'immagine, se già calcolata
+
+        Returns:
+            Testo estratto, None se l'immagine è stata scartata dal filtro pre-OCR
+        """
+        in_memory = not isinstance(source, str)
+        name = "immagine in memoria" if in_memory else os.path.basename(source)
+        key = None
+        if self.cache is not None:
+            if digest is None:
+                digest = hash_bytes(source) if in_memory else await asyncio.to_thread(hash_file, source)
+            key = ocr_cache_key(digest, self.preset, self.engine)
+            # SQLite è bloccante: le letture e scritture della cache girano in un thread
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                logger.info(f"♻️ Testo OCR in cache per {name}")
+                return cached
+
+        if self.gate and not await self._passes_gate(source, digest):
+            logger.info(f"🚫 {name} non sembra un menu, OCR saltato")
+            return None
+
+        start = time.perf_counter()
+        text = await self._run(extract_text, source, self.preset, self.engine)
+        self.ocr_runs += 1
+        self.ocr_seconds += time.perf_counter() - start
+
+        if key is not None:
+            await asyncio.to_thread(self.cache.set, key, text)
+        return text
+
+    async def _passes_gate(self, source: Union[str, bytes], digest: Optional[str]) -> bool:
+        """
+        Applica il filtro pre-OCR, riusando la decisione già presa per la stessa immagine.
+        Solo le immagini accettate restano in cache: quelle scartate vengono ricontrollate
+        a ogni giro, così un errore del filtro (o un cambio di soglie) non è definitivo.
+
+        Args:
+            source: Percorso dell'immagine o suo contenuto in memoria
+            digest: Impronta SHA-256 dell'immagine (None senza cache)
+
+        Returns:
+            True se l'immagine va passata all'OCR
+        """
+        self.gate_checked += 1
+        key = f"{digest}:{gate_signature()}" if self.cache is not None else None
+        decision = await asyncio.to_thread(self.cache.get, key) if key is not None else None
+        if decision is None:
+            decision = "menu" if await self._run(classify_story, source) else "skip"
+            if key is not None and decision == "menu":
+                await asyncio.to_thread(self.cache.set, key, decision)
+
+        if decision == "skip":
+            self.gate_rejected += 1
+            return False
+        return True
+
+    @property
+    def saved_seconds(self) -> float:
+        """Stima del tempo OCR risparmiato dal filtro (scarti × durata media di un OCR)"""
+        if not self.ocr_runs:
+            return 0.0
+        return self.gate_rejected * self.ocr_seconds / self.ocr_runs
+
+    def report(self) -> None:
+        """Registra le statistiche di cache e filtro e rimuove le voci scadute dalla cache"""
+        if self.gate_checked:
+            logger.info(
+                f"📊 Filtro pre-OCR: {self.gate_rejected}/{self.gate_checked} storie scartate, "
+                f"~{self.saved_seconds:.1f}s di OCR risparmiati"
+            )
+        if self.cache is not None:
+            logger.info(f"📊 Cache OCR: {self.cache.hits} hit, {self.cache.misses} miss")
+            self.cache.evict()
+
+    def shutdown(self) -> None:
+        """Chiude il pool di processi, se avviato"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_ocr_executor: Optional[OCRExecutor] = None
+
+
+def get_ocr_executor() -> OCRExecutor:
+    """
+    Restituisce l'executor OCR condiviso dall'applicazione.
+
+    Returns:
+        Istanza di OCRExecutor
+    """
+    global _ocr_executor
+    if _ocr_executor is None:
+        _ocr_executor = OCRExecutor(cache=SQLiteCache(
+            OCR_CACHE_FILE,
+            table="ocr",
+            max_entries=OCR_CACHE_MAX_ENTRIES,
+            max_age=OCR_CACHE_MAX_AGE
+        ))
+    return _ocr_executor
+
+
+def shutdown_ocr_executor() -> None:
+    """Chiude l'executor OCR condiviso"""
+    global _ocr_executor
+    if _ocr_executor is not None:
+        _ocr_executor.shutdown()
+        if _ocr_executor.cache is not None:
+            _ocr_executor.cache.close()
+        _ocr_executor = None
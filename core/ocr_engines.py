@@ -0,0 +1,127 @@
+"""
+Motori OCR intercambiabili: pytesseract (un processo tesseract per chiamata)
+o tesserocr (API C di tesseract, modello caricato una volta per processo)
+"""
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+import pytesseract
+from PIL import Image
+from typing import Dict, Optional, Type
+
+from config import OCR_ENGINE
+from utils.logger import setup_logger
+try:
+    import tesserocr
+    TESSEROCR_SUPPORT = True
+except ImportError:
+    TESSEROCR_SUPPORT = False
+
+logger = setup_logger(__name__)
+
+
+class OCREngine(ABC):
+    """Interfaccia comune dei motori OCR"""
+
+    name = "base"
+
+    @abstractmethod
+    def image_to_string(self, image: np.ndarray) -> str:
+        """
+        Estrae il testo da un'immagine.
+
+        Args:
+            image: Immagine in scala di grigi o RGB
+
+        Returns:
+            Testo estratto
+        """
+
+    def close(self) -> None:
+        """Libera le risorse del motore"""
+
+
+class PytesseractEngine(OCREngine):
+    """Avvia l'eseguibile tesseract a ogni chiamata, passando l'immagine tramite file temporanei"""
+
+    name = "pytesseract"
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        return pytesseract.image_to_string(image)
+
+
+class TesserocrEngine(OCREngine):
+    """Tiene caricato il modello di tesseract tra una chiamata e l'altra (API C via tesserocr)"""
+
+    name = "tesserocr"
+
+    def __init__(self):
+        if not TESSEROCR_SUPPORT:
+            raise RuntimeError("tesserocr non installato")
+        self._api = tesserocr.PyTessBaseAPI()
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        self._api.SetImage(Image.fromarray(image))
+        return self._api.GetUTF8Text()
+
+    def close(self) -> None:
+        self._api.End()
+
+
+ENGINES: Dict[str, Type[OCREngine]] = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+# Un motore per thread: le istanze di tesserocr non sono thread-safe
+_local = threading.local()
+
+
+def resolve_engine_name(name: Optional[str] = None) -> str:
+    """
+    Restituisce il motore effettivamente utilizzabile, ripiegando su pytesseract
+    se quello richiesto non è disponibile.
+
+    Args:
+        name: Nome del motore (default: OCR_ENGINE)
+
+    Returns:
+        Nome del motore
+
+    Raises:
+        ValueError: Se il motore non esiste
+    """
+    name = name or OCR_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Motore OCR sconosciuto: {name} (disponibili: {', '.join(ENGINES)})")
+    if name == TesserocrEngine.name and not TESSEROCR_SUPPORT:
+        logger.warning("⚠️ tesserocr non installato, uso pytesseract")
+        return PytesseractEngine.name
+    return name
+
+
+def get_engine(name: Optional[str] = None) -> OCREngine:
+    """
+    Restituisce il motore OCR del thread corrente, creandolo alla prima richiesta.
+    Nei processi worker il motore resta quindi caricato per tutta la vita del processo.
+
+    Args:
+        name: Nome del motore (default: OCR_ENGINE)
+
+    Returns:
+        Istanza del motore
+    """
+    name = resolve_engine_name(name)
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+    if name not in engines:
+        engines[name] = ENGINES[name]()
+    return engines[name]
+
+
+def close_engines() -> None:
+    """Chiude i motori creati nel thread corrente"""
+    for engine in getattr(_local, "engines", {}).values():
+        engine.close()
+    _local.engines = {}
@@ -0,0 +1,165 @@
+"""
+Pipeline a stadi collegati da code asyncio limitate
+"""
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Segnala a un worker che lo stadio precedente ha terminato
+_DONE = object()
+
+
+class Stage:
+    """Uno stadio del pipeline: un handler eseguito da `concurrency` worker in parallelo"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Any]],
+        concurrency: int = 1,
+        batch_size: Optional[int] = None,
+        linger: float = 0.0
+    ):
+        """
+        Args:
+            name: Nome dello stadio (per log e statistiche)
+            handler: Coroutine che elabora un elemento e restituisce l'elemento per lo stadio
+                     successivo, None per scartarlo. In modalità batch riceve una lista
+                     e restituisce la lista degli elementi da inoltrare.
+            concurrency: Numero di worker dello stadio
+            batch_size: Elementi massimi passati insieme all'handler (None = nessun batching)
+            linger: Secondi di attesa per accumulare un batch dopo il primo elemento
+        """
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size) if batch_size is not None else None
+        self.linger = linger
+        self.processed = 0
+        self.dropped = 0
+        self.busy = 0.0
+
+    async def _next_batch(self, inbox: asyncio.Queue) -> tuple:
+        """
+        Preleva il prossimo elemento (o batch) dalla coda.
+
+        Returns:
+            Coppia (elementi, finito): finito è True se il worker ha ricevuto il segnale di fine
+        """
+        item = await inbox.get()
+        if item is _DONE:
+            return [], True
+
+        batch = [item]
+        if self.batch_size is not None:
+            if self.linger:
+                await asyncio.sleep(self.linger)
+            while len(batch) < self.batch_size:
+                try:
+                    item = inbox.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:
+                    # Il segnale di fine è per questo worker: elabora il batch e termina
+                    return batch, True
+                batch.append(item)
+        return batch, False
+
+    async def _emit(self, outbox: Optional[asyncio.Queue], result: Any) -> None:
+        if result is None:
+            self.dropped += 1
+            return
+        if outbox is not None:
+            await outbox.put(result)
+
+    async def _worker(self, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        done = False
+        while not done:
+            batch, done = await self._next_batch(inbox)
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                if self.batch_size is not None:
+                    results = await self.handler(batch) or []
+                    self.dropped += len(batch) - len(results)
+                    for result in results:
+                        await self._emit(outbox, result)
+                else:
+                    await self._emit(outbox, await self.handler(batch[0]))
+            except Exception as e:
+                logger.error(f"❌ Errore nello stadio {self.name}: {e}")
+                self.dropped += len(batch)
+            finally:
+                self.processed += len(batch)
+                self.busy += time.perf_counter() - start
+
+    async def run(self, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], downstream_workers: int) -> None:
+        """
+        Esegue lo stadio finché la coda in ingresso non è esaurita,
+        poi segnala la fine ai worker dello stadio successivo.
+
+        Args:
+            inbox: Coda in ingresso
+            outbox: Coda in uscita (None per l'ultimo stadio)
+            downstream_workers: Worker dello stadio successivo da notificare
+        """
+        await asyncio.gather(*(self._worker(inbox, outbox) for _ in range(self.concurrency)))
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(_DONE)
+
+
+async def run_pipeline(items: List[Any], stages: List[Stage], queue_size: int = 8) -> Dict[str, Dict[str, float]]:
+    """
+    Fa scorrere gli elementi attraverso gli stadi: ogni stadio lavora in parallelo agli altri,
+    con code limitate a `queue_size` elementi che applicano back-pressure.
+
+    Args:
+        items: Elementi in ingresso al primo stadio
+        stages: Stadi in ordine di esecuzione
+        queue_size: Capienza massima di ogni coda tra stadi
+
+    Returns:
+        Statistiche per stadio: elementi elaborati, scartati e secondi di lavoro
+    """
+    if not stages:
+        return {}
+
+    queues = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages]
+
+    async def feed() -> None:
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].concurrency):
+            await queues[0].put(_DONE)
+
+    tasks = [asyncio.create_task(feed())]
+    for i, stage in enumerate(stages):
+        last = i == len(stages) - 1
+        tasks.append(asyncio.create_task(stage.run(
+            queues[i],
+            None if last else queues[i + 1],
+            0 if last else stages[i + 1].concurrency
+        )))
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    stats = {
+        stage.name: {"processed": stage.processed, "dropped": stage.dropped, "busy": stage.busy}
+        for stage in stages
+    }
+    logger.info("📊 Pipeline: " + ", ".join(
+        f"{name} {s['processed']} ({s['busy']:.2f}s)" for name, s in stats.items()
+    ))
+    return stats
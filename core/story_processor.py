@@ -2,161 +2,711 @@
 Logica principale per download e invio storie Instagram
 """
 import os
-import time
-import requests
-import cv2
-import pytesseract
-import googletrans
-from typing import List
+import asyncio
+import httpx
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from instagrapi import Client
 
-from config import TARGET_USER, TELEGRAM_CHAT_ID, DOWNLOAD_DIR, CREATED_IMAGES_DIR
-from services import InstagramService, TelegramService
+from config import (
+    TARGET_USER, TELEGRAM_CHAT_ID, DOWNLOAD_DIR, CREATED_IMAGES_DIR,
+    DOWNLOAD_CONCURRENCY, DOWNLOAD_TIMEOUT, STORY_TTL, PERSIST_DOWNLOADS,
+    TRANSLATION_BATCH_LINGER, PIPELINE_QUEUE_SIZE, PIPELINE_CONCURRENCY,
+    PIPELINE_DELIVER_BATCH, PIPELINE_TRANSLATE_BATCH, RENDER_LAYOUT
+)
+from services import InstagramService, TelegramService, TranslationService
+from services.telegram_service import get_file_id_store
 from data.subscribers import load_subscribers
-from utils import save_bytes_to_file, clean_directory, create_long_image, setup_logger
+from data.story_ledger import StoryLedger
+from data.render_cache import get_render_cache
+from utils import (
+    save_bytes_to_file, read_bytes_from_file, clean_directory, hash_bytes, dhash_bytes,
+    render_many, render_key, fits_combined_layout, image_format, setup_logger
+)
+from utils.rate_limiter import TelegramRateLimiter
+from core.ocr import get_ocr_executor
+from core.dispatcher import fan_out
+from core.pipeline import Stage, run_pipeline
 
 logger = setup_logger(__name__)
 
 
-async def download_and_send_stories(cl: Client) -> None:
+def _http_client() -> httpx.AsyncClient:
     """
-    Scarica le storie di TARGET_USER, estrae testo, traduce, crea immagini e invia galleria su Telegram.
+    Crea il client HTTP condiviso per i download (keep-alive + HTTP/2).
+    Il contesto SSL richiede centinaia di millisecondi: va creato fuori dall'event loop.
+    
+    Returns:
+        Client httpx da usare come context manager
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=DOWNLOAD_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=DOWNLOAD_CONCURRENCY,
+            max_keepalive_connections=DOWNLOAD_CONCURRENCY
+        ),
+        follow_redirects=True
+    )
+
+
+def _story_path(story: Any) -> str:
+    """Percorso su disco della miniatura di una storia"""
+    return os.path.join(DOWNLOAD_DIR, f"{TARGET_USER}_{story.id}.jpg")
+
+
+async def _fetch_story(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    story: Any
+) -> Optional[bytes]:
+    """
+    Ottiene i byte della miniatura di una singola storia: dal disco se già
+    scaricata, altrimenti dalla rete.
+    
+    Args:
+        client: Client HTTP condiviso (keep-alive/HTTP2)
+        semaphore: Semaforo che limita i download simultanei
+        story: Storia Instagram da scaricare
+    
+    Returns:
+        Contenuto dell'immagine, None in caso di errore
+    """
+    path = _story_path(story)
+    filename = os.path.basename(path)
+    
+    if os.path.exists(path):
+        logger.info(f"✅ Già scaricata: {filename}")
+        return await asyncio.to_thread(read_bytes_from_file, path)
+    
+    async with semaphore:
+        try:
+            logger.info(f"⬇️ Scarico {filename}...")
+            r = await asyncio.wait_for(client.get(str(story.thumbnail_url)), timeout=DOWNLOAD_TIMEOUT)
+            r.raise_for_status()
+            return r.content
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Timeout download {filename} dopo {DOWNLOAD_TIMEOUT}s")
+        except Exception as e:
+            logger.error(f"❌ Errore download {filename}: {e}")
+    return None
+
+
+async def fetch_story_images(
+    stories: List[Any],
+    client: Optional[httpx.AsyncClient] = None
+) -> List[Tuple[Any, bytes]]:
+    """
+    Scarica in parallelo le miniature delle storie (solo foto) con concorrenza limitata,
+    riutilizzando un unico client HTTP con connessioni keep-alive/HTTP2.
+    Le immagini restano in memoria: salvarle su disco è compito del chiamante.
+    
+    Args:
+        stories: Lista di storie Instagram
+        client: Client HTTP da usare (default: ne crea uno condiviso per la chiamata)
+    
+    Returns:
+        Lista di coppie (storia, byte dell'immagine) nell'ordine originale, senza i download falliti
+    """
+    photo_stories = [s for s in stories if s.media_type == 1 and s.thumbnail_url]
+    if not photo_stories:
+        return []
+    
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    
+    async def _run(http_client: httpx.AsyncClient) -> List[Optional[bytes]]:
+        return await asyncio.gather(
+            *(_fetch_story(http_client, semaphore, s) for s in photo_stories)
+        )
+    
+    if client is not None:
+        images = await _run(client)
+    else:
+        async with await asyncio.to_thread(_http_client) as http_client:
+            images = await _run(http_client)
+    
+    return [(s, data) for s, data in zip(photo_stories, images) if data is not None]
+
+
+def _prepare_directories(ledger: StoryLedger) -> int:
+    """
+    Crea le cartelle di lavoro e rimuove dal registro (e da disco) le storie scadute.
+    
+    Args:
+        ledger: Registro delle storie elaborate
+    
+    Returns:
+        Numero di storie scadute rimosse
+    """
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    os.makedirs(CREATED_IMAGES_DIR, exist_ok=True)
+    removed = ledger.collect_garbage()
+    
+    # File orfani (es. storie mai registrate) oltre la finestra di vita delle storie
+    clean_directory(DOWNLOAD_DIR, max_age=STORY_TTL)
+    clean_directory(CREATED_IMAGES_DIR, max_age=STORY_TTL)
+    return removed
+
+
+# ID Instagram degli utenti già cercati (username -> pk)
+_user_ids: Dict[str, Any] = {}
+
+# Un solo pipeline alla volta: polling, preparazione e invio condividono registro e cache
+_pipeline_lock = asyncio.Lock()
+
+
+def _fetch_stories(cl: Client) -> List[Any]:
+    """
+    Recupera le storie correnti di TARGET_USER (chiamate bloccanti a instagrapi).
     
     Args:
         cl: Client Instagram autenticato
+    
+    Returns:
+        Lista di storie
     """
-    logger.info("🔎 Avvio download_and_send_stories()...")
+    if not TARGET_USER:
+        raise ValueError("TARGET_USER non configurato")
+    
+    # L'ID utente non cambia: con il polling frequente si evita una richiesta a ogni controllo
+    user_id = _user_ids.get(TARGET_USER)
+    if user_id is None:
+        logger.info(f"👤 Cerco utente Instagram: {TARGET_USER}")
+        user = cl.user_info_by_username(TARGET_USER)
+        user_id = _user_ids[TARGET_USER] = user.pk
+        logger.info(f"✅ Utente trovato: {user.username} (ID: {user_id})")
+    
+    stories = cl.user_stories(user_id)
+    logger.info(f"📸 Numero di storie trovate: {len(stories)}")
+    return stories
+
+
+def _render_story_images(
+    extracted_text: str, translated_text: str
+) -> Tuple[List[str], List[Union[str, bytes]], Dict[str, bytes]]:
+    """
+    Crea in memoria le immagini con il testo originale e quello tradotto di una storia:
+    due immagini separate o, con RENDER_LAYOUT "stacked"/"split", una sola con entrambi i testi.
+    Le immagini restano nella cache di rendering, unica copia su disco: quelle già presenti
+    non vengono né ridisegnate né rilette, quelle nuove vanno salvate dal chiamante.
+    
+    Args:
+        extracted_text: Testo estratto con OCR
+        translated_text: Testo tradotto
+    
+    Returns:
+        Tupla (percorsi in cache, immagini da inviare, immagini nuove da salvare per chiave):
+        le immagini già in cache sono il loro percorso, quelle nuove il contenuto codificato
+    """
+    cache = get_render_cache()
+    
+    # Percorso del logo SVG
+    logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "logo.svg")
+    common = {
+        "add_logo": True,
+        "logo_image_path": logo_path if os.path.exists(logo_path) else None,
+        "logo_position": "bottom-right",
+    }
+    
+    combined = RENDER_LAYOUT != "separate"
+    if combined and not fits_combined_layout(extracted_text, translated_text, RENDER_LAYOUT):
+        logger.info(f"📐 Menu troppo lungo per l'impaginazione {RENDER_LAYOUT}, uso due immagini")
+        combined = False
+    
+    if combined:
+        # Un solo elemento per storia: metà degli upload e dei media group per iscritto
+        jobs = [{"text": extracted_text, "translated_text": translated_text, "layout": RENDER_LAYOUT}]
+    else:
+        jobs = [{"text": extracted_text}, {"text": translated_text}]
+    
+    keys = [render_key(**common, **job) for job in jobs]
+    cached = [cache.get(key) for key in keys]
+    # Le immagini mancanti vengono create in parallelo
+    created = iter(render_many([job for job, path in zip(jobs, cached) if path is None], **common))
+    
+    paths, images, new = [], [], {}
+    for key, path in zip(keys, cached):
+        if path is None:
+            image = next(created)
+            # L'estensione segue il formato scelto dalla codifica (RENDER_ENCODING)
+            path = cache.path_for(key, image_format(image))
+            new[key] = image
+        else:
+            image = path
+        paths.append(path)
+        images.append(image)
+    return paths, images, new
+
+
+class StoryPipeline:
+    """
+    Stadi del pipeline delle storie: fetch → OCR → traduzione → rendering → invio.
+    
+    Ogni storia viaggia come dict (story, index, path, ocr_text, translated_text, rendered, images);
+    le immagini appena create viaggiano in memoria fino all'invio e vengono salvate nella cache
+    di rendering in background. Le storie già presenti nel registro arrivano con `rendered`
+    valorizzato e attraversano gli stadi senza essere rielaborate. Gli stadi finiscono le storie
+    in ordine sparso: l'invio le riordina secondo la posizione (index) tra le storie di Instagram.
+    """
+    
+    def __init__(
+        self,
+        ledger: StoryLedger,
+        translator: TranslationService,
+        http_client: httpx.AsyncClient,
+        telegram: Optional[TelegramService],
+        chat_ids: List[Any]
+    ):
+        self.ledger = ledger
+        self.translator = translator
+        self.http_client = http_client
+        self.telegram = telegram
+        self.chat_ids = chat_ids
+        self.ocr_executor = get_ocr_executor()
+        self.delivered = 0
+        self._writes: List[asyncio.Task] = []
+        # Impronte e testi delle storie nuove di questa esecuzione, non ancora nel registro
+        self._pending: Dict[str, Dict[str, str]] = {}
+        # Percorsi delle immagini già inviate in questa esecuzione
+        self._sent: Set[str] = set()
+        # Storie arrivate all'invio (None = scartate) in attesa di quelle che le precedono
+        self._ready: Dict[int, Optional[dict]] = {}
+        self._next_index = 0
     
-    async with googletrans.Translator() as translator:
-        subscribers = load_subscribers()
+    @staticmethod
+    def _saved_path(job: dict) -> Optional[str]:
+        """Percorso della miniatura su disco, None se non viene salvata"""
+        return job["path"] if PERSIST_DOWNLOADS or os.path.exists(job["path"]) else None
+    
+    async def flush(self) -> None:
+        """Attende il completamento dei salvataggi su disco in corso e registra le statistiche OCR"""
+        results = await asyncio.gather(*self._writes, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ Salvataggio su disco fallito: {result}")
+        self._writes.clear()
+        await asyncio.to_thread(self.ocr_executor.report)
+        await asyncio.to_thread(get_render_cache().evict)
+    
+    async def run(self, jobs: List[dict]) -> None:
+        """
+        Fa scorrere le storie attraverso gli stadi, nell'ordine in cui sono pubblicate.
         
-        # Pulisce le cartelle di download
-        os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-        os.makedirs(CREATED_IMAGES_DIR, exist_ok=True)
+        Args:
+            jobs: Storie da elaborare e inviare, nell'ordine di Instagram
+        """
+        for index, job in enumerate(jobs):
+            job["index"] = index
+        await run_pipeline(jobs, self.stages(), queue_size=PIPELINE_QUEUE_SIZE)
+        # Storie rimaste in attesa di una precedente persa per un errore
+        await self._send(self._release(everything=True))
+    
+    def _drop(self, job: dict) -> None:
+        """Segna una storia scartata, così l'invio non la aspetta"""
+        self._ready[job["index"]] = None
+    
+    def stages(self) -> List[Stage]:
+        """
+        Costruisce gli stadi con la concorrenza configurata in PIPELINE_CONCURRENCY.
+        Senza servizio Telegram il pipeline si ferma al rendering (fase di preparazione).
         
-        removed_stories = clean_directory(DOWNLOAD_DIR)
-        removed_images = clean_directory(CREATED_IMAGES_DIR)
-        logger.info(f"📁 Rimossi {removed_stories} file stories e {removed_images} immagini create")
+        Returns:
+            Lista ordinata degli stadi
+        """
+        concurrency = PIPELINE_CONCURRENCY
+        stages = [
+            Stage("fetch", self.fetch, concurrency["fetch"]),
+            Stage("ocr", self.ocr, concurrency["ocr"] or self.ocr_executor.max_workers),
+            Stage("translate", self.translate, concurrency["translate"],
+                  batch_size=PIPELINE_TRANSLATE_BATCH, linger=TRANSLATION_BATCH_LINGER),
+            Stage("render", self.render, concurrency["render"]),
+        ]
+        if self.telegram:
+            stages.append(
+                Stage("deliver", self.deliver, concurrency["deliver"], batch_size=PIPELINE_DELIVER_BATCH)
+            )
+        return stages
+    
+    async def fetch(self, job: dict) -> Optional[dict]:
+        """Scarica la miniatura della storia, che resta in memoria per l'OCR"""
+        if "rendered" in job:
+            return job
         
-        # --- Scarica stories ---
-        try:
-            if not TARGET_USER:
-                raise ValueError("TARGET_USER non configurato")
-            
-            logger.info(f"👤 Cerco utente Instagram: {TARGET_USER}")
-            user = cl.user_info_by_username(TARGET_USER)
-            user_id = user.pk
-            logger.info(f"✅ Utente trovato: {user.username} (ID: {user_id})")
-            
-            stories = cl.user_stories(user_id)
-            logger.info(f"📸 Numero di storie trovate: {len(stories)}")
-            
-        except Exception as e:
-            logger.error(f"❌ Errore ottenimento stories: {e}")
-            import traceback
-            traceback.print_exc()
-            return
+        fetched = await fetch_story_images([job["story"]], client=self.http_client)
+        if not fetched:
+            return self._drop(job)
+        job["image"] = fetched[0][1]
+        job["path"] = _story_path(job["story"])
+        if PERSIST_DOWNLOADS and not os.path.exists(job["path"]):
+            # Salvataggio su disco fuori dal percorso critico: l'OCR legge dalla memoria
+            self._writes.append(asyncio.create_task(
+                asyncio.to_thread(save_bytes_to_file, job["image"], job["path"])
+            ))
+        return job
+    
+    async def ocr(self, job: dict) -> Optional[dict]:
+        """Estrae il testo nel pool OCR e scarta le storie senza testo rilevante"""
+        if "rendered" in job:
+            return job
         
-        if not stories:
-            logger.warning("⚠️ Nessuna storia disponibile ora.")
-            return
+        s, image = job["story"], job.pop("image")
+        job["image_hash"] = hash_bytes(image)
+        job["phash"] = await asyncio.to_thread(dhash_bytes, image)
+        # Stessa immagine già elaborata: non serve nemmeno l'OCR
+        if self._reuse_original(job):
+            return job
         
-        images_to_send = []
-        
-        for s in stories:
-            if s.media_type != 1:
-                continue
-            
-            url = s.thumbnail_url
-            if not url:
-                continue
-            
-            filename = f"{TARGET_USER}_{s.id}.jpg"
-            path = os.path.join(DOWNLOAD_DIR, filename)
-            
-            try:
-                if not os.path.exists(path):
-                    logger.info(f"⬇️ Scarico {filename}...")
-                    r = requests.get(str(url), timeout=30)
-                    r.raise_for_status()
-                    save_bytes_to_file(r.content, path)
-                else:
-                    logger.info(f"✅ Già scaricata: {filename}")
-                
-                # OCR
-                image = cv2.imread(path)
-                if image is None:
-                    logger.warning(f"⚠️ Impossibile leggere l'immagine: {path}")
-                    continue
-                
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                extracted_text = pytesseract.image_to_string(gray).strip()
-                logger.info(f"🧠 Testo estratto: {extracted_text[:100]}...")
-                
-                if not extracted_text or len(extracted_text.strip()) < 5:
-                    logger.info("🟡 Nessun testo rilevante in questa storia.")
-                    continue
-                
-                # Traduzione
-                translated = await translator.translate(extracted_text, dest='en')
-                translated_text = translated.text
-                
-                # Crea immagini testo originale + tradotto
-                text_image_path = os.path.join(CREATED_IMAGES_DIR, f"text_{s.id}.jpg")
-                translated_image_path = os.path.join(CREATED_IMAGES_DIR, f"translated_{s.id}.jpg")
-                
-                # Percorso del logo SVG
-                logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "logo.svg")
-                
-                create_long_image(
-                    extracted_text, 
-                    text_image_path,
-                    add_logo=True,
-                    logo_image_path=logo_path if os.path.exists(logo_path) else None,
-                    logo_position="bottom-right"
-                )
-                create_long_image(
-                    translated_text, 
-                    translated_image_path,
-                    add_logo=True,
-                    logo_image_path=logo_path if os.path.exists(logo_path) else None,
-                    logo_position="bottom-right"
-                )
-                
-                images_to_send.extend([text_image_path, translated_image_path])
-                logger.info(f"🖼 Create immagini per storia {s.id}")
-                
-            except Exception as e:
-                logger.error(f"❌ Errore durante elaborazione storia: {e}")
-                time.sleep(2)
-                continue
-        
-        # --- Invio Telegram ---
-        if not images_to_send:
-            logger.warning("⚠️ Nessuna immagine da inviare.")
-            return
+        extracted_text = await self.ocr_executor.extract(image, digest=job["image_hash"])
+        if extracted_text is None:
+            # Il filtro può sbagliare: la storia resta nel registro ma verrà ricontrollata
+            self.ledger.record(s.id, getattr(s, "taken_at", None), image_path=self._saved_path(job),
+                               image_hash=job["image_hash"], phash=job["phash"], gate_rejected=True,
+                               rendered=[])
+            return self._drop(job)
+        logger.info(f"🧠 Testo estratto: {extracted_text[:100]}...")
+        job["ocr_text"] = extracted_text
+        
+        # Impronta vicina e stesso testo: ripubblicazione dello stesso menu
+        if self._reuse_original(job):
+            return job
+        (self.ledger.get(s.id) or {}).pop("gate_rejected", None)
+        if "duplicate_of" not in job:
+            self._pending[str(s.id)] = {key: job[key] for key in ("phash", "image_hash", "ocr_text")}
         
-        logger.info(f"📤 Invio galleria ({len(images_to_send)} immagini)...")
+        if not extracted_text or len(extracted_text.strip()) < 5:
+            logger.info("🟡 Nessun testo rilevante in questa storia.")
+            # Registrata comunque, così non viene rielaborata alla prossima esecuzione
+            self.ledger.record(s.id, getattr(s, "taken_at", None), image_path=self._saved_path(job),
+                               image_hash=job["image_hash"], phash=job["phash"], ocr_text=extracted_text,
+                               rendered=[])
+            return self._drop(job)
+        return job
+    
+    def _reuse_original(self, job: dict) -> bool:
+        """
+        Cerca l'originale di una storia ripubblicata e, se è già elaborato, ne riusa testo,
+        traduzione e immagini: restano disponibili anche quando l'originale non è più
+        pubblicato, e l'invio salta i percorsi già inviati.
         
-        telegram = TelegramService()
+        Args:
+            job: Storia con image_hash, phash e, dopo l'OCR, ocr_text
         
-        # Invia al chat principale + iscritti
-        all_chats = [TELEGRAM_CHAT_ID] + subscribers if TELEGRAM_CHAT_ID else subscribers
+        Returns:
+            True se la storia è un duplicato già pronto per l'invio
+        """
+        s = job["story"]
+        original = self._find_original(s.id, job["phash"], job["image_hash"], job.get("ocr_text"))
+        if original is None:
+            return False
         
-        for idx, chat_id in enumerate(all_chats):
+        source = self.ledger.get(original)
+        if source is None or "ocr_text" not in source:
+            # Originale ancora in elaborazione in questa esecuzione: stesso testo, stesse immagini in cache
+            logger.info(f"♊ Storia {s.id} quasi identica a {original}, in elaborazione")
+            job["duplicate_of"] = original
+            return False
+        
+        logger.info(f"♊ Storia {s.id} quasi identica a {original}, già elaborata: riuso le sue immagini")
+        job["rendered"] = list(source.get("rendered", []))
+        entry = self.ledger.record(s.id, getattr(s, "taken_at", None), image_path=self._saved_path(job),
+                                   image_hash=job["image_hash"], phash=job["phash"], duplicate_of=original,
+                                   ocr_text=source.get("ocr_text"), translated_text=source.get("translated_text"),
+                                   rendered=job["rendered"])
+        entry.pop("gate_rejected", None)
+        return True
+    
+    def _find_original(
+        self, story_id: Any, phash: str, image_hash: str, ocr_text: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Cerca una storia ripubblicata tra quelle già registrate e quelle in elaborazione.
+        
+        Args:
+            story_id: ID della storia, da non confrontare con la propria voce
+            phash: Impronta percettiva della storia
+            image_hash: Hash dei byte dell'immagine
+            ocr_text: Testo estratto (None prima dell'OCR: vale solo l'immagine identica)
+        
+        Returns:
+            ID della storia originale o None
+        """
+        entry = self.ledger.find_duplicate(phash, image_hash=image_hash, ocr_text=ocr_text, exclude=story_id)
+        if entry is not None:
+            return entry["story_id"]
+        for other_id, other in self._pending.items():
+            if StoryLedger.duplicate_distance(other, phash, image_hash, ocr_text) is not None:
+                return other_id
+        return None
+    
+    async def translate(self, jobs: List[dict]) -> List[dict]:
+        """Traduce insieme i testi delle storie pronte, con un'unica richiesta"""
+        pending = [job for job in jobs if "rendered" not in job]
+        if pending:
+            translations = await self.translator.translate_many([job["ocr_text"] for job in pending], dest='en')
+            for job, translated in zip(pending, translations):
+                job["translated_text"] = translated
+        return jobs
+    
+    async def render(self, job: dict) -> dict:
+        """Crea le immagini originale + tradotta e registra la storia"""
+        if "rendered" in job:
+            return job
+        
+        s = job["story"]
+        # Rendering fuori dall'event loop; le immagini nuove restano in memoria per l'invio
+        job["rendered"], job["images"], new = await asyncio.to_thread(
+            _render_story_images, job["ocr_text"], job["translated_text"]
+        )
+        # Salvataggio nella cache di rendering in background, per riusarle nelle esecuzioni successive
+        cache = get_render_cache()
+        for key, image in new.items():
+            self._writes.append(asyncio.create_task(asyncio.to_thread(cache.put, key, image)))
+        fields = {"duplicate_of": job["duplicate_of"]} if "duplicate_of" in job else {}
+        self.ledger.record(s.id, getattr(s, "taken_at", None), image_path=self._saved_path(job),
+                           image_hash=job["image_hash"], phash=job["phash"], ocr_text=job["ocr_text"],
+                           translated_text=job["translated_text"], rendered=job["rendered"], **fields)
+        logger.info(f"🖼 Create immagini per storia {s.id}")
+        return job
+    
+    async def deliver(self, jobs: List[dict]) -> List[dict]:
+        """Invia a tutte le chat le immagini delle storie pronte, appena arrivano quelle che le precedono"""
+        for job in jobs:
+            self._ready[job["index"]] = job
+        await self._send(self._release())
+        return []
+    
+    def _release(self, everything: bool = False) -> List[dict]:
+        """
+        Estrae dal buffer di riordino le storie pronte senza buchi prima di loro.
+        
+        Args:
+            everything: Estrae tutte le storie rimaste, saltando quelle mai arrivate
+        
+        Returns:
+            Storie da inviare, nell'ordine di Instagram
+        """
+        released = []
+        while self._ready and (everything or self._next_index in self._ready):
+            job = self._ready.pop(self._next_index, None)
+            if job is not None:
+                released.append(job)
+            self._next_index += 1
+        return released
+    
+    async def _send(self, jobs: List[dict]) -> None:
+        """Invia a tutte le chat le immagini delle storie indicate, in un'unica galleria"""
+        images = []
+        for job in jobs:
+            # Storie appena create: dalla memoria; storie già elaborate: dal disco
+            for path, image in zip(job["rendered"], job.get("images") or job["rendered"]):
+                # Le storie duplicate condividono i file con l'originale: ogni immagine parte una volta
+                if path in self._sent or (image is path and not os.path.exists(path)):
+                    continue
+                self._sent.add(path)
+                images.append(image)
+        if not images or not self.telegram or not self.chat_ids:
+            return
+        
+        logger.info(f"📤 Invio galleria ({len(images)} immagini)...")
+        await fan_out(self.telegram, self.chat_ids, images)
+        self.delivered += len(images)
+
+
+def _telegram_service() -> TelegramService:
+    """Servizio Telegram con riuso dei file_id e rate limiting per gli invii concorrenti"""
+    return TelegramService(
+        file_id_store=get_file_id_store(),
+        rate_limiter=TelegramRateLimiter()
+    )
+
+
+def _all_chats(subscribers: List[Any]) -> List[Any]:
+    """Chat principale + iscritti"""
+    return [TELEGRAM_CHAT_ID] + subscribers if TELEGRAM_CHAT_ID else subscribers
+
+
+async def _collect_jobs(cl: Client, ledger: StoryLedger, stories: Optional[List[Any]] = None) -> Optional[List[dict]]:
+    """
+    Pulisce le storie scadute, recupera quelle attive e prepara un job per ciascuna.
+    
+    Args:
+        cl: Client Instagram autenticato
+        ledger: Registro delle storie elaborate
+        stories: Storie già recuperate da Instagram (None = le recupera ora)
+    
+    Returns:
+        Job per il pipeline (le storie già elaborate hanno già `rendered`),
+        None se non è stato possibile ottenere le storie
+    """
+    # Rimuove solo le storie scadute: quelle ancora attive restano riutilizzabili
+    removed = await asyncio.to_thread(_prepare_directories, ledger)
+    logger.info(f"📁 Rimosse {removed} storie scadute")
+    
+    # --- Scarica stories ---
+    if stories is None:
+        try:
+            # instagrapi è sincrono: le chiamate di rete girano in un thread
+            stories = await asyncio.to_thread(_fetch_stories, cl)
+        except Exception as e:
+            logger.error(f"❌ Errore ottenimento stories: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    if not stories:
+        logger.warning("⚠️ Nessuna storia disponibile ora.")
+        return []
+    
+    # Le storie già elaborate entrano nel pipeline già pronte per l'invio
+    jobs = []
+    for s in stories:
+        if ledger.is_processed(s.id):
+            jobs.append({"story": s, "rendered": ledger.get(s.id)["rendered"]})
+        elif s.media_type == 1 and s.thumbnail_url:
+            jobs.append({"story": s})
+    new_count = sum(1 for job in jobs if "rendered" not in job)
+    logger.info(f"🆕 {new_count} storie nuove, {len(jobs) - new_count} già elaborate")
+    return jobs
+
+
+async def download_and_send_stories(cl: Client) -> None:
+    """
+    Scarica le storie di TARGET_USER, estrae testo, traduce, crea immagini e invia galleria su Telegram.
+    
+    Gli stadi lavorano in parallelo: il primo menu pronto parte verso gli iscritti
+    mentre le storie successive sono ancora in elaborazione.
+    
+    Args:
+        cl: Client Instagram autenticato
+    """
+    logger.info("🔎 Avvio download_and_send_stories()...")
+    
+    async with _pipeline_lock:
+        await _download_and_send_stories(cl)
+
+
+async def _download_and_send_stories(cl: Client, stories: Optional[List[Any]] = None) -> None:
+    """Corpo di download_and_send_stories, eseguito con il lock del pipeline"""
+    subscribers = await asyncio.to_thread(load_subscribers)
+    ledger = await asyncio.to_thread(StoryLedger)
+    
+    jobs = await _collect_jobs(cl, ledger, stories)
+    if not jobs:
+        if jobs is not None:
+            await asyncio.to_thread(ledger.save)
+        return
+    
+    try:
+        async with TranslationService() as translator, await asyncio.to_thread(_http_client) as http_client:
+            pipeline = StoryPipeline(ledger, translator, http_client, _telegram_service(), _all_chats(subscribers))
             try:
-                logger.info(f"🚀 Invio galleria a chat_id={chat_id}")
-                success = telegram.send_media_group(str(chat_id), images_to_send)
-                
-                if success:
-                    logger.info(f"✅ Invio completato a {chat_id}")
-                else:
-                    logger.error(f"❌ Invio fallito a {chat_id}")
-                
-                # Delay tra chat diverse per evitare rate limiting
-                if idx < len(all_chats) - 1:
-                    logger.info("⏳ Attendo 3s prima del prossimo invio...")
-                    time.sleep(3)
-                
-            except Exception as e:
-                logger.error(f"❌ Errore invio a {chat_id}: {e}")
+                await pipeline.run(jobs)
+            finally:
+                await pipeline.flush()
+    finally:
+        await asyncio.to_thread(ledger.save)
+    
+    if not pipeline.delivered:
+        logger.warning("⚠️ Nessuna immagine da inviare.")
+
+
+async def prepare_stories(cl: Client) -> int:
+    """
+    Fase di preparazione, eseguita in anticipo rispetto all'orario di invio:
+    scarica, estrae, traduce e crea le immagini delle storie nuove senza inviarle.
+    
+    Args:
+        cl: Client Instagram autenticato
+    
+    Returns:
+        Numero di immagini pronte per l'invio
+    """
+    logger.info("🔥 Preparazione storie in anticipo...")
+    
+    async with _pipeline_lock:
+        return await _prepare_stories(cl)
+
+
+async def _prepare_stories(cl: Client) -> int:
+    """Corpo di prepare_stories, eseguito con il lock del pipeline"""
+    ledger = await asyncio.to_thread(StoryLedger)
+    jobs = await _collect_jobs(cl, ledger)
+    if jobs is None:
+        return 0
+    
+    new_jobs = [job for job in jobs if "rendered" not in job]
+    try:
+        if new_jobs:
+            async with TranslationService() as translator, await asyncio.to_thread(_http_client) as http_client:
+                pipeline = StoryPipeline(ledger, translator, http_client, None, [])
+                try:
+                    await pipeline.run(new_jobs)
+                finally:
+                    await pipeline.flush()
+    finally:
+        await asyncio.to_thread(ledger.save)
+    
+    ready = len(ledger.rendered_images([job["story"].id for job in jobs]))
+    logger.info(f"✅ {ready} immagini pronte per l'invio")
+    return ready
+
+
+async def poll_stories(cl: Client) -> Optional[int]:
+    """
+    Controllo periodico delle storie: elabora subito quelle nuove, così agli
+    orari di invio il menu è già pronto. Salta il giro se un altro pipeline è in corso.
+    
+    Args:
+        cl: Client Instagram autenticato
+    
+    Returns:
+        Numero di immagini pronte, None se il controllo è stato saltato
+    """
+    if _pipeline_lock.locked():
+        logger.info("⏭️ Pipeline già in esecuzione, salto il controllo delle storie")
+        return None
+    return await prepare_stories(cl)
+
+
+async def deliver_stories(cl: Client) -> None:
+    """
+    Fase di invio, eseguita all'orario programmato: invia subito le immagini
+    preparate in anticipo. Se tra le storie attuali ce n'è qualcuna non ancora
+    elaborata (pubblicata dopo la preparazione), esegue l'intero pipeline.
+    
+    Args:
+        cl: Client Instagram autenticato
+    """
+    # Una preparazione ancora in corso salva il registro solo alla fine: si aspetta che finisca
+    async with _pipeline_lock:
+        await _deliver_stories(cl)
+
+
+async def _deliver_stories(cl: Client) -> None:
+    """Corpo di deliver_stories, eseguito con il lock del pipeline"""
+    subscribers = await asyncio.to_thread(load_subscribers)
+    ledger = await asyncio.to_thread(StoryLedger)
+    
+    try:
+        stories = await asyncio.to_thread(_fetch_stories, cl)
+    except Exception as e:
+        # Instagram non risponde: meglio le storie preparate che nessun menu
+        logger.error(f"❌ Errore ottenimento stories: {e}")
+        images = ledger.rendered_images(ledger.live_story_ids())
+    else:
+        missing = [
+            s for s in stories
+            if s.media_type == 1 and s.thumbnail_url and not ledger.is_processed(s.id)
+        ]
+        if missing:
+            logger.warning(f"⚠️ {len(missing)} storie non ancora preparate, avvio il pipeline completo")
+            await _download_and_send_stories(cl, stories)
+            return
+        # Solo le storie ancora pubblicate, nell'ordine di Instagram
+        images = ledger.rendered_images([s.id for s in stories])
+    
+    if not images:
+        logger.warning("⚠️ Nessuna immagine da inviare.")
+        return
+    
+    logger.info(f"📤 Invio di {len(images)} immagini preparate...")
+    await fan_out(_telegram_service(), _all_chats(subscribers), images)
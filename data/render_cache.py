@@ -0,0 +1,159 @@
+"""
+Cache su disco delle immagini già create, indicizzate per hash dei parametri di rendering
+"""
+import os
+import shutil
+import tempfile
+import threading
+from typing import Optional, Union
+
+from config import RENDER_CACHE_DIR, RENDER_CACHE_MAX_ENTRIES, RENDER_CACHE_MAX_BYTES
+from utils.image_processing import image_format
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Estensioni dei formati prodotti dalle codifiche (RENDER_ENCODINGS)
+IMAGE_EXTENSIONS = ("jpg", "png", "webp")
+_SUFFIXES = tuple(f".{extension}" for extension in IMAGE_EXTENSIONS)
+
+
+class RenderCache:
+    """
+    Directory di immagini `<chiave>.<formato>`, con l'estensione del formato della codifica (jpg, png o webp).
+    La data di modifica di ogni file segna l'ultimo utilizzo ed è usata per l'eviction LRU.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            directory: Directory in cui salvare le immagini
+            max_entries: Numero massimo di immagini da mantenere (None = illimitato)
+            max_bytes: Dimensione massima complessiva in byte (None = illimitata)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, extension: str = "jpg") -> str:
+        """Percorso dell'immagine associata alla chiave, nel formato indicato"""
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Restituisce il percorso dell'immagine in cache, segnandola come usata di recente.
+
+        Args:
+            key: Chiave di rendering
+
+        Returns:
+            Percorso dell'immagine o None
+        """
+        # La codifica "adaptive" può produrre formati diversi per la stessa chiave di parametri
+        for extension in IMAGE_EXTENSIONS:
+            path = self.path_for(key, extension)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self.hits += 1
+            return path
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, source: Union[str, bytes]) -> str:
+        """
+        Copia in cache un'immagine appena creata, in modo atomico.
+
+        Args:
+            key: Chiave di rendering
+            source: Percorso dell'immagine da salvare o suo contenuto
+
+        Returns:
+            Percorso dell'immagine in cache
+        """
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                header = f.read(12)
+        else:
+            header = source[:12]
+        path = self.path_for(key, image_format(header))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            if isinstance(source, str):
+                shutil.copyfile(source, tmp_path)
+            else:
+                with open(tmp_path, "wb") as f:
+                    f.write(source)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return path
+
+    def evict(self) -> int:
+        """
+        Rimuove le immagini usate meno di recente oltre max_entries o max_bytes.
+
+        Returns:
+            Numero di immagini rimosse
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(_SUFFIXES):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort(reverse=True)
+
+        removed = 0
+        total = 0
+        for index, (_, size, path) in enumerate(entries):
+            total += size
+            over_entries = self.max_entries is not None and index >= self.max_entries
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if over_entries or over_bytes:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"⚠️ Impossibile rimuovere {path}: {e}")
+
+        if removed:
+            logger.info(f"🧹 Rimosse {removed} immagini dalla cache di rendering")
+        return removed
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(_SUFFIXES))
+
+
+_render_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> RenderCache:
+    """
+    Restituisce la cache di rendering condivisa dall'applicazione.
+
+    Returns:
+        Istanza di RenderCache
+    """
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache(
+            RENDER_CACHE_DIR,
+            max_entries=RENDER_CACHE_MAX_ENTRIES,
+            max_bytes=RENDER_CACHE_MAX_BYTES
+        )
+        _render_cache.evict()
+    return _render_cache
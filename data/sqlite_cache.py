@@ -0,0 +1,205 @@
+"""
+Cache chiave/valore persistente su SQLite con eviction per numero di voci ed età
+"""
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class SQLiteCache:
+    """Cache su disco di stringhe indicizzate per chiave"""
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache",
+        max_entries: Optional[int] = None,
+        max_age: Optional[float] = None
+    ):
+        """
+        Args:
+            path: Percorso del database SQLite (":memory:" per una cache volatile)
+            table: Nome della tabella da usare
+            max_entries: Numero massimo di voci da mantenere (None = illimitato)
+            max_age: Età massima delle voci in secondi (None = nessuna scadenza)
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Nome tabella non valido: {table}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Restituisce il valore associato alla chiave, se presente e non scaduto.
+
+        Args:
+            key: Chiave da cercare
+
+        Returns:
+            Valore in cache o None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (self.max_age is not None and now - row[1] > self.max_age):
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Salva (o sovrascrive) un valore in cache.
+
+        Args:
+            key: Chiave
+            value: Valore da salvare
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Come get, per più chiavi con una sola query e un solo commit.
+
+        Args:
+            keys: Chiavi da cercare
+
+        Returns:
+            Dict chiave → valore delle sole chiavi presenti e non scadute
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found: Dict[str, str] = {}
+        with self._lock:
+            # SQLite limita il numero di parametri per query
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} "
+                    f"WHERE key IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self.max_age is None or now - created_at <= self.max_age:
+                        found[key] = value
+
+            if found:
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        """
+        Come set, per più voci con un solo commit.
+
+        Args:
+            items: Dict chiave → valore da salvare
+        """
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items.items()]
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        """
+        Rimuove una voce dalla cache, se presente.
+
+        Args:
+            key: Chiave da rimuovere
+        """
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self) -> int:
+        """
+        Rimuove le voci scadute e, oltre max_entries, quelle usate meno di recente.
+
+        Returns:
+            Numero di voci rimosse
+        """
+        removed = 0
+        with self._lock:
+            if self.max_age is not None:
+                cursor = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?",
+                    (time.time() - self.max_age,)
+                )
+                removed += cursor.rowcount
+
+            if self.max_entries is not None:
+                cursor = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key NOT IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                removed += cursor.rowcount
+
+            self._conn.commit()
+
+        if removed:
+            logger.info(f"🧹 Rimosse {removed} voci dalla cache {self.table}")
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self) -> None:
+        """Chiude la connessione al database"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,228 @@
+"""
+Registro delle storie già elaborate, per non riscaricarle né rielaborarle a ogni esecuzione
+"""
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config import STORY_LEDGER_FILE, STORY_TTL, DEDUP_MAX_DISTANCE
+from utils.perceptual_hash import hamming_distance
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class StoryLedger:
+    """
+    Registro persistente (JSON) delle storie elaborate.
+
+    Ogni voce contiene: story_id, taken_at, expires_at, image_path, image_hash,
+    phash (impronta percettiva), ocr_text, translated_text, rendered (percorsi delle
+    immagini create) e, per le storie quasi identiche a una precedente, duplicate_of.
+    Le storie scartate dal filtro pre-OCR (gate_rejected) non contano come elaborate.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Percorso del file JSON (default: STORY_LEDGER_FILE)
+        """
+        self.path = path or STORY_LEDGER_FILE
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Carica il registro da disco; un file mancante o corrotto equivale a un registro vuoto"""
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path, "r") as f:
+                content = f.read().strip()
+            entries = json.loads(content) if content else {}
+            if not isinstance(entries, dict):
+                raise ValueError("formato non valido")
+            return entries
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning(f"⚠️ Registro storie corrotto: {e}. Riparto da zero.")
+            return {}
+
+    def save(self) -> None:
+        """Salva il registro su disco in modo atomico"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, story_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Restituisce la voce di una storia, se presente.
+
+        Args:
+            story_id: ID della storia
+
+        Returns:
+            Voce del registro o None
+        """
+        return self.entries.get(str(story_id))
+
+    def is_processed(self, story_id: Any) -> bool:
+        """
+        Verifica se una storia è già stata elaborata e i suoi artefatti sono ancora su disco.
+
+        Args:
+            story_id: ID della storia
+
+        Returns:
+            True se la storia non va rielaborata
+        """
+        entry = self.get(story_id)
+        if entry is None or entry.get("gate_rejected"):
+            return False
+        return all(os.path.exists(path) for path in entry.get("rendered", []))
+
+    def record(self, story_id: Any, taken_at: Optional[datetime] = None, **fields: Any) -> Dict[str, Any]:
+        """
+        Registra (o aggiorna) una storia elaborata.
+
+        Args:
+            story_id: ID della storia
+            taken_at: Data di pubblicazione della storia (default: ora)
+            **fields: Campi da salvare (image_path, image_hash, phash, ocr_text, translated_text,
+                rendered, duplicate_of, gate_rejected)
+
+        Returns:
+            Voce del registro aggiornata
+        """
+        taken_ts = taken_at.timestamp() if taken_at else time.time()
+        entry = self.entries.setdefault(str(story_id), {"story_id": str(story_id), "rendered": []})
+        entry.update(fields)
+        entry["taken_at"] = taken_ts
+        entry["expires_at"] = taken_ts + STORY_TTL
+        return entry
+
+    def collect_garbage(self, now: Optional[float] = None) -> int:
+        """
+        Rimuove le storie scadute (oltre la finestra di 24h di Instagram) e i loro file.
+
+        Args:
+            now: Timestamp di riferimento (default: ora)
+
+        Returns:
+            Numero di storie rimosse
+        """
+        now = now if now is not None else time.time()
+        expired = [key for key, entry in self.entries.items() if entry.get("expires_at", 0) <= now]
+        removed = [self.entries.pop(key) for key in expired]
+        # Le immagini create stanno nella cache di rendering: storie con lo stesso testo condividono il file
+        in_use = {path for entry in self.entries.values() for path in entry.get("rendered", [])}
+
+        for entry in removed:
+            for path in [entry.get("image_path"), *entry.get("rendered", [])]:
+                if path and path not in in_use and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Impossibile rimuovere {path}: {e}")
+
+        if expired:
+            logger.info(f"🧹 Rimosse {len(expired)} storie scadute dal registro")
+        return len(expired)
+
+    def live_story_ids(self, now: Optional[float] = None) -> List[str]:
+        """
+        Restituisce le storie non ancora scadute, dalla più vecchia alla più recente.
+
+        Args:
+            now: Timestamp di riferimento (default: ora)
+
+        Returns:
+            ID delle storie ancora attive
+        """
+        now = now if now is not None else time.time()
+        live = [entry for entry in self.entries.values() if entry.get("expires_at", 0) > now]
+        live.sort(key=lambda entry: entry.get("taken_at", 0))
+        return [entry["story_id"] for entry in live]
+
+    @staticmethod
+    def duplicate_distance(entry: Dict[str, Any], phash: str, image_hash: Optional[str] = None,
+                           ocr_text: Optional[str] = None,
+                           max_distance: Optional[int] = None) -> Optional[int]:
+        """
+        Confronta una storia con una voce del registro. L'impronta vicina da sola non basta:
+        menu diversi sullo stesso modello grafico differiscono di pochi bit, per cui serve
+        anche l'immagine identica o lo stesso testo OCR.
+
+        Args:
+            entry: Voce del registro (o con gli stessi campi phash, image_hash, ocr_text)
+            phash: Impronta percettiva della nuova storia
+            image_hash: Hash dei byte della nuova storia
+            ocr_text: Testo estratto dalla nuova storia (None = non ancora estratto)
+            max_distance: Distanza di Hamming massima (default: DEDUP_MAX_DISTANCE)
+
+        Returns:
+            Distanza di Hamming tra le impronte, None se la storia non è un duplicato
+        """
+        if image_hash and entry.get("image_hash") == image_hash:
+            return 0
+        text = " ".join((ocr_text or "").split())
+        if not text or not entry.get("phash") or " ".join((entry.get("ocr_text") or "").split()) != text:
+            return None
+        max_distance = DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+        distance = hamming_distance(phash, entry["phash"])
+        return distance if distance <= max_distance else None
+
+    def find_duplicate(self, phash: str, image_hash: Optional[str] = None, ocr_text: Optional[str] = None,
+                       max_distance: Optional[int] = None, now: Optional[float] = None,
+                       exclude: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cerca tra le storie ancora attive quella più simile a una nuova storia (vedi duplicate_distance).
+        Le storie già segnate come duplicate non vengono considerate finché il loro originale
+        è nel registro: si risale sempre all'originale.
+        Nemmeno quelle scartate dal filtro pre-OCR, che non sono state elaborate.
+
+        Args:
+            phash: Impronta percettiva della nuova storia
+            image_hash: Hash dei byte della nuova storia
+            ocr_text: Testo estratto dalla nuova storia (None = conta solo l'immagine identica)
+            max_distance: Distanza di Hamming massima (default: DEDUP_MAX_DISTANCE)
+            now: Timestamp di riferimento (default: ora)
+            exclude: ID della storia stessa, da non confrontare con la propria voce
+
+        Returns:
+            Voce della storia originale o None
+        """
+        now = now if now is not None else time.time()
+        best, best_distance = None, None
+        for entry in self.entries.values():
+            if (entry["story_id"] == str(exclude) or entry.get("duplicate_of") in self.entries
+                    or entry.get("gate_rejected") or entry.get("expires_at", 0) <= now):
+                continue
+            distance = self.duplicate_distance(entry, phash, image_hash, ocr_text, max_distance)
+            if distance is not None and (best_distance is None or distance < best_distance):
+                best, best_distance = entry, distance
+        return best
+
+    def rendered_images(self, story_ids: List[Any]) -> List[str]:
+        """
+        Raccoglie le immagini create per le storie indicate, nell'ordine dato.
+        Le immagini condivise da più storie (duplicati, stesso testo) compaiono una volta sola.
+
+        Args:
+            story_ids: ID delle storie
+
+        Returns:
+            Percorsi delle immagini esistenti su disco
+        """
+        images = []
+        for story_id in story_ids:
+            entry = self.get(story_id)
+            for path in (entry or {}).get("rendered", []):
+                if path not in images and os.path.exists(path):
+                    images.append(path)
+        return images
@@ -0,0 +1,179 @@
+"""
+Cache delle traduzioni: LRU in memoria con persistenza su SQLite
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config import (
+    TRANSLATION_CACHE_FILE, TRANSLATION_CACHE_SIZE,
+    TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CACHE_MAX_AGE
+)
+from data.sqlite_cache import SQLiteCache
+from utils.file_operations import hash_bytes
+
+
+class TranslationCache:
+    """
+    Memorizza le traduzioni per testo sorgente normalizzato e lingua di destinazione.
+    Le letture e scritture su disco sono bloccanti: dal codice asincrono vanno eseguite
+    in un thread, preferibilmente a blocchi (get_many, set_many).
+    """
+
+    def __init__(self, store: Optional[SQLiteCache] = None, max_size: int = TRANSLATION_CACHE_SIZE):
+        """
+        Args:
+            store: Cache persistente su cui appoggiarsi (None = solo memoria)
+            max_size: Numero massimo di traduzioni tenute in memoria
+        """
+        self.store = store
+        self.max_size = max_size
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalizza il testo sorgente: forma Unicode NFC, spazi compattati, righe vuote rimosse.
+
+        Args:
+            text: Testo da normalizzare
+
+        Returns:
+            Testo normalizzato
+        """
+        text = unicodedata.normalize("NFC", text)
+        lines = (" ".join(line.split()) for line in text.splitlines())
+        return "\n".join(line for line in lines if line)
+
+    def key(self, text: str, dest: str) -> str:
+        """
+        Calcola la chiave di cache per un testo e una lingua.
+
+        Args:
+            text: Testo sorgente
+            dest: Lingua di destinazione
+
+        Returns:
+            Chiave di cache
+        """
+        return hash_bytes(f"{dest.lower()}\n{self.normalize(text)}".encode("utf-8"))
+
+    def get(self, text: str, dest: str) -> Optional[str]:
+        """
+        Cerca una traduzione prima in memoria e poi su disco.
+
+        Args:
+            text: Testo sorgente
+            dest: Lingua di destinazione
+
+        Returns:
+            Testo tradotto o None se non presente
+        """
+        return self.get_many([text], dest)[0]
+
+    def get_many(self, texts: List[str], dest: str) -> List[Optional[str]]:
+        """
+        Come get, per più testi: quelli non in memoria vengono cercati su disco con una sola query.
+
+        Args:
+            texts: Testi sorgente
+            dest: Lingua di destinazione
+
+        Returns:
+            Testi tradotti (None se non presenti), nello stesso ordine
+        """
+        keys = [self.key(text, dest) for text in texts]
+        results: List[Optional[str]] = []
+        with self._lock:
+            for key in keys:
+                translated = self._memory.get(key)
+                if translated is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                results.append(translated)
+
+        missing = [key for key, result in zip(keys, results) if result is None]
+        stored = self.store.get_many(missing) if self.store is not None and missing else {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                if results[i] is not None:
+                    continue
+                if key in stored:
+                    results[i] = stored[key]
+                    self._remember(key, stored[key])
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+        return results
+
+    def set(self, text: str, dest: str, translated: str) -> None:
+        """
+        Salva una traduzione in memoria e su disco.
+
+        Args:
+            text: Testo sorgente
+            dest: Lingua di destinazione
+            translated: Testo tradotto
+        """
+        self.set_many({text: translated}, dest)
+
+    def set_many(self, translations: Dict[str, str], dest: str) -> None:
+        """
+        Come set, per più traduzioni salvate su disco con un solo commit.
+
+        Args:
+            translations: Dict testo sorgente → testo tradotto
+            dest: Lingua di destinazione
+        """
+        items = {self.key(text, dest): translated for text, translated in translations.items()}
+        with self._lock:
+            for key, translated in items.items():
+                self._remember(key, translated)
+        if self.store is not None:
+            self.store.set_many(items)
+
+    def _remember(self, key: str, translated: str) -> None:
+        """Inserisce una voce nella LRU in memoria, scartando la meno recente se piena"""
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Contatori di hit (memoria/disco) e miss"""
+        return {
+            "hits": self.memory_hits + self.disk_hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+
+_translation_cache: Optional[TranslationCache] = None
+
+
+def get_translation_cache() -> TranslationCache:
+    """
+    Restituisce la cache delle traduzioni condivisa, che sopravvive tra un'esecuzione e l'altra.
+
+    Returns:
+        Istanza di TranslationCache
+    """
+    global _translation_cache
+    if _translation_cache is None:
+        store = SQLiteCache(
+            TRANSLATION_CACHE_FILE,
+            table="translations",
+            max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+            max_age=TRANSLATION_CACHE_MAX_AGE
+        )
+        store.evict()
+        _translation_cache = TranslationCache(store)
+    return _translation_cache
@@ -9,10 +9,10 @@ from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, Cha
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from config import TELEGRAM_TOKEN, DOWNLOAD_DIR, CREATED_IMAGES_DIR
+from config import TELEGRAM_TOKEN, DOWNLOAD_DIR, CREATED_IMAGES_DIR, STORY_POLL_INTERVAL, STORY_POLL_JITTER
 from services import InstagramService
 from bot import start_command, cancel_command, help_command, BotScheduler
-from core import download_and_send_stories 
+from core import download_and_send_stories, prepare_stories, poll_stories, deliver_stories, shutdown_ocr_executor
 from data.subscribers import load_subscribers, save_subscribers
 from utils.logger import setup_logger
 
@@ -68,11 +68,29 @@ async def handle_private_message(update: Update, context: ContextTypes.DEFAULT_T
             logger.info(f"📩 Utente privato iscritto: {chat.id}")
 
 
+async def scheduled_prepare(cl):
+    """Task eseguito dallo scheduler in anticipo rispetto agli orari configurati"""
+    try:
+        await prepare_stories(cl)
+    except Exception as e:
+        logger.error(f"❌ Errore durante la preparazione: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+async def scheduled_poll(cl):
+    """Controllo periodico delle storie nuove"""
+    try:
+        await poll_stories(cl)
+    except Exception as e:
+        logger.error(f"❌ Errore durante il controllo delle storie: {e}")
+
+
 async def scheduled_task(cl):
     """Task eseguito dallo scheduler agli orari configurati"""
     try:
         logger.info("⏰ Esecuzione schedulata avviata")
-        await download_and_send_stories(cl)
+        await deliver_stories(cl)
         logger.info("✅ Esecuzione schedulata completata")
     except Exception as e:
         logger.error(f"❌ Errore durante esecuzione schedulata: {e}")
@@ -99,6 +117,9 @@ async def shutdown():
         scheduler.stop()
         logger.info("✅ Scheduler fermato")
     
+    # Chiude il pool OCR
+    shutdown_ocr_executor()
+    
     logger.info("👋 Shutdown completato con successo")
 
 
@@ -132,8 +153,19 @@ async def main():
             traceback.print_exc()
         
         # Setup scheduler
+        # I task girano nel thread dello scheduler: le coroutine vanno affidate al loop principale
+        loop = asyncio.get_running_loop()
         scheduler = BotScheduler()
-        scheduler.add_default_schedules(lambda: asyncio.create_task(scheduled_task(cl)))
+        scheduler.add_default_schedules(
+            lambda: asyncio.run_coroutine_threadsafe(scheduled_task(cl), loop),
+            prepare_task=lambda: asyncio.run_coroutine_threadsafe(scheduled_prepare(cl), loop)
+        )
+        if STORY_POLL_INTERVAL > 0:
+            scheduler.add_interval_task(
+                lambda: asyncio.run_coroutine_threadsafe(scheduled_poll(cl), loop),
+                STORY_POLL_INTERVAL,
+                jitter=STORY_POLL_JITTER
+            )
         scheduler.start()
         
         # Setup bot Telegram
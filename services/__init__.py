@@ -3,5 +3,6 @@ Services package
 """
 from .instagram_service import InstagramService
 from .telegram_service import TelegramService
+from .translation_service import TranslationService
 
-__all__ = ['InstagramService', 'TelegramService']
+__all__ = ['InstagramService', 'TelegramService', 'TranslationService']
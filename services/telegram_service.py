@@ -4,9 +4,16 @@ Servizio per invio messaggi Telegram
 import json
 import time
 import requests
-from typing import List, Optional
-from config import TELEGRAM_TOKEN, TELEGRAM_BATCH_SIZE
+from typing import Any, Dict, List, Optional, Union
+from config import (
+    TELEGRAM_TOKEN, TELEGRAM_BATCH_SIZE,
+    TELEGRAM_FILE_ID_CACHE_FILE, FILE_ID_CACHE_MAX_ENTRIES, FILE_ID_CACHE_MAX_AGE
+)
+from data.sqlite_cache import SQLiteCache
+from utils.file_operations import hash_bytes
+from utils.image_processing import image_format
 from utils.logger import setup_logger
+from utils.rate_limiter import TelegramRateLimiter
 
 logger = setup_logger(__name__)
 
@@ -14,16 +21,110 @@ logger = setup_logger(__name__)
 MAX_RETRIES = 3
 BASE_DELAY = 2  # secondi tra invii
 RATE_LIMIT_DELAY = 5  # secondi extra quando si riceve 429
+# Descrizioni di un 400 dovuto a un file_id non più valido (solo allora va dimenticato)
+FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "file reference", "file_reference")
+
+# Immagine da inviare: percorso su disco o contenuto JPEG già in memoria
+ImageSource = Union[str, bytes]
+
+
+_file_id_store: Optional[SQLiteCache] = None
+
+
+def get_file_id_store() -> SQLiteCache:
+    """
+    Restituisce l'archivio persistente dei file_id Telegram, indicizzati per contenuto dell'immagine.
+    
+    Returns:
+        Cache SQLite condivisa
+    """
+    global _file_id_store
+    if _file_id_store is None:
+        _file_id_store = SQLiteCache(
+            TELEGRAM_FILE_ID_CACHE_FILE,
+            table="file_ids",
+            max_entries=FILE_ID_CACHE_MAX_ENTRIES,
+            max_age=FILE_ID_CACHE_MAX_AGE
+        )
+        _file_id_store.evict()
+    return _file_id_store
 
 
 class TelegramService:
     """Gestisce l'invio di messaggi e media su Telegram"""
     
-    def __init__(self, token: Optional[str] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        file_id_store: Optional[SQLiteCache] = None,
+        rate_limiter: Optional[TelegramRateLimiter] = None
+    ):
+        """
+        Args:
+            token: Token del bot (default: TELEGRAM_TOKEN)
+            file_id_store: Archivio persistente dei file_id già caricati (None = solo memoria)
+            rate_limiter: Limitatore condiviso tra invii concorrenti (None = solo pause fisse)
+        """
         self.token = token or TELEGRAM_TOKEN
         if not self.token:
             raise ValueError("TELEGRAM_TOKEN non configurato")
         self.base_url = f"https://api.telegram.org/bot{self.token}"
+        self.file_id_store = file_id_store
+        self.rate_limiter = rate_limiter
+        self.file_ids: Dict[str, str] = {}
+        self._digests: Dict[ImageSource, str] = {}
+    
+    def _digest(self, image: ImageSource) -> str:
+        """Impronta del contenuto di un'immagine, calcolata una sola volta per percorso o buffer"""
+        if image not in self._digests:
+            if isinstance(image, str):
+                with open(image, "rb") as f:
+                    self._digests[image] = hash_bytes(f.read())
+            else:
+                self._digests[image] = hash_bytes(image)
+        return self._digests[image]
+    
+    def _get_file_id(self, digest: str) -> Optional[str]:
+        """Restituisce il file_id Telegram di un'immagine già caricata, se noto"""
+        if digest not in self.file_ids and self.file_id_store is not None:
+            file_id = self.file_id_store.get(digest)
+            if file_id:
+                self.file_ids[digest] = file_id
+        return self.file_ids.get(digest)
+    
+    def _remember_file_ids(self, digests: List[str], response: Any) -> None:
+        """
+        Salva i file_id delle foto restituite da sendMediaGroup.
+        
+        Args:
+            digests: Impronte delle immagini del batch, nello stesso ordine
+            response: Risposta HTTP di sendMediaGroup
+        """
+        try:
+            messages = response.json().get("result")
+        except Exception:
+            return
+        if not isinstance(messages, list) or len(messages) != len(digests):
+            return
+        
+        for digest, message in zip(digests, messages):
+            photos = message.get("photo") if isinstance(message, dict) else None
+            if not photos:
+                continue
+            # L'ultima dimensione è quella a risoluzione più alta
+            file_id = photos[-1].get("file_id")
+            if not file_id or self.file_ids.get(digest) == file_id:
+                continue
+            self.file_ids[digest] = file_id
+            if self.file_id_store is not None:
+                self.file_id_store.set(digest, file_id)
+    
+    def _forget_file_ids(self, digests: List[str]) -> None:
+        """Dimentica i file_id di un batch rifiutato, così il retry ricarica le immagini"""
+        for digest in digests:
+            self.file_ids.pop(digest, None)
+            if self.file_id_store is not None:
+                self.file_id_store.delete(digest)
     
     def send_message(self, chat_id: str, text: str) -> bool:
         """
@@ -48,7 +149,7 @@ class TelegramService:
             logger.error(f"❌ Errore invio messaggio: {e}")
             return False
     
-    def send_media_group(self, chat_id: str, image_paths: List[str]) -> bool:
+    def send_media_group(self, chat_id: str, image_paths: List[ImageSource]) -> bool:
         """
         Invia un gruppo di immagini a una chat Telegram.
         Divide automaticamente in batch se supera il limite di Telegram.
@@ -56,7 +157,8 @@ class TelegramService:
         
         Args:
             chat_id: ID della chat destinataria
-            image_paths: Lista di percorsi delle immagini da inviare
+            image_paths: Immagini da inviare: percorsi su disco o contenuti già in memoria,
+                caricati così come sono senza passare dal disco
         
         Returns:
             True se l'invio è riuscito, False altrimenti
@@ -84,7 +186,12 @@ class TelegramService:
                         # Rate limiting: aspetta più a lungo
                         retry_after = result.get("retry_after", RATE_LIMIT_DELAY)
                         logger.warning(f"⏳ Rate limit raggiunto, attendo {retry_after}s prima del retry {attempt + 1}/{MAX_RETRIES}")
+                        if self.rate_limiter:
+                            # Sospende anche gli invii paralleli verso le altre chat
+                            self.rate_limiter.backoff(retry_after)
                         time.sleep(retry_after)
+                    elif result.get("permanent"):
+                        break
                     else:
                         # Altro errore: exponential backoff
                         wait_time = BASE_DELAY * (2 ** attempt)
@@ -92,11 +199,11 @@ class TelegramService:
                         time.sleep(wait_time)
                 
                 if not success:
-                    logger.error(f"❌ Invio fallito dopo {MAX_RETRIES} tentativi")
+                    logger.error(f"❌ Invio fallito a chat_id={chat_id}")
                     return False
                 
-                # Delay tra batch per evitare rate limiting
-                if batch_idx < (len(image_paths) // TELEGRAM_BATCH_SIZE):
+                # Delay tra batch per evitare rate limiting (il rate limiter, se presente, lo gestisce da sé)
+                if not self.rate_limiter and batch_idx < (len(image_paths) // TELEGRAM_BATCH_SIZE):
                     time.sleep(BASE_DELAY)
             
             logger.info(f"✅ Invio completato a chat_id={chat_id}")
@@ -106,31 +213,46 @@ class TelegramService:
             logger.error(f"❌ Errore invio media group: {e}")
             return False
     
-    def _send_batch(self, chat_id: str, image_paths: List[str]) -> dict:
+    def _send_batch(self, chat_id: str, image_paths: List[ImageSource]) -> dict:
         """
         Invia un singolo batch di immagini.
         
         Args:
             chat_id: ID della chat
-            image_paths: Lista di percorsi immagini (max 10)
+            image_paths: Percorsi o contenuti delle immagini (max 10)
         
         Returns:
             Dict con:
             - success (bool): True se successo
             - rate_limited (bool): True se errore 429
             - retry_after (int): Secondi da attendere prima del retry
+            - permanent (bool): True se riprovare è inutile (es. 403, bot bloccato dall'utente)
         """
         media_group = []
         files = {}
+        digests = [self._digest(img_path) for img_path in image_paths]
+        reused = []
         
-        # Prepara media group
-        for i, img_path in enumerate(image_paths):
+        # Prepara media group: le immagini già caricate vengono inviate per file_id
+        for i, (img_path, digest) in enumerate(zip(image_paths, digests)):
+            file_id = self._get_file_id(digest)
+            if file_id:
+                media_group.append({"type": "photo", "media": file_id})
+                reused.append(digest)
+                continue
+            
             attach_name = f"file{i}"
             media_group.append({
                 "type": "photo",
                 "media": f"attach://{attach_name}"
             })
-            files[attach_name] = open(img_path, "rb")
+            if isinstance(img_path, str):
+                files[attach_name] = open(img_path, "rb")
+            else:
+                # Lo stesso buffer viene riusato, senza copie, per tutte le chat
+                extension = image_format(img_path)
+                mime_type = "image/jpeg" if extension == "jpg" else f"image/{extension}"
+                files[attach_name] = (f"{attach_name}.{extension}", img_path, mime_type)
         
         # Invia richiesta
         payload = {
@@ -139,6 +261,10 @@ class TelegramService:
         }
         
         try:
+            if self.rate_limiter:
+                # Ogni foto dell'album conta come un messaggio
+                self.rate_limiter.acquire(chat_id, len(image_paths))
+            
             response = requests.post(
                 f"{self.base_url}/sendMediaGroup",
                 data=payload,
@@ -146,9 +272,10 @@ class TelegramService:
                 timeout=30
             )
             
-            logger.info(f"📦 Batch inviato (status {response.status_code})")
+            logger.info(f"📦 Batch inviato (status {response.status_code}, {len(reused)}/{len(digests)} per file_id)")
             
             if response.status_code == 200:
+                self._remember_file_ids(digests, response)
                 return {"success": True, "rate_limited": False}
             
             # Gestione rate limiting (429)
@@ -171,6 +298,14 @@ class TelegramService:
             
             # Altri errori
             logger.error(f"❌ Errore Telegram: {response.text}")
+            
+            # Chat che ha bloccato il bot o non è più raggiungibile: i file_id restano validi
+            if response.status_code == 403:
+                return {"success": False, "rate_limited": False, "permanent": True}
+            
+            # Solo un file_id rifiutato va dimenticato, così il retry ricarica le immagini
+            if response.status_code == 400 and any(error in str(response.text).lower() for error in FILE_ID_ERRORS):
+                self._forget_file_ids(reused)
             return {"success": False, "rate_limited": False}
             
         except Exception as e:
@@ -179,4 +314,5 @@ class TelegramService:
         finally:
             # Chiudi tutti i file aperti
             for f in files.values():
-                f.close()
+                if not isinstance(f, tuple):
+                    f.close()
@@ -0,0 +1,137 @@
+"""
+Servizio di traduzione con cache davanti a googletrans
+"""
+import asyncio
+import googletrans
+from typing import Any, Dict, List, Optional
+
+from config import TRANSLATION_CHUNK_CHARS
+
+from data.translation_cache import TranslationCache, get_translation_cache
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TranslationService:
+    """Traduce testi evitando di richiamare la rete per testi già tradotti"""
+
+    def __init__(self, cache: Optional[TranslationCache] = None, translator: Any = None):
+        """
+        Args:
+            cache: Cache delle traduzioni (default: cache condivisa persistente)
+            translator: Traduttore da usare (default: googletrans.Translator)
+        """
+        self.cache = cache if cache is not None else get_translation_cache()
+        self._translator = translator
+        self._owns_translator = translator is None
+
+    async def __aenter__(self) -> "TranslationService":
+        if self._translator is None:
+            self._translator = googletrans.Translator()
+        if self._owns_translator:
+            await self._translator.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._owns_translator and self._translator is not None:
+            await self._translator.__aexit__(exc_type, exc, tb)
+            self._translator = None
+
+        stats = self.cache.stats
+        logger.info(
+            f"📊 Cache traduzioni: {stats['hits']} hit "
+            f"({stats['memory_hits']} memoria, {stats['disk_hits']} disco), {stats['misses']} miss"
+        )
+
+    async def translate(self, text: str, dest: str = "en") -> str:
+        """
+        Traduce un testo, usando la cache quando possibile.
+
+        Args:
+            text: Testo da tradurre
+            dest: Lingua di destinazione
+
+        Returns:
+            Testo tradotto
+        """
+        return (await self.translate_many([text], dest=dest))[0]
+
+    async def translate_many(self, texts: List[str], dest: str = "en") -> List[str]:
+        """
+        Traduce più testi con il minimo di richieste: le righe uguali tra testi diversi
+        vengono tradotte una sola volta, e tutte le righe mancanti dalla cache
+        viaggiano insieme in blocchi da al massimo TRANSLATION_CHUNK_CHARS caratteri.
+        La cache su disco viene letta e scritta a blocchi, in un thread.
+
+        Args:
+            texts: Testi da tradurre
+            dest: Lingua di destinazione
+
+        Returns:
+            Testi tradotti, nello stesso ordine
+        """
+        results: List[Optional[str]] = await asyncio.to_thread(self.cache.get_many, texts, dest)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        # Righe uniche (normalizzate) dei testi non in cache
+        unique = list(dict.fromkeys(
+            line for i in pending for line in map(self.cache.normalize, texts[i].splitlines()) if line
+        ))
+        lines: Dict[str, Optional[str]] = dict(zip(unique, await asyncio.to_thread(self.cache.get_many, unique, dest)))
+
+        # Nuove traduzioni, salvate tutte insieme alla fine
+        new: Dict[str, str] = {}
+        missing = [line for line, translated in lines.items() if translated is None]
+        if missing:
+            if self._translator is None:
+                raise RuntimeError("TranslationService va usato come context manager (async with)")
+
+            for chunk in self._chunks(missing):
+                for line, translated in zip(chunk, await self._translate_chunk(chunk, dest)):
+                    lines[line] = new[line] = translated
+            logger.info(f"🌍 Tradotte {len(missing)} righe uniche da {len(pending)} testi")
+
+        for i in pending:
+            # Le righe vuote restano al loro posto per non alterare l'impaginazione
+            translated = "\n".join(
+                lines[line] if line else ""
+                for line in (self.cache.normalize(raw) for raw in texts[i].splitlines())
+            )
+            new[texts[i]] = translated
+            results[i] = translated
+
+        await asyncio.to_thread(self.cache.set_many, new, dest)
+        return results
+
+    @staticmethod
+    def _chunks(lines: List[str]) -> List[List[str]]:
+        """Raggruppa le righe in blocchi che rispettano il limite di caratteri per richiesta"""
+        chunks: List[List[str]] = []
+        size = 0
+        for line in lines:
+            if chunks and size + len(line) + 1 <= TRANSLATION_CHUNK_CHARS:
+                chunks[-1].append(line)
+                size += len(line) + 1
+            else:
+                chunks.append([line])
+                size = len(line)
+        return chunks
+
+    async def _translate_chunk(self, chunk: List[str], dest: str) -> List[str]:
+        """
+        Traduce un blocco di righe con un'unica richiesta.
+
+        Se il servizio non restituisce lo stesso numero di righe, ripiega sulla
+        traduzione riga per riga per non disallineare originale e traduzione.
+        """
+        translated = await self._translator.translate("\n".join(chunk), dest=dest)
+        result = translated.text.split("\n")
+        if len(result) == len(chunk):
+            return result
+
+        logger.warning(f"⚠️ Traduzione a blocco disallineata ({len(result)}/{len(chunk)} righe), ripiego riga per riga")
+        translated = await self._translator.translate(chunk, dest=dest)
+        return [t.text for t in translated]
@@ -0,0 +1,83 @@
+"""
+Test suite per core.dispatcher
+"""
+import time
+import threading
+import pytest
+from unittest.mock import Mock
+from core.dispatcher import fan_out
+
+
+@pytest.fixture
+def telegram():
+    """Mock di TelegramService"""
+    service = Mock()
+    service.send_media_group = Mock(return_value=True)
+    return service
+
+
+class TestFanOut:
+    """Test per fan_out"""
+
+    @pytest.mark.asyncio
+    async def test_sends_to_every_chat(self, telegram):
+        """Verifica invio a tutte le chat"""
+        stats = await fan_out(telegram, [1, 2, 3], ["a.jpg"])
+
+        assert stats["sent"] == 3
+        assert stats["failed"] == 0
+        sent_to = sorted(call.args[0] for call in telegram.send_media_group.call_args_list)
+        assert sent_to == ["1", "2", "3"]
+
+    @pytest.mark.asyncio
+    async def test_first_chat_is_served_alone(self, telegram):
+        """Verifica che la prima chat venga servita prima delle altre (upload + file_id)"""
+        order = []
+        lock = threading.Lock()
+
+        def send(chat_id, images):
+            with lock:
+                order.append(("start", chat_id))
+            time.sleep(0.02)
+            with lock:
+                order.append(("end", chat_id))
+            return True
+
+        telegram.send_media_group.side_effect = send
+
+        await fan_out(telegram, ["first", "b", "c"], ["a.jpg"])
+
+        assert order[:2] == [("start", "first"), ("end", "first")]
+
+    @pytest.mark.asyncio
+    async def test_sends_concurrently(self, telegram):
+        """Verifica che le chat successive alla prima vengano servite in parallelo"""
+        telegram.send_media_group.side_effect = lambda chat_id, images: time.sleep(0.1) or True
+
+        stats = await fan_out(telegram, list(range(9)), ["a.jpg"], concurrency=8)
+
+        # 1 invio iniziale + 8 in parallelo ≈ 0.2s, contro 0.9s in serie
+        assert stats["elapsed"] < 0.6
+
+    @pytest.mark.asyncio
+    async def test_counts_failures_and_exceptions(self, telegram):
+        """Verifica conteggio di invii falliti ed eccezioni"""
+        def send(chat_id, images):
+            if chat_id == "2":
+                raise RuntimeError("boom")
+            return chat_id != "3"
+
+        telegram.send_media_group.side_effect = send
+
+        stats = await fan_out(telegram, [1, 2, 3], ["a.jpg"])
+
+        assert stats["sent"] == 1
+        assert stats["failed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_handles_no_chats(self, telegram):
+        """Verifica gestione lista chat vuota"""
+        stats = await fan_out(telegram, [], ["a.jpg"])
+
+        assert stats["sent"] == 0
+        telegram.send_media_group.assert_not_called()
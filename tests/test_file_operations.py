@@ -4,7 +4,10 @@ Test suite per utils.file_operations
 import os
 import pytest
 from pathlib import Path
-from utils.file_operations import save_bytes_to_file, clean_directory
+import hashlib
+from utils.file_operations import (
+    save_bytes_to_file, read_bytes_from_file, clean_directory, hash_bytes, hash_file
+)
 
 
 @pytest.fixture
@@ -82,6 +85,41 @@ class TestSaveBytesToFile:
         assert file_path.exists()
 
 
+class TestReadBytesFromFile:
+    """Test per la funzione read_bytes_from_file"""
+    
+    def test_reads_saved_bytes(self, temp_dir):
+        """Verifica lettura del contenuto salvato"""
+        file_path = temp_dir / "story.jpg"
+        save_bytes_to_file(b"\x00\xffimg", str(file_path))
+        
+        assert read_bytes_from_file(str(file_path)) == b"\x00\xffimg"
+    
+    def test_raises_for_missing_file(self, temp_dir):
+        """Verifica errore per file inesistente"""
+        with pytest.raises(FileNotFoundError):
+            read_bytes_from_file(str(temp_dir / "missing.jpg"))
+
+
+class TestHashing:
+    """Test per hash_bytes e hash_file"""
+    
+    def test_hash_bytes_is_sha256(self):
+        """Verifica che hash_bytes restituisca lo SHA-256"""
+        assert hash_bytes(b"menu") == hashlib.sha256(b"menu").hexdigest()
+    
+    def test_hash_file_matches_hash_bytes(self, temp_dir):
+        """Verifica che hash_file e hash_bytes coincidano sullo stesso contenuto"""
+        file_path = temp_dir / "story.jpg"
+        file_path.write_bytes(b"fake_image_data")
+        
+        assert hash_file(str(file_path)) == hash_bytes(b"fake_image_data")
+    
+    def test_different_content_different_hash(self):
+        """Verifica hash diversi per contenuti diversi"""
+        assert hash_bytes(b"a") != hash_bytes(b"b")
+
+
 class TestCleanDirectory:
     """Test per la funzione clean_directory"""
     
@@ -170,3 +208,18 @@ class TestCleanDirectory:
         # Questo è il comportamento attuale dell'implementazione
         assert count == 2
         assert len(list(temp_dir.iterdir())) == 0
+    
+    def test_max_age_removes_only_old_files(self, temp_dir):
+        """Verifica che con max_age vengano rimossi solo i file vecchi"""
+        old_file = temp_dir / "old.jpg"
+        new_file = temp_dir / "new.jpg"
+        old_file.write_text("old")
+        new_file.write_text("new")
+        old_time = os.path.getmtime(old_file) - 3600
+        os.utime(old_file, (old_time, old_time))
+        
+        count = clean_directory(str(temp_dir), max_age=600)
+        
+        assert count == 1
+        assert not old_file.exists()
+        assert new_file.exists()
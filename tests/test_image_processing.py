@@ -1,10 +1,17 @@
 """
 Test suite per utils.image_processing
 """
+import io
 import os
+import threading
 import pytest
-from PIL import Image
-from utils.image_processing import create_long_image
+from unittest.mock import patch
+from data.render_cache import RenderCache
+from PIL import Image, ImageDraw
+from utils.image_processing import (
+    create_long_image, add_watermark, fit_font_size, get_font, measure_text, base_canvas, _base_canvas,
+    render_many, render_key, render_text_image, encode_image, image_format, fits_combined_layout
+)
 
 
 @pytest.fixture
@@ -280,4 +287,378 @@ class TestEdgeCases:
         
         result = create_long_image(text_with_tabs, str(output_path))
         
-        assert os.path.exists(result)
\ No newline at end of file
+        assert os.path.exists(result)
+
+
+class TestFontFitting:
+    """Test per cache dei font e ricerca della dimensione"""
+    
+    def test_font_loaded_once_per_size(self):
+        """Verifica che lo stesso font non venga ricaricato da disco"""
+        assert get_font(57) is get_font(57)
+    
+    def test_picks_largest_fitting_size(self, sample_text):
+        """Verifica che la dimensione trovata sia la più grande che entra"""
+        width, height = 600, 400
+        size = fit_font_size(sample_text, width, height, 10, 120)
+        
+        fits = lambda s: measure_text(sample_text, s)[0] <= width and measure_text(sample_text, s)[1] <= height
+        assert fits(size)
+        assert not fits(size + 1)
+    
+    def test_returns_max_when_text_fits(self):
+        """Verifica che un testo corto usi la dimensione massima"""
+        assert fit_font_size("PASTA", 1000, 1000, 40, 80) == 80
+    
+    def test_returns_min_when_text_never_fits(self, sample_text):
+        """Verifica che un testo troppo lungo usi la dimensione minima"""
+        assert fit_font_size(sample_text * 50, 100, 100, 40, 80) == 40
+    
+    def test_few_measurements(self, sample_text):
+        """Verifica che la bisezione misuri il testo poche volte"""
+        measure_text.cache_clear()
+        with patch('utils.image_processing.ImageDraw.Draw', wraps=ImageDraw.Draw) as draw:
+            fit_font_size(sample_text + "\nCONTORNO", 900, 1700, 40, 80)
+        
+        assert draw.call_count <= 6
+
+
+class TestBaseCanvas:
+    """Test per lo sfondo con logo in cache"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Svuota la cache degli sfondi tra un test e l'altro"""
+        _base_canvas.cache_clear()
+        yield
+        _base_canvas.cache_clear()
+    
+    @pytest.fixture
+    def logo_path(self, tmp_path):
+        """Logo PNG di test"""
+        path = tmp_path / "logo.png"
+        Image.new("RGBA", (200, 200), (0, 0, 255, 255)).save(path)
+        return str(path)
+    
+    def test_logo_composited_once(self, temp_output_dir, sample_text, logo_path):
+        """Verifica che il logo venga rasterizzato una sola volta per più immagini"""
+        with patch('utils.image_processing.add_watermark', wraps=add_watermark) as watermark:
+            for i in range(3):
+                create_long_image(sample_text, str(temp_output_dir / f"{i}.jpg"), logo_image_path=logo_path)
+        
+        assert watermark.call_count == 1
+    
+    def test_returns_independent_copies(self):
+        """Verifica che disegnare su uno sfondo non modifichi quello in cache"""
+        first = base_canvas(100, 100, (255, 140, 0))
+        first.putpixel((0, 0), (0, 0, 0))
+        
+        assert base_canvas(100, 100, (255, 140, 0)).getpixel((0, 0)) == (255, 140, 0)
+    
+    def test_modified_logo_invalidates_cache(self, logo_path):
+        """Verifica che un logo modificato su disco venga rasterizzato di nuovo"""
+        base_canvas(400, 400, (255, 140, 0), logo_image_path=logo_path)
+        Image.new("RGBA", (200, 200), (255, 0, 0, 255)).save(logo_path)
+        os.utime(logo_path, (0, 0))
+        
+        canvas = base_canvas(400, 400, (255, 140, 0), logo_image_path=logo_path)
+        
+        assert _base_canvas.cache_info().misses == 2
+        red, green, blue = canvas.getpixel((330, 330))
+        assert red > blue
+    
+    def test_logo_drawn_in_corner(self, temp_output_dir, sample_text, logo_path):
+        """Verifica che il logo composto compaia nell'immagine finale"""
+        output_path = temp_output_dir / "logo.jpg"
+        create_long_image(sample_text, str(output_path), bg_color=(255, 255, 255), logo_image_path=logo_path)
+        
+        red, green, blue = Image.open(output_path).getpixel((1000, 1840))
+        assert blue > red
+    
+    def test_without_logo(self, temp_output_dir, sample_text):
+        """Verifica che senza logo l'angolo resti del colore di sfondo"""
+        output_path = temp_output_dir / "nologo.jpg"
+        create_long_image(sample_text, str(output_path), bg_color=(255, 255, 255), add_logo=False)
+        
+        assert Image.open(output_path).getpixel((1040, 1880)) == (255, 255, 255)
+
+
+class TestRenderCache:
+    """Test per il riuso delle immagini già create"""
+    
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Cache di rendering temporanea"""
+        return RenderCache(str(tmp_path / "render_cache"))
+    
+    def test_identical_text_not_rendered_twice(self, temp_output_dir, sample_text, cache):
+        """Verifica che lo stesso testo con gli stessi parametri venga copiato dalla cache"""
+        first = temp_output_dir / "first.jpg"
+        second = temp_output_dir / "second.jpg"
+        create_long_image(sample_text, str(first), cache=cache)
+        
+        with patch('utils.image_processing.base_canvas') as canvas:
+            create_long_image(sample_text.lower(), str(second), cache=cache)
+        
+        canvas.assert_not_called()
+        assert first.read_bytes() == second.read_bytes()
+        assert cache.hits == 1
+    
+    def test_different_parameters_rendered(self, temp_output_dir, sample_text, cache):
+        """Verifica che parametri diversi producano un'immagine nuova"""
+        create_long_image(sample_text, str(temp_output_dir / "a.jpg"), cache=cache)
+        create_long_image(sample_text, str(temp_output_dir / "b.jpg"), bg_color=(0, 0, 0), cache=cache)
+        
+        assert cache.hits == 0
+        assert len(cache) == 2
+
+
+class TestRenderMany:
+    """Test per render_many"""
+    
+    def test_results_in_job_order(self, temp_output_dir):
+        """Verifica che i percorsi restituiti rispettino l'ordine dei job"""
+        jobs = [{"text": f"MENU {i}", "output_path": str(temp_output_dir / f"{i}.jpg")} for i in range(5)]
+        
+        result = render_many(jobs, add_logo=False)
+        
+        assert result == [job["output_path"] for job in jobs]
+        assert all(os.path.exists(path) for path in result)
+    
+    def test_job_parameters_override_common(self, temp_output_dir):
+        """Verifica che i parametri del singolo job prevalgano su quelli comuni"""
+        jobs = [
+            {"text": "A", "output_path": str(temp_output_dir / "a.jpg")},
+            {"text": "B", "output_path": str(temp_output_dir / "b.jpg"), "bg_color": (0, 0, 255)},
+        ]
+        
+        render_many(jobs, add_logo=False, bg_color=(255, 0, 0))
+        
+        assert Image.open(jobs[0]["output_path"]).getpixel((5, 5))[0] > 200
+        assert Image.open(jobs[1]["output_path"]).getpixel((5, 5))[2] > 200
+    
+    def test_renders_on_thread_pool(self, temp_output_dir):
+        """Verifica che i job vengano eseguiti fuori dal thread chiamante"""
+        threads = set()
+        
+        def fake_render(text, output_path, **kwargs):
+            threads.add(threading.current_thread().name)
+            return output_path
+        
+        with patch('utils.image_processing.create_long_image', side_effect=fake_render):
+            render_many([{"text": "A", "output_path": "a"}, {"text": "B", "output_path": "b"}])
+        
+        assert threading.current_thread().name not in threads
+        assert all(name.startswith("render") for name in threads)
+    
+    def test_propagates_errors(self, temp_output_dir):
+        """Verifica che l'errore di un job venga sollevato al chiamante"""
+        jobs = [
+            {"text": "A", "output_path": str(temp_output_dir / "a.jpg")},
+            {"text": "B", "output_path": str(temp_output_dir / "missing" / "b.jpg")},
+        ]
+        
+        with pytest.raises(OSError):
+            render_many(jobs, add_logo=False)
+    
+    def test_fonts_not_shared_between_threads(self):
+        """Verifica che ogni thread abbia i propri oggetti font"""
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_font(57)))
+        thread.start()
+        thread.join()
+        
+        assert other[0] is not get_font(57)
+
+
+class TestInMemoryRendering:
+    """Test per il rendering senza file di output"""
+    
+    def test_returns_jpeg_bytes(self, sample_text):
+        """Verifica che senza output_path venga restituito il JPEG in memoria"""
+        data = create_long_image(sample_text)
+        
+        image = Image.open(io.BytesIO(data))
+        assert image.format == "JPEG"
+        assert image.size == (1080, 1920)
+    
+    def test_matches_file_output(self, temp_output_dir, sample_text):
+        """Verifica che il contenuto sia identico a quello salvato su disco"""
+        path = create_long_image(sample_text, str(temp_output_dir / "menu.jpg"))
+        
+        with open(path, "rb") as f:
+            assert create_long_image(sample_text) == f.read()
+    
+    def test_uses_render_cache(self, tmp_path, sample_text):
+        """Verifica che anche le immagini in memoria vengano riusate dalla cache"""
+        cache = RenderCache(str(tmp_path / "render_cache"))
+        first = create_long_image(sample_text, cache=cache)
+        
+        with patch('utils.image_processing.base_canvas') as canvas:
+            second = create_long_image(sample_text, cache=cache)
+        
+        canvas.assert_not_called()
+        assert first == second
+    
+    def test_render_key_matches_cache(self, tmp_path, sample_text):
+        """Verifica che render_key calcoli la stessa chiave usata da create_long_image"""
+        cache = RenderCache(str(tmp_path / "render_cache"))
+        create_long_image(sample_text, cache=cache, translated_text="MENU", layout="split")
+        
+        assert cache.get(render_key(sample_text, translated_text="MENU", layout="split")) is not None
+        assert cache.get(render_key(sample_text)) is None
+    
+    def test_render_key_follows_drawn_text(self):
+        """Verifica che testi disegnati allo stesso modo (maiuscolo, spazi) abbiano la stessa chiave"""
+        assert render_key("pasta ", translated_text=" pasta\n") == render_key("PASTA", translated_text="PASTA")
+        assert render_key("pasta", translated_text="pasta") != render_key("pasta", translated_text="riso")
+    
+    def test_render_many_in_memory(self):
+        """Verifica render_many con job senza output_path"""
+        result = render_many([{"text": "A"}, {"text": "B"}], add_logo=False)
+        
+        assert all(isinstance(data, bytes) for data in result)
+        assert result[0] != result[1]
+
+
+class TestEncoding:
+    """Test per le codifiche delle immagini create"""
+    
+    @pytest.fixture(scope="class")
+    def menu(self):
+        """Immagine di un menu, non ancora codificata"""
+        return render_text_image("MENU DEL GIORNO\nPRIMO: PASTA AL POMODORO\nSECONDO: POLLO ARROSTO")
+    
+    @pytest.mark.parametrize("encoding, expected", [
+        ("jpeg", "JPEG"), ("jpeg-optimized", "JPEG"), ("png", "PNG"), ("webp", "WEBP")
+    ])
+    def test_encodings_produce_format(self, menu, encoding, expected):
+        """Verifica il formato prodotto da ogni codifica"""
+        assert Image.open(io.BytesIO(encode_image(menu, encoding))).format == expected
+    
+    def test_unknown_encoding(self, menu):
+        """Verifica errore su codifica sconosciuta"""
+        with pytest.raises(ValueError, match="Codifica sconosciuta"):
+            encode_image(menu, "gif")
+    
+    def test_png_palette_smaller_than_default(self, menu):
+        """Verifica che la palette riduca i byte rispetto al JPEG di default"""
+        assert len(encode_image(menu, "png")) < len(encode_image(menu, "jpeg")) / 2
+    
+    def test_adaptive_picks_smallest_candidate(self, menu):
+        """Verifica che la modalità adattiva scelga la codifica più piccola"""
+        candidates = [len(encode_image(menu, name)) for name in ("png", "jpeg-optimized")]
+        
+        assert len(encode_image(menu, "adaptive", byte_budget=10 ** 6)) == min(candidates)
+    
+    def test_adaptive_lowers_quality_over_budget(self, menu):
+        """Verifica che oltre il budget venga abbassata la qualità JPEG"""
+        with patch('utils.image_processing.RENDER_ADAPTIVE_ENCODINGS', ("jpeg",)):
+            data = encode_image(menu, "adaptive", byte_budget=1)
+        
+        assert image_format(data) == "jpg"
+        assert len(data) < len(encode_image(menu, "jpeg"))
+    
+    def test_image_format_detection(self, menu):
+        """Verifica il riconoscimento del formato dai primi byte"""
+        assert image_format(encode_image(menu, "png")) == "png"
+        assert image_format(encode_image(menu, "webp")) == "webp"
+        assert image_format(encode_image(menu, "jpeg")) == "jpg"
+    
+    def test_create_long_image_with_encoding(self, temp_output_dir, sample_text):
+        """Verifica che create_long_image applichi la codifica richiesta"""
+        path = create_long_image(sample_text, str(temp_output_dir / "menu.png"), encoding="png")
+        
+        assert Image.open(path).format == "PNG"
+    
+    def test_cache_distinguishes_encodings(self, tmp_path, sample_text):
+        """Verifica che la stessa immagine con codifiche diverse non venga confusa in cache"""
+        cache = RenderCache(str(tmp_path / "render_cache"))
+        jpeg = create_long_image(sample_text, cache=cache, encoding="jpeg")
+        png = create_long_image(sample_text, cache=cache, encoding="png")
+        
+        assert image_format(jpeg) == "jpg"
+        assert image_format(png) == "png"
+
+
+class TestCombinedLayout:
+    """Test per l'immagine unica con testo originale e traduzione"""
+    
+    @pytest.mark.parametrize("layout", ["stacked", "split"])
+    def test_single_image_with_both_texts(self, layout):
+        """Verifica che testo e traduzione finiscano nella stessa immagine delle dimensioni standard"""
+        image = render_text_image("PASTA AL POMODORO", translated_text="PASTA WITH TOMATO", layout=layout)
+        
+        assert image.size == (1080, 1920)
+        assert image != render_text_image("PASTA AL POMODORO")
+    
+    def test_stacked_draws_divider(self):
+        """Verifica la linea di separazione a metà altezza nell'impaginazione stacked"""
+        image = render_text_image("A", translated_text="B", layout="stacked", add_logo=False)
+        
+        assert image.getpixel((540, 960)) == (255, 255, 255)
+        assert image.getpixel((540, 960 - 100)) == (255, 140, 0)
+    
+    def test_split_draws_divider(self):
+        """Verifica la linea di separazione verticale nell'impaginazione split"""
+        image = render_text_image("A", translated_text="B", layout="split", add_logo=False)
+        
+        assert image.getpixel((540, 200)) == (255, 255, 255)
+        assert image.getpixel((540 - 100, 200)) == (255, 140, 0)
+    
+    def test_halves_share_font_size(self):
+        """Verifica che le due metà usino la stessa dimensione di font, adatta al testo più lungo"""
+        with patch('utils.image_processing._draw_text_block') as draw_block:
+            render_text_image("PASTA", translated_text="PASTA WITH TOMATO SAUCE AND BASIL", layout="split")
+        
+        sizes = {call.args[3] for call in draw_block.call_args_list}
+        assert len(sizes) == 1
+    
+    def test_split_wraps_long_lines(self):
+        """Verifica che nelle metà affiancate le righe troppo larghe vadano a capo entro la propria metà"""
+        with patch('utils.image_processing._draw_text_block') as draw_block:
+            render_text_image("SECONDO: POLLO ARROSTO CON PATATE AL FORNO", translated_text="B", layout="split")
+        
+        block, _, font_size = draw_block.call_args_list[0].args[1:4]
+        assert "\n" in block
+        assert measure_text(block, font_size)[0] <= 540 - 2 * 60
+    
+    def test_wrapped_blocks_fit_their_half(self):
+        """Verifica che l'altezza venga misurata dopo essere andati a capo"""
+        text = "\n".join(f"PIATTO {i}: PASTA AL POMODORO CON BASILICO" for i in range(8))
+        with patch('utils.image_processing._draw_text_block') as draw_block:
+            render_text_image(text, translated_text=text, layout="split")
+        
+        for call in draw_block.call_args_list:
+            block, (left, top, right, bottom), font_size = call.args[1:4]
+            block_width, block_height = measure_text(block, font_size)
+            assert block_width <= right - left - 2 * 60
+            assert block_height <= bottom - top - 2 * 60
+    
+    @pytest.mark.parametrize("layout, lines", [("stacked", 20), ("split", 40)])
+    def test_long_menu_does_not_fit(self, layout, lines):
+        """Verifica che un menu troppo lungo per metà immagine venga rifiutato invece di sconfinare"""
+        text = "\n".join(f"PIATTO NUMERO {i}" for i in range(lines))
+        
+        assert fits_combined_layout(text, text, layout) is False
+        with pytest.raises(ValueError, match="troppo lungo"):
+            render_text_image(text, translated_text=text, layout=layout)
+    
+    def test_short_menu_fits(self):
+        """Verifica che un menu breve entri nell'immagine combinata"""
+        assert fits_combined_layout("PASTA\nPOLLO", "PASTA\nCHICKEN", "stacked") is True
+    
+    def test_unknown_layout(self):
+        """Verifica errore su impaginazione sconosciuta"""
+        with pytest.raises(ValueError, match="Impaginazione sconosciuta"):
+            render_text_image("A", translated_text="B", layout="diagonal")
+    
+    def test_cache_distinguishes_layouts(self, tmp_path, sample_text):
+        """Verifica che immagini singole e combinate non vengano confuse in cache"""
+        cache = RenderCache(str(tmp_path / "render_cache"))
+        single = create_long_image(sample_text, cache=cache)
+        stacked = create_long_image(sample_text, cache=cache, translated_text="MENU OF THE DAY")
+        split = create_long_image(sample_text, cache=cache, translated_text="MENU OF THE DAY", layout="split")
+        
+        assert len({single, stacked, split}) == 3
+        assert len(cache) == 3
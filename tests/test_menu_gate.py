@@ -0,0 +1,96 @@
+"""
+Test suite per core.menu_gate
+"""
+import pytest
+import numpy as np
+import cv2
+from core.menu_gate import menu_features, looks_like_menu, classify_story, gate_signature
+from utils.image_processing import create_long_image
+
+
+@pytest.fixture
+def menu_path(tmp_path):
+    """Storia sintetica con un menu leggibile"""
+    path = str(tmp_path / "menu.jpg")
+    text = "PRIMI\nPasta al pomodoro\nRisotto ai funghi\nSECONDI\nPollo arrosto\nFrittata di verdure"
+    create_long_image(text, path, add_logo=False)
+    return path
+
+
+def photo(seed=0):
+    """Immagine senza testo: macchie di colore sfumate, come una foto di un piatto"""
+    rng = np.random.default_rng(seed)
+    image = np.full((1920, 1080, 3), 200, dtype=np.uint8)
+    for _ in range(8):
+        center = (int(rng.integers(0, 1080)), int(rng.integers(0, 1920)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(image, center, int(rng.integers(80, 300)), color, -1)
+    return cv2.GaussianBlur(image, (51, 51), 0)
+
+
+class TestMenuFeatures:
+    """Test per menu_features"""
+    
+    def test_menu_has_text_lines(self, menu_path):
+        """Verifica che le righe del menu vengano contate"""
+        features = menu_features(cv2.imread(menu_path))
+        
+        assert features["text_lines"] >= 3
+        assert features["edge_density"] > 0.01
+    
+    def test_counts_lines_inside_bordered_card(self):
+        """Verifica che le righe dentro un riquadro bordato su una foto vengano contate"""
+        rng = np.random.default_rng(0)
+        image = cv2.GaussianBlur(rng.integers(0, 255, (1920, 1080, 3), dtype=np.uint8), (0, 0), 3)
+        cv2.rectangle(image, (120, 500), (960, 1400), (255, 255, 255), -1)
+        cv2.rectangle(image, (120, 500), (960, 1400), (40, 40, 40), 6)
+        for i, line in enumerate(["MENU DEL GIORNO", "PRIMO: PASTA", "SECONDO: POLLO", "CONTORNO", "DOLCE"]):
+            cv2.putText(image, line, (180, 620 + i * 150), cv2.FONT_HERSHEY_SIMPLEX, 2.2, (0, 0, 0), 6)
+        
+        assert menu_features(image)["text_lines"] >= 5
+        assert looks_like_menu(image) is True
+    
+    def test_blank_frame_has_no_features(self):
+        """Verifica feature nulle su un frame uniforme"""
+        features = menu_features(np.full((1920, 1080, 3), 128, dtype=np.uint8))
+        
+        assert features == {"edge_density": 0.0, "text_lines": 0}
+
+
+class TestLooksLikeMenu:
+    """Test per looks_like_menu e classify_story"""
+    
+    def test_accepts_menu(self, menu_path):
+        """Verifica che un menu superi il filtro"""
+        assert classify_story(menu_path) is True
+    
+    def test_accepts_menu_bytes(self, menu_path):
+        """Verifica il filtro su un'immagine in memoria"""
+        with open(menu_path, "rb") as f:
+            assert classify_story(f.read()) is True
+    
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_rejects_photo(self, seed):
+        """Verifica che una foto senza testo venga scartata"""
+        assert looks_like_menu(photo(seed)) is False
+    
+    def test_rejects_blank_frame(self):
+        """Verifica che un frame vuoto venga scartato"""
+        assert looks_like_menu(np.zeros((1920, 1080, 3), dtype=np.uint8)) is False
+    
+    def test_uses_custom_thresholds(self, menu_path):
+        """Verifica che soglie più severe scartino anche il menu"""
+        thresholds = {"min_edge_density": 0.0, "min_text_lines": 100}
+        
+        assert looks_like_menu(cv2.imread(menu_path), thresholds) is False
+
+
+class TestGateSignature:
+    """Test per gate_signature"""
+    
+    def test_changes_with_thresholds(self, monkeypatch):
+        """Verifica che cambiare le soglie invalidi le decisioni in cache"""
+        before = gate_signature()
+        monkeypatch.setattr("core.menu_gate.MENU_GATE_THRESHOLDS", {"min_edge_density": 0.1, "min_text_lines": 2})
+        
+        assert gate_signature() != before
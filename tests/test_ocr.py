@@ -0,0 +1,442 @@
+"""
+Test suite per core.ocr
+"""
+import asyncio
+import os
+import pytest
+import numpy as np
+import cv2
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+from core.ocr import (
+    OCRExecutor, extract_text, ocr_cache_key, ocr_signature, preprocess,
+    find_text_regions, crop_text_regions, _init_worker
+)
+from data.sqlite_cache import SQLiteCache
+from utils.file_operations import hash_file
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    """Crea un'immagine di test su disco"""
+    path = tmp_path / "story.jpg"
+    cv2.imwrite(str(path), np.full((40, 30, 3), 255, dtype=np.uint8))
+    return str(path)
+
+
+@pytest.fixture
+def ocr_executor():
+    """OCRExecutor basato su thread, per poter usare i mock nei test"""
+    executor = OCRExecutor(max_workers=2, executor=ThreadPoolExecutor(max_workers=2), gate=False)
+    yield executor
+    executor.shutdown()
+
+
+class TestExtractText:
+    """Test per extract_text"""
+
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="  MENU DEL GIORNO \n")
+    def test_returns_stripped_text(self, mock_ocr, image_path):
+        """Verifica che il testo venga restituito senza spazi"""
+        assert extract_text(image_path) == "MENU DEL GIORNO"
+        mock_ocr.assert_called_once()
+
+    def test_raises_on_unreadable_image(self, tmp_path):
+        """Verifica errore per immagine non leggibile"""
+        with pytest.raises(ValueError, match="Impossibile leggere"):
+            extract_text(str(tmp_path / "missing.jpg"))
+
+
+class TestPreprocess:
+    """Test per i preset di preprocessing OCR"""
+
+    @pytest.fixture
+    def story(self):
+        """Storia 1080x1920 con testo chiaro su sfondo colorato"""
+        image = np.full((1920, 1080, 3), (0, 140, 255), dtype=np.uint8)
+        cv2.putText(image, "MENU", (200, 960), cv2.FONT_HERSHEY_SIMPLEX, 6, (255, 255, 255), 20)
+        return image
+
+    def test_none_keeps_color_and_size(self, story):
+        """Verifica che il preset 'none' passi l'immagine originale in RGB"""
+        result = preprocess(story, "none")
+
+        assert result.shape == (1920, 1080, 3)
+        assert tuple(result[0, 0]) == (255, 140, 0)
+
+    def test_gray_downscales(self, story):
+        """Verifica scala di grigi e riduzione all'altezza massima"""
+        result = preprocess(story, "gray")
+
+        assert result.ndim == 2
+        assert result.shape == (1280, 720)
+
+    def test_small_images_are_not_upscaled(self):
+        """Verifica che le immagini piccole non vengano ingrandite"""
+        image = np.zeros((100, 50, 3), dtype=np.uint8)
+
+        assert preprocess(image, "gray").shape == (100, 50)
+
+    def test_binary_gives_dark_text_on_light_background(self, story):
+        """Verifica binarizzazione con testo scuro su sfondo chiaro"""
+        result = preprocess(story, "binary")
+
+        assert set(np.unique(result)) <= {0, 255}
+        # Lo sfondo è bianco, il testo (minoritario) nero
+        assert result[0, 0] == 255
+        assert 0 < np.count_nonzero(result == 0) < result.size / 2
+
+    def test_unknown_preset(self, story):
+        """Verifica errore per preset inesistente"""
+        with pytest.raises(ValueError, match="Preset OCR sconosciuto"):
+            preprocess(story, "inesistente")
+
+    def test_signature_depends_on_preset(self):
+        """Verifica che cambiare preset invalidi la cache"""
+        assert ocr_signature("gray") != ocr_signature("binary")
+        assert ocr_cache_key("digest", "gray") != ocr_cache_key("digest", "binary")
+
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    def test_extract_text_uses_preset(self, mock_ocr, image_path):
+        """Verifica che extract_text passi a tesseract l'immagine preprocessata"""
+        extract_text(image_path, "gray")
+
+        assert mock_ocr.call_args[0][0].ndim == 2
+
+
+class TestTextRegions:
+    """Test per il rilevamento dei blocchi di testo"""
+
+    @staticmethod
+    def story(lines):
+        """Storia in scala di grigi 1280x720 con righe di testo alle altezze indicate"""
+        image = np.full((1280, 720), 90, dtype=np.uint8)
+        for y in lines:
+            cv2.putText(image, "PASTA AL POMODORO", (60, y), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 255, 4)
+        return image
+
+    def test_finds_single_block(self):
+        """Verifica che righe vicine formino un unico blocco attorno al testo"""
+        boxes = find_text_regions(self.story([600, 660, 720]))
+
+        assert len(boxes) == 1
+        x1, y1, x2, y2 = boxes[0]
+        assert y1 < 560 and y2 > 720
+        # Il ritaglio è molto più piccolo dell'immagine
+        assert (x2 - x1) * (y2 - y1) < 0.3 * 1280 * 720
+
+    def test_separate_blocks_in_reading_order(self):
+        """Verifica blocchi distinti ordinati dall'alto verso il basso"""
+        boxes = find_text_regions(self.story([1100, 200]))
+
+        assert len(boxes) == 2
+        assert boxes[0][1] < boxes[1][1]
+
+    def test_too_many_blocks_become_one(self, monkeypatch):
+        """Verifica che oltre OCR_MAX_REGIONS blocchi si usi un unico ritaglio"""
+        monkeypatch.setattr('core.ocr.OCR_MAX_REGIONS', 1)
+
+        boxes = find_text_regions(self.story([200, 1100]))
+
+        assert len(boxes) == 1
+        assert boxes[0][1] < 200 < 1100 < boxes[0][3]
+
+    def test_blank_image_has_no_regions(self):
+        """Verifica che un'immagine senza testo non produca blocchi"""
+        assert find_text_regions(np.full((1280, 720), 255, dtype=np.uint8)) == []
+
+    def test_falls_back_to_full_frame(self):
+        """Verifica ritorno all'immagine intera se non ci sono blocchi"""
+        image = np.full((100, 80), 255, dtype=np.uint8)
+
+        crops = crop_text_regions(image)
+
+        assert len(crops) == 1
+        assert crops[0] is image
+
+    @patch('core.ocr_engines.pytesseract.image_to_string', side_effect=["PRIMI", "", "SECONDI"])
+    def test_extract_text_joins_regions(self, mock_ocr, tmp_path, monkeypatch):
+        """Verifica che i testi dei blocchi vengano uniti in ordine di lettura"""
+        path = tmp_path / "story.png"
+        cv2.imwrite(str(path), self.story([150, 640, 1100]))
+
+        assert extract_text(str(path), "gray") == "PRIMI\nSECONDI"
+        assert mock_ocr.call_count == 3
+
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    def test_crop_disabled_reads_full_frame(self, mock_ocr, tmp_path):
+        """Verifica che il preset 'none' legga l'immagine intera"""
+        path = tmp_path / "story.png"
+        cv2.imwrite(str(path), self.story([640]))
+
+        extract_text(str(path), "none")
+
+        assert mock_ocr.call_args[0][0].shape[:2] == (1280, 720)
+
+
+class TestInitWorker:
+    """Test per _init_worker"""
+
+    def test_limits_tesseract_threads(self, monkeypatch):
+        """Verifica che venga limitato il numero di thread di tesseract"""
+        monkeypatch.delenv("OMP_THREAD_LIMIT", raising=False)
+
+        with patch('core.ocr.cv2.setNumThreads') as mock_threads:
+            _init_worker(1)
+
+        assert os.environ["OMP_THREAD_LIMIT"] == "1"
+        mock_threads.assert_called_once_with(1)
+
+    def test_preloads_engine(self):
+        """Verifica che il motore OCR venga caricato all'avvio del worker"""
+        with patch('core.ocr.cv2.setNumThreads'), patch('core.ocr.get_engine') as mock_engine:
+            _init_worker(1, "pytesseract")
+
+        mock_engine.assert_called_once_with("pytesseract")
+
+
+class TestOCRExecutor:
+    """Test per OCRExecutor"""
+
+    def test_defaults_to_cpu_count(self):
+        """Verifica dimensionamento di default sul numero di core"""
+        with patch('core.ocr.OCR_WORKERS', None), patch('core.ocr.os.cpu_count', return_value=6):
+            assert OCRExecutor().max_workers == 6
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string')
+    async def test_concurrent_extracts_keep_their_results(self, mock_ocr, ocr_executor, tmp_path):
+        """Verifica che estrazioni concorrenti restituiscano ciascuna il proprio testo"""
+        paths = []
+        for height in (10, 20, 30):
+            path = tmp_path / f"story_{height}.png"
+            cv2.imwrite(str(path), np.zeros((height, 10, 3), dtype=np.uint8))
+            paths.append(str(path))
+        mock_ocr.side_effect = lambda image: f"ALTEZZA {image.shape[0]}"
+
+        result = await asyncio.gather(*(ocr_executor.extract(path) for path in paths))
+
+        assert result == ["ALTEZZA 10", "ALTEZZA 20", "ALTEZZA 30"]
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="TESTO")
+    async def test_missing_image_raises(self, mock_ocr, ocr_executor, tmp_path):
+        """Verifica che un'immagine illeggibile sollevi ValueError"""
+        with pytest.raises(ValueError):
+            await ocr_executor.extract(str(tmp_path / "missing.jpg"))
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_broken_pool_is_replaced(self, mock_ocr, image_path, monkeypatch):
+        """Verifica che un worker terminato non blocchi l'OCR fino al riavvio del bot"""
+        class BrokenPool(Executor):
+            def submit(self, fn, *args, **kwargs):
+                future = Future()
+                future.set_exception(BrokenProcessPool("worker terminato"))
+                return future
+
+        monkeypatch.setattr('core.ocr.ProcessPoolExecutor', lambda **kwargs: ThreadPoolExecutor(max_workers=1))
+        broken = BrokenPool()
+        executor = OCRExecutor(max_workers=1, executor=broken, gate=False)
+
+        assert await executor.extract(image_path) == "MENU"
+        assert executor.executor is not broken
+        assert await executor.extract(image_path) == "MENU"
+        executor.shutdown()
+
+    def test_shutdown_is_idempotent(self, ocr_executor):
+        """Verifica che shutdown possa essere chiamato più volte"""
+        ocr_executor.shutdown()
+        ocr_executor.shutdown()
+
+
+class TestInMemoryDecode:
+    """Test per l'OCR direttamente dai byte scaricati"""
+
+    @pytest.fixture
+    def image_bytes(self):
+        """Immagine PNG codificata in memoria"""
+        _, encoded = cv2.imencode(".png", np.full((40, 30, 3), 255, dtype=np.uint8))
+        return encoded.tobytes()
+
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value=" MENU ")
+    def test_extract_text_from_bytes(self, mock_ocr, image_bytes):
+        """Verifica OCR da byte senza passare dal disco"""
+        with patch('core.ocr.cv2.imread') as mock_imread:
+            assert extract_text(image_bytes, "gray") == "MENU"
+
+        mock_imread.assert_not_called()
+        assert mock_ocr.call_args[0][0].shape == (40, 30)
+
+    def test_invalid_bytes(self):
+        """Verifica errore per byte non decodificabili"""
+        with pytest.raises(ValueError, match="decodificare"):
+            extract_text(b"not an image")
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_bytes_share_cache_with_files(self, mock_ocr, tmp_path, image_bytes):
+        """Verifica che byte e file con lo stesso contenuto usino la stessa voce di cache"""
+        path = tmp_path / "story.png"
+        path.write_bytes(image_bytes)
+        cache = SQLiteCache(str(tmp_path / "ocr.sqlite3"), table="ocr")
+        executor = OCRExecutor(max_workers=1, executor=ThreadPoolExecutor(max_workers=1), cache=cache, gate=False)
+
+        await executor.extract(str(path))
+        result = await executor.extract(image_bytes)
+
+        assert result == "MENU"
+        assert mock_ocr.call_count == 1
+        executor.shutdown()
+        cache.close()
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_uses_given_digest(self, mock_ocr, tmp_path, image_bytes):
+        """Verifica che un digest già calcolato non venga ricalcolato"""
+        cache = SQLiteCache(str(tmp_path / "ocr.sqlite3"), table="ocr")
+        executor = OCRExecutor(max_workers=1, executor=ThreadPoolExecutor(max_workers=1), cache=cache, gate=False)
+
+        with patch('core.ocr.hash_bytes') as mock_hash:
+            await executor.extract(image_bytes, digest="abc")
+
+        mock_hash.assert_not_called()
+        assert cache.get(ocr_cache_key("abc", executor.preset, executor.engine)) == "MENU"
+        executor.shutdown()
+        cache.close()
+
+
+class TestOCRCache:
+    """Test per la cache OCR"""
+
+    @pytest.fixture
+    def cached_executor(self, tmp_path):
+        """OCRExecutor con cache SQLite temporanea"""
+        cache = SQLiteCache(str(tmp_path / "ocr.sqlite3"), table="ocr")
+        executor = OCRExecutor(max_workers=1, executor=ThreadPoolExecutor(max_workers=1), cache=cache, gate=False)
+        yield executor
+        executor.shutdown()
+        cache.close()
+
+    def test_cache_key_includes_config(self):
+        """Verifica che la chiave dipenda anche dalla configurazione OCR"""
+        with patch('core.ocr.ocr_signature', return_value="a"):
+            key_a = ocr_cache_key("digest")
+        with patch('core.ocr.ocr_signature', return_value="b"):
+            key_b = ocr_cache_key("digest")
+
+        assert key_a != key_b
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_skips_ocr_for_cached_image(self, mock_ocr, cached_executor, image_path):
+        """Verifica che un'immagine già vista non passi di nuovo da tesseract"""
+        first = await cached_executor.extract(image_path)
+        second = await cached_executor.extract(image_path)
+
+        assert first == second == "MENU"
+        assert mock_ocr.call_count == 1
+        assert cached_executor.cache.hits == 1
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_uses_cache_populated_by_previous_run(self, mock_ocr, cached_executor, image_path):
+        """Verifica che il risultato salvato venga riusato dopo un riavvio"""
+        cached_executor.cache.set(ocr_cache_key(hash_file(image_path)), "DAL DISCO")
+
+        result = await cached_executor.extract(image_path)
+
+        assert result == "DAL DISCO"
+        mock_ocr.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_failed_ocr_is_not_cached(self, mock_ocr, cached_executor, tmp_path):
+        """Verifica che un errore di lettura non venga salvato in cache"""
+        bad = tmp_path / "bad.jpg"
+        bad.write_bytes(b"not an image")
+
+        with pytest.raises(ValueError):
+            await cached_executor.extract(str(bad))
+
+        assert len(cached_executor.cache) == 0
+
+
+class TestMenuGate:
+    """Test per il filtro pre-OCR in OCRExecutor"""
+
+    @pytest.fixture
+    def gated_executor(self, tmp_path):
+        """OCRExecutor con filtro attivo e cache SQLite temporanea"""
+        cache = SQLiteCache(str(tmp_path / "ocr.sqlite3"), table="ocr")
+        executor = OCRExecutor(max_workers=1, executor=ThreadPoolExecutor(max_workers=1), cache=cache, gate=True)
+        yield executor
+        executor.shutdown()
+        cache.close()
+
+    @pytest.mark.asyncio
+    @patch('core.ocr.classify_story', return_value=False)
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="PROMO")
+    async def test_rejected_image_skips_ocr(self, mock_ocr, mock_gate, gated_executor, image_path):
+        """Verifica che un'immagine scartata non passi da tesseract"""
+        result = await gated_executor.extract(image_path)
+
+        assert result is None
+        mock_ocr.assert_not_called()
+        assert gated_executor.gate_rejected == 1
+
+    @pytest.mark.asyncio
+    @patch('core.ocr.classify_story', return_value=False)
+    async def test_rejection_not_cached(self, mock_gate, gated_executor, image_path):
+        """Verifica che un'immagine scartata venga ricontrollata alla richiesta successiva"""
+        await gated_executor.extract(image_path)
+        await gated_executor.extract(image_path)
+
+        assert mock_gate.call_count == 2
+        assert gated_executor.gate_checked == gated_executor.gate_rejected == 2
+
+    @pytest.mark.asyncio
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_rejected_image_extracted_when_gate_accepts(self, mock_ocr, gated_executor, image_path):
+        """Verifica che con la cache attiva una storia scartata venga estratta se il filtro cambia idea"""
+        with patch('core.ocr.classify_story', return_value=False):
+            assert await gated_executor.extract(image_path) is None
+
+        with patch('core.ocr.classify_story', return_value=True):
+            assert await gated_executor.extract(image_path) == "MENU"
+        mock_ocr.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch('core.ocr.classify_story', return_value=True)
+    async def test_acceptance_cached_per_image(self, mock_gate, gated_executor, image_path):
+        """Verifica che il filtro non venga ricalcolato per un menu già accettato"""
+        with patch('core.ocr_engines.pytesseract.image_to_string', side_effect=RuntimeError("tesseract")):
+            with pytest.raises(RuntimeError):
+                await gated_executor.extract(image_path)
+        with patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU"):
+            assert await gated_executor.extract(image_path) == "MENU"
+
+        assert mock_gate.call_count == 1
+
+    @pytest.mark.asyncio
+    @patch('core.ocr.classify_story', return_value=True)
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    async def test_accepted_image_goes_to_ocr(self, mock_ocr, mock_gate, gated_executor, image_path):
+        """Verifica che un menu venga estratto normalmente"""
+        assert await gated_executor.extract(image_path) == "MENU"
+        assert gated_executor.ocr_runs == 1
+
+    def test_saved_seconds_uses_average_ocr_time(self, gated_executor):
+        """Verifica la stima del tempo risparmiato"""
+        gated_executor.ocr_runs = 2
+        gated_executor.ocr_seconds = 3.0
+        gated_executor.gate_rejected = 4
+
+        assert gated_executor.saved_seconds == pytest.approx(6.0)
+
+    def test_saved_seconds_without_ocr_runs(self, gated_executor):
+        """Verifica stima nulla prima di aver misurato un OCR"""
+        gated_executor.gate_rejected = 3
+
+        assert gated_executor.saved_seconds == 0.0
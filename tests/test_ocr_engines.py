@@ -0,0 +1,121 @@
+"""
+Test suite per core.ocr_engines
+"""
+import threading
+import pytest
+import numpy as np
+from unittest.mock import Mock, patch
+from PIL import Image
+from core import ocr_engines
+from core.ocr import ocr_signature
+from core.ocr_engines import (
+    OCREngine, PytesseractEngine, TesserocrEngine, get_engine, resolve_engine_name, close_engines
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_engines():
+    """Ogni test parte senza motori già creati"""
+    close_engines()
+    yield
+    close_engines()
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    """Modulo tesserocr finto con un'API che restituisce testo fisso"""
+    module = Mock()
+    module.PyTessBaseAPI.return_value.GetUTF8Text.return_value = "MENU\n"
+    monkeypatch.setattr(ocr_engines, "tesserocr", module, raising=False)
+    monkeypatch.setattr(ocr_engines, "TESSEROCR_SUPPORT", True)
+    return module
+
+
+class TestOCREngine:
+    """Test per l'interfaccia OCREngine"""
+
+    def test_requires_image_to_string(self):
+        """Verifica che un motore senza image_to_string non sia istanziabile"""
+        class Incomplete(OCREngine):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+class TestPytesseractEngine:
+    """Test per PytesseractEngine"""
+
+    @patch('core.ocr_engines.pytesseract.image_to_string', return_value="MENU")
+    def test_delegates_to_pytesseract(self, mock_ocr):
+        """Verifica che l'immagine venga passata a pytesseract"""
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        assert PytesseractEngine().image_to_string(image) == "MENU"
+        mock_ocr.assert_called_once_with(image)
+
+
+class TestTesserocrEngine:
+    """Test per TesserocrEngine"""
+
+    def test_model_loaded_once(self, fake_tesserocr):
+        """Verifica che l'API (e il modello) venga creata una sola volta per più immagini"""
+        engine = get_engine("tesserocr")
+        image = np.zeros((10, 10), dtype=np.uint8)
+
+        engine.image_to_string(image)
+        get_engine("tesserocr").image_to_string(image)
+
+        fake_tesserocr.PyTessBaseAPI.assert_called_once()
+        api = fake_tesserocr.PyTessBaseAPI.return_value
+        assert api.SetImage.call_count == 2
+        assert isinstance(api.SetImage.call_args[0][0], Image.Image)
+
+    def test_returns_text(self, fake_tesserocr):
+        """Verifica il testo restituito dall'API"""
+        assert TesserocrEngine().image_to_string(np.zeros((5, 5), dtype=np.uint8)) == "MENU\n"
+
+    def test_close_ends_api(self, fake_tesserocr):
+        """Verifica che la chiusura liberi l'API di tesseract"""
+        get_engine("tesserocr")
+
+        close_engines()
+
+        fake_tesserocr.PyTessBaseAPI.return_value.End.assert_called_once()
+
+    def test_requires_tesserocr(self, monkeypatch):
+        """Verifica errore se tesserocr non è installato"""
+        monkeypatch.setattr(ocr_engines, "TESSEROCR_SUPPORT", False)
+
+        with pytest.raises(RuntimeError):
+            TesserocrEngine()
+
+
+class TestGetEngine:
+    """Test per get_engine e resolve_engine_name"""
+
+    def test_falls_back_without_tesserocr(self, monkeypatch):
+        """Verifica il ripiego su pytesseract se tesserocr manca"""
+        monkeypatch.setattr(ocr_engines, "TESSEROCR_SUPPORT", False)
+
+        assert resolve_engine_name("tesserocr") == "pytesseract"
+        assert isinstance(get_engine("tesserocr"), PytesseractEngine)
+
+    def test_unknown_engine(self):
+        """Verifica errore per motore inesistente"""
+        with pytest.raises(ValueError, match="Motore OCR sconosciuto"):
+            get_engine("inesistente")
+
+    def test_one_engine_per_thread(self):
+        """Verifica che ogni thread abbia il proprio motore"""
+        engines = []
+        thread = threading.Thread(target=lambda: engines.append(get_engine("pytesseract")))
+        thread.start()
+        thread.join()
+
+        assert get_engine("pytesseract") is get_engine("pytesseract")
+        assert engines[0] is not get_engine("pytesseract")
+
+    def test_signature_depends_on_engine(self, fake_tesserocr):
+        """Verifica che cambiare motore invalidi la cache OCR"""
+        assert ocr_signature("gray", "pytesseract") != ocr_signature("gray", "tesserocr")
@@ -0,0 +1,69 @@
+"""
+Test suite per utils.perceptual_hash
+"""
+import pytest
+import numpy as np
+import cv2
+from utils.perceptual_hash import dhash, dhash_bytes, hamming_distance
+
+
+@pytest.fixture
+def menu_image():
+    """Immagine con righe di testo su sfondo uniforme"""
+    image = np.full((960, 540, 3), (0, 140, 255), dtype=np.uint8)
+    for i, line in enumerate(["PRIMI", "Pasta al pesto", "SECONDI", "Pollo arrosto", "CONTORNI"]):
+        cv2.putText(image, line, (40, 200 + i * 120), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (255, 255, 255), 4)
+    return image
+
+
+def encode(image, quality=95):
+    """Codifica un'immagine in JPEG"""
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+class TestDhash:
+    """Test per dhash e dhash_bytes"""
+    
+    def test_hash_length(self, menu_image):
+        """Verifica che l'impronta abbia size² bit"""
+        assert len(dhash(menu_image, size=16)) == 64
+        assert len(dhash(menu_image, size=8)) == 16
+    
+    def test_reencoding_is_near_duplicate(self, menu_image):
+        """Verifica che una ricompressione non cambi sostanzialmente l'impronta"""
+        original = dhash_bytes(encode(menu_image))
+        reencoded = dhash_bytes(encode(menu_image, quality=40))
+        
+        assert hamming_distance(original, reencoded) <= 12
+    
+    def test_sticker_is_near_duplicate(self, menu_image):
+        """Verifica che uno sticker aggiunto non renda la storia diversa"""
+        sticker = menu_image.copy()
+        cv2.circle(sticker, (420, 120), 50, (0, 255, 255), -1)
+        
+        assert hamming_distance(dhash(menu_image), dhash(sticker)) <= 12
+    
+    def test_different_menu_is_distinct(self, menu_image):
+        """Verifica che un menu diverso sullo stesso sfondo non venga confuso"""
+        other = np.full_like(menu_image, (0, 140, 255))
+        for i, line in enumerate(["Lasagne", "ZUPPE", "Minestrone di verdure", "DOLCI"]):
+            cv2.putText(other, line, (40, 160 + i * 170), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (255, 255, 255), 4)
+        
+        assert hamming_distance(dhash(menu_image), dhash(other)) > 12
+    
+    def test_invalid_bytes_raise(self):
+        """Verifica errore su contenuto non decodificabile"""
+        with pytest.raises(ValueError):
+            dhash_bytes(b"non un'immagine")
+
+
+class TestHammingDistance:
+    """Test per hamming_distance"""
+    
+    def test_counts_different_bits(self):
+        """Verifica il conteggio dei bit diversi"""
+        assert hamming_distance("00ff", "00f0") == 4
+    
+    def test_identical_hashes(self):
+        """Verifica distanza nulla tra impronte uguali"""
+        assert hamming_distance("abcd", "abcd") == 0
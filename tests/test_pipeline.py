@@ -0,0 +1,151 @@
+"""
+Test suite per core.pipeline
+"""
+import asyncio
+import pytest
+from core.pipeline import Stage, run_pipeline
+
+
+class TestRunPipeline:
+    """Test per run_pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_items_flow_through_all_stages(self):
+        """Verifica che ogni elemento attraversi tutti gli stadi"""
+        received = []
+
+        async def double(x):
+            return x * 2
+
+        async def collect(x):
+            received.append(x)
+
+        stats = await run_pipeline(range(5), [Stage("double", double), Stage("collect", collect)])
+
+        assert received == [0, 2, 4, 6, 8]
+        assert stats["double"]["processed"] == 5
+        assert stats["collect"]["processed"] == 5
+
+    @pytest.mark.asyncio
+    async def test_none_drops_item(self):
+        """Verifica che un handler che restituisce None scarti l'elemento"""
+        received = []
+
+        async def only_even(x):
+            return x if x % 2 == 0 else None
+
+        async def collect(x):
+            received.append(x)
+
+        stats = await run_pipeline(range(6), [Stage("filter", only_even), Stage("collect", collect)])
+
+        assert received == [0, 2, 4]
+        assert stats["filter"]["dropped"] == 3
+
+    @pytest.mark.asyncio
+    async def test_errors_drop_item_without_stopping(self):
+        """Verifica che un errore su un elemento non fermi gli altri"""
+        received = []
+
+        async def fragile(x):
+            if x == 1:
+                raise ValueError("boom")
+            return x
+
+        async def collect(x):
+            received.append(x)
+
+        stats = await run_pipeline([0, 1, 2], [Stage("fragile", fragile), Stage("collect", collect)])
+
+        assert received == [0, 2]
+        assert stats["fragile"]["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stage_concurrency(self):
+        """Verifica che uno stadio esegua al massimo `concurrency` elementi insieme"""
+        active = 0
+        peak = 0
+
+        async def slow(x):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return x
+
+        await run_pipeline(range(10), [Stage("slow", slow, concurrency=3)])
+
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_first_item_reaches_end_before_last_starts(self):
+        """Verifica lo streaming: il primo elemento esce prima che l'ultimo entri"""
+        events = []
+
+        async def work(x):
+            events.append(("work", x))
+            await asyncio.sleep(0.01)
+            return x
+
+        async def deliver(x):
+            events.append(("deliver", x))
+
+        await run_pipeline(range(4), [Stage("work", work), Stage("deliver", deliver)], queue_size=1)
+
+        assert events.index(("deliver", 0)) < events.index(("work", 3))
+
+    @pytest.mark.asyncio
+    async def test_bounded_queue_applies_backpressure(self):
+        """Verifica che uno stadio veloce non accumuli più di queue_size elementi in attesa"""
+        started = []
+        max_ahead = 0
+        finished = 0
+
+        async def fast(x):
+            nonlocal max_ahead
+            started.append(x)
+            max_ahead = max(max_ahead, len(started) - finished)
+            return x
+
+        async def slow(x):
+            nonlocal finished
+            await asyncio.sleep(0.01)
+            finished += 1
+
+        await run_pipeline(range(20), [Stage("fast", fast), Stage("slow", slow)], queue_size=2)
+
+        # In coda (2) + in lavorazione nello stadio lento (1) + appena prodotto (1)
+        assert max_ahead <= 4
+
+    @pytest.mark.asyncio
+    async def test_batch_stage_receives_lists(self):
+        """Verifica che uno stadio a batch riceva gli elementi raggruppati"""
+        batches = []
+
+        async def collect(items):
+            batches.append(list(items))
+            return []
+
+        async def identity(x):
+            return x
+
+        await run_pipeline(
+            range(5),
+            [Stage("identity", identity), Stage("batch", collect, batch_size=3, linger=0.05)]
+        )
+
+        assert sum(batches, []) == [0, 1, 2, 3, 4]
+        assert all(len(batch) <= 3 for batch in batches)
+        assert len(batches) < 5
+
+    @pytest.mark.asyncio
+    async def test_empty_input(self):
+        """Verifica che un input vuoto termini subito"""
+        async def identity(x):
+            return x
+
+        stats = await run_pipeline([], [Stage("a", identity, concurrency=2), Stage("b", identity)])
+
+        assert stats["a"]["processed"] == 0
+        assert stats["b"]["processed"] == 0
@@ -0,0 +1,147 @@
+"""
+Test suite per utils.rate_limiter
+"""
+import pytest
+from utils.rate_limiter import TokenBucket, TelegramRateLimiter
+
+
+class FakeClock:
+    """Orologio finto: sleep fa avanzare il tempo senza attendere"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Orologio finto condiviso"""
+    return FakeClock()
+
+
+class TestTokenBucket:
+    """Test per TokenBucket"""
+
+    def test_allows_burst_up_to_capacity(self, clock):
+        """Verifica che la capacità iniziale non richieda attese"""
+        bucket = TokenBucket(rate=30, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(30)]
+
+        assert waits == [0.0] * 30
+        assert clock.slept == []
+
+    def test_waits_when_empty(self, clock):
+        """Verifica attesa proporzionale al rate quando i token finiscono"""
+        bucket = TokenBucket(rate=2, capacity=1, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire()
+        wait = bucket.acquire()
+
+        assert wait == pytest.approx(0.5)
+        assert clock.now == pytest.approx(0.5)
+
+    def test_reservations_queue_up(self, clock):
+        """Verifica che prenotazioni consecutive si mettano in coda"""
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.reserve() for _ in range(3)]
+
+        assert waits == [pytest.approx(0.0), pytest.approx(1.0), pytest.approx(2.0)]
+
+    def test_refills_over_time(self, clock):
+        """Verifica ricarica dei token col passare del tempo"""
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+
+        clock.now += 5
+
+        assert bucket.acquire() == 0.0
+
+    def test_count_consumes_several_tokens(self, clock):
+        """Verifica che un acquire multiplo consumi più token"""
+        bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+
+        assert bucket.acquire(10) == 0.0
+        assert bucket.acquire(5) == pytest.approx(0.5)
+
+    def test_count_over_capacity_goes_into_debt(self, clock):
+        """Verifica che oltre la capacità la richiesta parta e le successive paghino il debito"""
+        bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+
+        assert bucket.acquire(10) == 0.0
+        assert bucket.acquire(10) == pytest.approx(10)
+
+    def test_pause_blocks_acquire(self, clock):
+        """Verifica che pause blocchi le acquisizioni per la durata indicata"""
+        bucket = TokenBucket(rate=30, clock=clock, sleep=clock.sleep)
+
+        bucket.pause(7)
+
+        assert bucket.acquire() == pytest.approx(7)
+
+
+class TestTelegramRateLimiter:
+    """Test per TelegramRateLimiter"""
+
+    def test_detects_groups(self):
+        """Verifica riconoscimento gruppi da chat_id negativo"""
+        assert TelegramRateLimiter.is_group(-100123) is True
+        assert TelegramRateLimiter.is_group("-42") is True
+        assert TelegramRateLimiter.is_group(12345) is False
+
+    def test_group_limited_to_twenty_per_minute(self, clock):
+        """Verifica il limite di 20 messaggi al minuto per gruppo"""
+        limiter = TelegramRateLimiter(clock=clock, sleep=clock.sleep)
+
+        for _ in range(21):
+            limiter.acquire(-100)
+
+        assert clock.now == pytest.approx(60)
+
+    def test_different_chats_do_not_wait_on_each_other(self, clock):
+        """Verifica che chat diverse abbiano bucket indipendenti"""
+        limiter = TelegramRateLimiter(clock=clock, sleep=clock.sleep)
+
+        for chat_id in range(10):
+            limiter.acquire(chat_id)
+
+        assert clock.now == 0
+
+    def test_global_limit_applies_across_chats(self, clock):
+        """Verifica il limite globale sommando chat diverse"""
+        limiter = TelegramRateLimiter(global_rate=5, clock=clock, sleep=clock.sleep)
+
+        for chat_id in range(6):
+            limiter.acquire(chat_id)
+
+        assert clock.now == pytest.approx(0.2)
+
+    def test_albums_count_every_photo(self, clock):
+        """Verifica che un album da 10 foto valga 10 messaggi per il limite globale e per gruppo"""
+        limiter = TelegramRateLimiter(clock=clock, sleep=clock.sleep)
+
+        for chat_id in range(4):
+            limiter.acquire(chat_id, 10)
+        assert clock.now == pytest.approx(10 / 30)
+
+        limiter.acquire(-100, 10)
+        limiter.acquire(-100, 10)
+        limiter.acquire(-100, 10)
+        assert clock.now >= 60
+
+    def test_backoff_pauses_every_chat(self, clock):
+        """Verifica che un retry_after sospenda tutti gli invii"""
+        limiter = TelegramRateLimiter(clock=clock, sleep=clock.sleep)
+
+        limiter.backoff(10)
+        limiter.acquire(999)
+
+        assert clock.now == pytest.approx(10)
@@ -0,0 +1,115 @@
+"""
+Test suite per data.render_cache
+"""
+import os
+import pytest
+from data.render_cache import RenderCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cache di rendering in una directory temporanea"""
+    return RenderCache(str(tmp_path / "render_cache"))
+
+
+@pytest.fixture
+def image(tmp_path):
+    """Immagine finta appena creata"""
+    path = tmp_path / "created.jpg"
+    path.write_bytes(b"jpeg" * 10)
+    return str(path)
+
+
+class TestGetPut:
+    """Test per get e put"""
+
+    def test_miss_on_empty_cache(self, cache):
+        """Verifica che una chiave sconosciuta non venga trovata"""
+        assert cache.get("abc") is None
+        assert cache.misses == 1
+
+    def test_returns_stored_copy(self, cache, image):
+        """Verifica che l'immagine salvata venga restituita come copia indipendente"""
+        cache.put("abc", image)
+        os.remove(image)
+
+        path = cache.get("abc")
+
+        assert path == cache.path_for("abc")
+        assert open(path, "rb").read() == b"jpeg" * 10
+        assert cache.hits == 1
+
+    def test_survives_restart(self, cache, image):
+        """Verifica che le immagini restino disponibili a una nuova istanza"""
+        cache.put("abc", image)
+
+        assert RenderCache(cache.directory).get("abc") is not None
+
+    def test_no_temporary_files_left(self, cache, image):
+        """Verifica che la scrittura atomica non lasci file temporanei"""
+        cache.put("abc", image)
+
+        assert os.listdir(cache.directory) == ["abc.jpg"]
+
+    def test_keeps_image_format(self, cache):
+        """Verifica che l'estensione del file segua il formato dell'immagine"""
+        path = cache.put("abc", b"\x89PNG\r\n\x1a\n" + b"png" * 10)
+
+        assert path == cache.path_for("abc", "png")
+        assert cache.get("abc") == path
+        assert len(cache) == 1
+
+    def test_evicts_every_format(self, cache, image):
+        """Verifica che l'eviction consideri immagini di formati diversi"""
+        cache.put("a", b"RIFF\x00\x00\x00\x00WEBP" + b"webp" * 10)
+        os.utime(cache.path_for("a", "webp"), (1000, 1000))
+        cache.put("b", image)
+        cache.max_entries = 1
+
+        assert cache.evict() == 1
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+
+
+class TestEvict:
+    """Test per evict"""
+
+    def fill(self, cache, image, keys):
+        """Salva le chiavi date con date di utilizzo crescenti"""
+        for i, key in enumerate(keys):
+            path = cache.put(key, image)
+            os.utime(path, (1000 + i, 1000 + i))
+
+    def test_keeps_most_recent_entries(self, cache, image):
+        """Verifica che oltre max_entries vengano rimosse le immagini meno usate"""
+        self.fill(cache, image, ["a", "b", "c"])
+        cache.max_entries = 2
+
+        assert cache.evict() == 1
+        assert cache.get("a") is None
+        assert len(cache) == 2
+
+    def test_get_refreshes_entry(self, cache, image):
+        """Verifica che un'immagine letta di recente non venga rimossa"""
+        self.fill(cache, image, ["a", "b", "c"])
+        cache.get("a")
+        cache.max_entries = 2
+
+        cache.evict()
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+
+    def test_respects_max_bytes(self, cache, image):
+        """Verifica il limite sulla dimensione complessiva"""
+        self.fill(cache, image, ["a", "b", "c"])
+        cache.max_bytes = 2 * os.path.getsize(image)
+
+        assert cache.evict() == 1
+        assert cache.get("a") is None
+
+    def test_unbounded_by_default(self, cache, image):
+        """Verifica che senza limiti non venga rimosso nulla"""
+        self.fill(cache, image, ["a", "b"])
+
+        assert cache.evict() == 0
@@ -96,6 +96,57 @@ class TestAddDefaultSchedules:
         mock_add_task.assert_not_called()
 
 
+class TestPrepareSchedules:
+    """Test per la fase di preparazione anticipata"""
+    
+    @patch('bot.scheduler.BotScheduler.add_daily_task')
+    @patch('bot.scheduler.PREPARE_LEAD_MINUTES', 10)
+    @patch('bot.scheduler.SCHEDULE_TIMES', [{"hour": 11, "minute": 25}, {"hour": 20, "minute": 0}])
+    def test_adds_prepare_before_each_slot(self, mock_add_task, scheduler):
+        """Verifica che la preparazione venga schedulata in anticipo rispetto a ogni invio"""
+        mock_task = Mock()
+        mock_prepare = Mock()
+        
+        scheduler.add_default_schedules(mock_task, prepare_task=mock_prepare)
+        
+        assert mock_add_task.call_count == 4
+        mock_add_task.assert_any_call(mock_prepare, 11, 15)
+        mock_add_task.assert_any_call(mock_task, 11, 25)
+        mock_add_task.assert_any_call(mock_prepare, 19, 50)
+        mock_add_task.assert_any_call(mock_task, 20, 0)
+    
+    def test_lead_time_wraps_midnight(self):
+        """Verifica calcolo dell'anticipo a cavallo della mezzanotte"""
+        assert BotScheduler.lead_time(0, 5, 10) == (23, 55)
+    
+    def test_lead_time_same_hour(self):
+        """Verifica calcolo dell'anticipo nella stessa ora"""
+        assert BotScheduler.lead_time(11, 25, 10) == (11, 15)
+
+
+class TestAddIntervalTask:
+    """Test per add_interval_task"""
+    
+    @patch('bot.scheduler.schedule.every')
+    def test_applies_jitter(self, mock_schedule, scheduler):
+        """Verifica intervallo casuale attorno al valore richiesto"""
+        mock_task = Mock()
+        
+        scheduler.add_interval_task(mock_task, 600, jitter=0.2)
+        
+        mock_schedule.assert_called_once_with(480)
+        mock_schedule.return_value.to.assert_called_once_with(720)
+        mock_schedule.return_value.to.return_value.seconds.do.assert_called_once_with(mock_task)
+    
+    @patch('bot.scheduler.schedule.every')
+    def test_without_jitter(self, mock_schedule, scheduler):
+        """Verifica intervallo fisso senza jitter"""
+        scheduler.add_interval_task(Mock(), 300)
+        
+        mock_schedule.assert_called_once_with(300)
+        mock_schedule.return_value.to.assert_called_once_with(300)
+
+
 class TestStart:
     """Test per start"""
     
@@ -0,0 +1,136 @@
+"""
+Test suite per data.sqlite_cache
+"""
+import pytest
+from unittest.mock import patch
+from data.sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Crea una cache SQLite temporanea"""
+    cache = SQLiteCache(str(tmp_path / "cache" / "test.sqlite3"), table="test")
+    yield cache
+    cache.close()
+
+
+class TestGetSet:
+    """Test per get e set"""
+
+    def test_returns_none_for_missing_key(self, cache):
+        """Verifica None per chiave assente"""
+        assert cache.get("missing") is None
+        assert cache.misses == 1
+
+    def test_returns_saved_value(self, cache):
+        """Verifica lettura di un valore salvato"""
+        cache.set("key", "MENU")
+
+        assert cache.get("key") == "MENU"
+        assert cache.hits == 1
+
+    def test_overwrites_existing_value(self, cache):
+        """Verifica sovrascrittura di un valore"""
+        cache.set("key", "first")
+        cache.set("key", "second")
+
+        assert cache.get("key") == "second"
+        assert len(cache) == 1
+
+    def test_persists_across_instances(self, tmp_path):
+        """Verifica persistenza su disco tra istanze diverse"""
+        path = str(tmp_path / "persist.sqlite3")
+        first = SQLiteCache(path, table="ocr")
+        first.set("key", "value")
+        first.close()
+
+        second = SQLiteCache(path, table="ocr")
+
+        assert second.get("key") == "value"
+        second.close()
+
+    def test_expired_value_is_a_miss(self, tmp_path):
+        """Verifica che una voce scaduta non venga restituita"""
+        cache = SQLiteCache(str(tmp_path / "age.sqlite3"), max_age=60)
+        with patch('data.sqlite_cache.time.time', return_value=1000):
+            cache.set("key", "old")
+        with patch('data.sqlite_cache.time.time', return_value=1061):
+            assert cache.get("key") is None
+
+    def test_get_many_returns_present_keys(self, cache):
+        """Verifica la lettura a blocchi, con hit e miss contati per chiave"""
+        cache.set_many({"a": "A", "b": "B"})
+
+        assert cache.get_many(["a", "b", "c"]) == {"a": "A", "b": "B"}
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_set_many_commits_once(self, cache):
+        """Verifica che la scrittura a blocchi faccia un solo commit"""
+        with patch.object(cache, "_conn", wraps=cache._conn) as conn:
+            cache.set_many({str(i): str(i) for i in range(50)})
+
+        assert conn.commit.call_count == 1
+        assert len(cache) == 50
+
+    def test_get_many_skips_expired(self, tmp_path):
+        """Verifica che la lettura a blocchi ignori le voci scadute"""
+        cache = SQLiteCache(str(tmp_path / "age.sqlite3"), max_age=60)
+        with patch('data.sqlite_cache.time.time', return_value=1000):
+            cache.set_many({"old": "x"})
+        with patch('data.sqlite_cache.time.time', return_value=1030):
+            cache.set_many({"new": "y"})
+        with patch('data.sqlite_cache.time.time', return_value=1061):
+            assert cache.get_many(["old", "new"]) == {"new": "y"}
+
+    def test_delete_removes_entry(self, cache):
+        """Verifica rimozione di una singola voce"""
+        cache.set("key", "value")
+        cache.delete("key")
+        cache.delete("missing")
+
+        assert cache.get("key") is None
+
+    def test_rejects_invalid_table_name(self, tmp_path):
+        """Verifica rifiuto di nomi tabella non validi"""
+        with pytest.raises(ValueError):
+            SQLiteCache(str(tmp_path / "bad.sqlite3"), table="drop table;")
+
+
+class TestEvict:
+    """Test per evict"""
+
+    def test_removes_expired_entries(self, tmp_path):
+        """Verifica rimozione voci scadute"""
+        cache = SQLiteCache(str(tmp_path / "evict.sqlite3"), max_age=60)
+        with patch('data.sqlite_cache.time.time', return_value=1000):
+            cache.set("old", "value")
+        with patch('data.sqlite_cache.time.time', return_value=1050):
+            cache.set("new", "value")
+
+        with patch('data.sqlite_cache.time.time', return_value=1080):
+            removed = cache.evict()
+
+        assert removed == 1
+        assert len(cache) == 1
+
+    def test_keeps_most_recently_used_entries(self, tmp_path):
+        """Verifica che oltre max_entries vengano rimosse le voci meno usate"""
+        cache = SQLiteCache(str(tmp_path / "lru.sqlite3"), max_entries=2)
+        for i, key in enumerate(["a", "b", "c"]):
+            with patch('data.sqlite_cache.time.time', return_value=1000 + i):
+                cache.set(key, key)
+        with patch('data.sqlite_cache.time.time', return_value=2000):
+            cache.get("a")
+
+        removed = cache.evict()
+
+        assert removed == 1
+        assert cache.get("a") == "a"
+        assert cache.get("b") is None
+        assert cache.get("c") == "c"
+
+    def test_no_limits_removes_nothing(self, cache):
+        """Verifica che senza limiti non venga rimosso nulla"""
+        cache.set("key", "value")
+
+        assert cache.evict() == 0
@@ -0,0 +1,236 @@
+"""
+Test suite per data.story_ledger
+"""
+import json
+import pytest
+from datetime import datetime, timezone
+from data.story_ledger import StoryLedger
+
+
+@pytest.fixture
+def ledger_file(tmp_path):
+    """Percorso temporaneo del registro"""
+    return str(tmp_path / "data" / "ledger.json")
+
+
+@pytest.fixture
+def rendered(tmp_path):
+    """Immagini create finte su disco"""
+    paths = []
+    for name in ("text_1.jpg", "translated_1.jpg"):
+        path = tmp_path / name
+        path.write_bytes(b"img")
+        paths.append(str(path))
+    return paths
+
+
+class TestLoadSave:
+    """Test per caricamento e salvataggio"""
+
+    def test_starts_empty_without_file(self, ledger_file):
+        """Verifica registro vuoto se il file non esiste"""
+        assert StoryLedger(ledger_file).entries == {}
+
+    def test_persists_entries(self, ledger_file, rendered):
+        """Verifica che le voci sopravvivano a un riavvio"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", ocr_text="MENU", rendered=rendered)
+        ledger.save()
+
+        reloaded = StoryLedger(ledger_file)
+
+        assert reloaded.get("1")["ocr_text"] == "MENU"
+        assert reloaded.get(1)["rendered"] == rendered
+
+    def test_handles_corrupted_file(self, ledger_file):
+        """Verifica gestione file corrotto"""
+        ledger = StoryLedger(ledger_file)
+        ledger.save()
+        with open(ledger_file, "w") as f:
+            f.write("{not json")
+
+        assert StoryLedger(ledger_file).entries == {}
+
+    def test_handles_wrong_format(self, ledger_file):
+        """Verifica gestione file con formato inatteso"""
+        StoryLedger(ledger_file).save()
+        with open(ledger_file, "w") as f:
+            json.dump([1, 2, 3], f)
+
+        assert StoryLedger(ledger_file).entries == {}
+
+
+class TestRecord:
+    """Test per record e is_processed"""
+
+    def test_expiry_follows_taken_at(self, ledger_file):
+        """Verifica scadenza a 24h dalla pubblicazione"""
+        taken_at = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+        entry = StoryLedger(ledger_file).record("1", taken_at)
+
+        assert entry["taken_at"] == taken_at.timestamp()
+        assert entry["expires_at"] - entry["taken_at"] == 24 * 3600
+
+    def test_processed_story(self, ledger_file, rendered):
+        """Verifica che una storia registrata risulti elaborata"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", rendered=rendered)
+
+        assert ledger.is_processed("1") is True
+        assert ledger.is_processed("2") is False
+
+    def test_missing_rendered_file_requires_reprocessing(self, ledger_file, rendered):
+        """Verifica rielaborazione se un'immagine creata è sparita"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", rendered=rendered + ["/nonexistent/image.jpg"])
+
+        assert ledger.is_processed("1") is False
+
+    def test_gate_rejected_story_not_processed(self, ledger_file):
+        """Verifica che una storia scartata dal filtro pre-OCR venga ricontrollata"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", gate_rejected=True, rendered=[])
+
+        assert ledger.is_processed("1") is False
+
+    def test_rendered_images_in_story_order(self, ledger_file, rendered, tmp_path):
+        """Verifica raccolta immagini nell'ordine delle storie"""
+        other = tmp_path / "text_2.jpg"
+        other.write_bytes(b"img")
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", rendered=rendered)
+        ledger.record("2", rendered=[str(other)])
+
+        assert ledger.rendered_images(["2", "1", "3"]) == [str(other)] + rendered
+
+    def test_rendered_images_shared_listed_once(self, ledger_file, rendered):
+        """Verifica che le immagini condivise da un duplicato e dal suo originale compaiano una volta"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", rendered=rendered)
+        ledger.record("2", rendered=rendered, duplicate_of="1")
+
+        assert ledger.rendered_images(["1", "2"]) == rendered
+
+    def test_live_story_ids_sorted_by_taken_at(self, ledger_file):
+        """Verifica che le storie attive siano ordinate dalla più vecchia"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("new", taken_at=datetime(2024, 1, 1, 12, tzinfo=timezone.utc))
+        ledger.record("old", taken_at=datetime(2024, 1, 1, 9, tzinfo=timezone.utc))
+        ledger.record("expired", taken_at=datetime(2023, 12, 30, tzinfo=timezone.utc))
+
+        now = datetime(2024, 1, 1, 13, tzinfo=timezone.utc).timestamp()
+        assert ledger.live_story_ids(now=now) == ["old", "new"]
+
+
+class TestFindDuplicate:
+    """Test per find_duplicate"""
+
+    def test_finds_closest_live_story(self, ledger_file):
+        """Verifica che venga restituita la storia con l'impronta più vicina"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("far", phash="00ff", ocr_text="MENU")
+        ledger.record("near", phash="0001", ocr_text="MENU")
+
+        assert ledger.find_duplicate("0000", ocr_text="MENU", max_distance=4)["story_id"] == "near"
+
+    def test_ignores_distant_hashes(self, ledger_file):
+        """Verifica che storie oltre la soglia non siano considerate duplicate"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", phash="ffff", ocr_text="MENU")
+
+        assert ledger.find_duplicate("0000", ocr_text="MENU", max_distance=4) is None
+
+    def test_close_hash_with_different_text_is_not_duplicate(self, ledger_file):
+        """Verifica che un menu diverso sullo stesso modello grafico non venga scartato"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", phash="0001", image_hash="a", ocr_text="PASTA AL POMODORO")
+
+        assert ledger.find_duplicate("0000", image_hash="b", ocr_text="RISOTTO", max_distance=4) is None
+        # Prima dell'OCR conta solo l'immagine identica
+        assert ledger.find_duplicate("0000", image_hash="b", max_distance=4) is None
+
+    def test_text_compared_ignoring_whitespace(self, ledger_file):
+        """Verifica che spazi e a capo diversi non impediscano il riconoscimento"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", phash="0001", ocr_text="PASTA\nAL  POMODORO")
+
+        assert ledger.find_duplicate("0000", ocr_text="PASTA AL POMODORO\n", max_distance=4)["story_id"] == "1"
+
+    def test_identical_image_is_duplicate(self, ledger_file):
+        """Verifica che la stessa immagine venga riconosciuta anche senza testo"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", phash="0000", image_hash="a")
+
+        assert ledger.find_duplicate("0000", image_hash="a")["story_id"] == "1"
+
+    def test_excludes_own_entry(self, ledger_file):
+        """Verifica che una storia rielaborata non risulti duplicata di se stessa"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", phash="0000", image_hash="a")
+
+        assert ledger.find_duplicate("0000", image_hash="a", exclude="1") is None
+
+    def test_resolves_to_original(self, ledger_file):
+        """Verifica che un duplicato già registrato non faccia da originale"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("original", phash="0003", ocr_text="MENU")
+        ledger.record("copy", phash="0000", ocr_text="MENU", duplicate_of="original")
+
+        assert ledger.find_duplicate("0000", ocr_text="MENU", max_distance=4)["story_id"] == "original"
+
+    def test_duplicate_replaces_expired_original(self, ledger_file):
+        """Verifica che un duplicato faccia da originale quando questo non è più nel registro"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("copy", phash="0000", ocr_text="MENU", duplicate_of="original")
+
+        assert ledger.find_duplicate("0000", ocr_text="MENU", max_distance=4)["story_id"] == "copy"
+
+    def test_ignores_gate_rejected_stories(self, ledger_file):
+        """Verifica che una storia scartata dal filtro non faccia da originale"""
+        ledger = StoryLedger(ledger_file)
+        ledger.record("1", phash="0000", image_hash="a", gate_rejected=True)
+
+        assert ledger.find_duplicate("0000", image_hash="a") is None
+
+    def test_ignores_expired_stories(self, ledger_file):
+        """Verifica che le storie scadute non vengano usate come originali"""
+        ledger = StoryLedger(ledger_file)
+        entry = ledger.record("1", phash="0000", image_hash="a")
+
+        assert ledger.find_duplicate("0000", image_hash="a", now=entry["expires_at"] + 1) is None
+
+
+class TestCollectGarbage:
+    """Test per collect_garbage"""
+
+    def test_removes_expired_entries_and_files(self, ledger_file, rendered, tmp_path):
+        """Verifica rimozione delle storie scadute e dei loro file"""
+        image = tmp_path / "story.jpg"
+        image.write_bytes(b"img")
+        ledger = StoryLedger(ledger_file)
+        entry = ledger.record("1", image_path=str(image), rendered=rendered)
+
+        removed = ledger.collect_garbage(now=entry["expires_at"] + 1)
+
+        assert removed == 1
+        assert ledger.get("1") is None
+        assert not image.exists()
+        assert not any((tmp_path / name).exists() for name in ("text_1.jpg", "translated_1.jpg"))
+
+    def test_keeps_files_shared_with_live_entries(self, ledger_file, rendered):
+        """Verifica che un'immagine in cache usata anche da una storia attiva non venga rimossa"""
+        ledger = StoryLedger(ledger_file)
+        old = ledger.record("1", taken_at=datetime(2024, 1, 1, 9, tzinfo=timezone.utc), rendered=rendered)
+        ledger.record("2", taken_at=datetime(2024, 1, 1, 20, tzinfo=timezone.utc), rendered=rendered)
+
+        assert ledger.collect_garbage(now=old["expires_at"] + 1) == 1
+        assert ledger.is_processed("2")
+
+    def test_keeps_live_entries(self, ledger_file, rendered):
+        """Verifica che le storie ancora attive restino nel registro"""
+        ledger = StoryLedger(ledger_file)
+        entry = ledger.record("1", rendered=rendered)
+
+        assert ledger.collect_garbage(now=entry["expires_at"] - 1) == 0
+        assert ledger.is_processed("1")
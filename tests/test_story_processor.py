@@ -0,0 +1,791 @@
+"""
+Test suite per core.story_processor
+"""
+import asyncio
+import itertools
+import os
+import time
+import zlib
+import httpx
+from datetime import datetime, timezone
+import pytest
+import numpy as np
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, AsyncMock
+from telegram import Update, Message, Chat
+from bot.handlers import help_command
+from core.ocr import OCRExecutor
+from data.story_ledger import StoryLedger
+from data.render_cache import RenderCache
+from data.sqlite_cache import SQLiteCache
+from core.story_processor import (
+    fetch_story_images, download_and_send_stories,
+    prepare_stories, poll_stories, deliver_stories
+)
+
+
+@pytest.fixture
+def download_dir(tmp_path, monkeypatch):
+    """Directory temporanea per i download"""
+    target = tmp_path / "stories"
+    target.mkdir()
+    monkeypatch.setattr('core.story_processor.DOWNLOAD_DIR', str(target))
+    monkeypatch.setattr('core.story_processor.TARGET_USER', "mensa")
+    return target
+
+
+def make_story(story_id, media_type=1, url="https://cdn.example.com/{id}.jpg"):
+    """Crea una storia Instagram finta"""
+    story = Mock()
+    story.id = story_id
+    story.media_type = media_type
+    story.thumbnail_url = url.format(id=story_id) if url else None
+    story.taken_at = datetime.now(timezone.utc)
+    return story
+
+
+class TestFetchStoryImages:
+    """Test per fetch_story_images"""
+
+    @pytest.mark.asyncio
+    async def test_keeps_images_in_memory(self, download_dir):
+        """Verifica che le immagini scaricate restino in memoria senza essere scritte"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"img"))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images([make_story("1")], client=client)
+
+        assert [(s.id, data) for s, data in result] == [("1", b"img")]
+        assert list(download_dir.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_reads_existing_file(self, download_dir):
+        """Verifica che una miniatura già su disco venga letta senza scaricarla"""
+        (download_dir / "mensa_1.jpg").write_bytes(b"cached")
+        transport = httpx.MockTransport(Mock(side_effect=AssertionError("non deve scaricare")))
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images([make_story("1")], client=client)
+
+        assert result[0][1] == b"cached"
+
+    @pytest.mark.asyncio
+    async def test_fetches_all_photo_stories(self, download_dir):
+        """Verifica download di tutte le storie foto, nell'ordine originale"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=request.url.path.encode()))
+        stories = [make_story("1"), make_story("2"), make_story("3")]
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images(stories, client=client)
+
+        assert [(s.id, data) for s, data in result] == [(i, f"/{i}.jpg".encode()) for i in ("1", "2", "3")]
+
+    @pytest.mark.asyncio
+    async def test_skips_videos_and_missing_urls(self, download_dir):
+        """Verifica che video e storie senza URL vengano ignorati"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"img"))
+        stories = [make_story("1", media_type=2), make_story("2", url=None), make_story("3")]
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images(stories, client=client)
+
+        assert [s.id for s, _ in result] == ["3"]
+
+    @pytest.mark.asyncio
+    async def test_drops_failed_downloads(self, download_dir):
+        """Verifica che un download fallito non blocchi gli altri"""
+        def handler(request):
+            if "bad" in request.url.path:
+                return httpx.Response(404)
+            return httpx.Response(200, content=b"img")
+
+        transport = httpx.MockTransport(handler)
+        stories = [make_story("ok"), make_story("bad")]
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images(stories, client=client)
+
+        assert [s.id for s, _ in result] == ["ok"]
+
+    @pytest.mark.asyncio
+    async def test_downloads_run_concurrently(self, download_dir, monkeypatch):
+        """Verifica che i download avvengano in parallelo con concorrenza limitata"""
+        monkeypatch.setattr('core.story_processor.DOWNLOAD_CONCURRENCY', 3)
+        active = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return httpx.Response(200, content=b"img")
+
+        transport = httpx.MockTransport(handler)
+        stories = [make_story(str(i)) for i in range(9)]
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images(stories, client=client)
+
+        assert len(result) == 9
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_times_out_slow_story(self, download_dir, monkeypatch):
+        """Verifica timeout per singola storia"""
+        monkeypatch.setattr('core.story_processor.DOWNLOAD_TIMEOUT', 0.05)
+
+        async def handler(request):
+            if "slow" in request.url.path:
+                await asyncio.sleep(1)
+            return httpx.Response(200, content=b"img")
+
+        transport = httpx.MockTransport(handler)
+        stories = [make_story("slow"), make_story("fast")]
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            result = await fetch_story_images(stories, client=client)
+
+        assert [s.id for s, _ in result] == ["fast"]
+
+
+class FakeTranslator:
+    """Traduttore finto usato come context manager asincrono"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    async def translate_many(self, texts, dest="en"):
+        return [f"{text} ({dest})" for text in texts]
+
+
+def blocking(seconds, result=None):
+    """Crea una funzione che blocca il thread chiamante per `seconds` secondi"""
+    def _call(*args, **kwargs):
+        time.sleep(seconds)
+        return result
+    return _call
+
+
+class PipelineEnv:
+    """Servizi esterni finti per eseguire download_and_send_stories nei test"""
+
+    def __init__(self, tmp_path, monkeypatch, delay=0.0, stories=None, ocr_text="MENU DEL GIORNO"):
+        self.tmp_path = tmp_path
+        self.delay = delay
+        self.stories = stories if stories is not None else [make_story("1")]
+
+        self.cl = Mock()
+        self.cl.user_info_by_username = Mock(side_effect=blocking(delay, Mock(pk=1, username="mensa")))
+        self.cl.user_stories = Mock(side_effect=lambda user_id: blocking(delay, self.stories)())
+
+        self.telegram = Mock()
+        self.telegram.send_media_group = Mock(side_effect=blocking(delay, True))
+
+        self.fetch_images = AsyncMock(side_effect=self._fetch)
+        self.render = Mock(side_effect=self._render(delay))
+        self.ocr = Mock(side_effect=blocking(delay, ocr_text))
+        self.ocr_executor = OCRExecutor(max_workers=1, executor=ThreadPoolExecutor(max_workers=1), gate=False)
+
+        monkeypatch.setattr('core.story_processor.TARGET_USER', "mensa")
+        monkeypatch.setattr('core.story_processor._user_ids', {})
+        monkeypatch.setattr('core.story_processor._pipeline_lock', asyncio.Lock())
+        monkeypatch.setattr('core.story_processor.TELEGRAM_CHAT_ID', None)
+        monkeypatch.setattr('core.story_processor.DOWNLOAD_DIR', str(tmp_path / "stories"))
+        monkeypatch.setattr('core.story_processor.CREATED_IMAGES_DIR', str(tmp_path / "created"))
+        monkeypatch.setattr('data.story_ledger.STORY_LEDGER_FILE', str(tmp_path / "ledger.json"))
+        monkeypatch.setattr('core.story_processor.load_subscribers', lambda: [1, 2])
+        monkeypatch.setattr('core.story_processor.fetch_story_images', self.fetch_images)
+        monkeypatch.setattr('core.story_processor.get_ocr_executor', lambda: self.ocr_executor)
+        monkeypatch.setattr('core.story_processor.TranslationService', FakeTranslator)
+        monkeypatch.setattr('utils.image_processing.create_long_image', self.render)
+        render_cache = RenderCache(str(tmp_path / "render_cache"))
+        monkeypatch.setattr('core.story_processor.get_render_cache', lambda: render_cache)
+        monkeypatch.setattr('core.story_processor.TelegramService', Mock(return_value=self.telegram))
+        monkeypatch.setattr('core.story_processor.get_file_id_store', Mock())
+        monkeypatch.setattr('core.ocr_engines.pytesseract.image_to_string', self.ocr)
+
+    async def _fetch(self, stories, client=None):
+        return [(story, self.story_image(story.id)) for story in stories]
+
+    def distinct_menus(self):
+        """Ogni OCR legge un menu diverso: storie distinte non condividono le immagini create"""
+        counter = itertools.count(1)
+        delay = self.delay
+        self.ocr.side_effect = lambda *args, **kwargs: blocking(delay, f"MENU DEL GIORNO {next(counter)}")()
+
+    @staticmethod
+    def story_image(story_id):
+        """Immagine diversa per ogni storia, così da non essere riconosciute come duplicate"""
+        rng = np.random.default_rng(zlib.crc32(str(story_id).encode()))
+        _, encoded = cv2.imencode(".png", rng.integers(0, 255, (64, 64, 3), dtype=np.uint8))
+        return encoded.tobytes()
+
+    @staticmethod
+    def _render(delay):
+        def _call(text, output_path=None, **kwargs):
+            time.sleep(delay)
+            if output_path is None:
+                return text.encode()
+            with open(output_path, "w") as f:
+                f.write(text)
+            return output_path
+        return _call
+
+    def sent_images(self, chat_id="1"):
+        """Contenuti delle immagini inviate a una chat, in tutte le chiamate a send_media_group"""
+        images = []
+        for call in self.telegram.send_media_group.call_args_list:
+            if call[0][0] == chat_id:
+                for image in call[0][1]:
+                    if isinstance(image, str):
+                        with open(image, "rb") as f:
+                            image = f.read()
+                    images.append(image)
+        return images
+
+    def close(self):
+        self.ocr_executor.shutdown()
+
+
+@pytest.fixture
+def pipeline_env(tmp_path, monkeypatch):
+    """Ambiente del pipeline con servizi finti istantanei"""
+    env = PipelineEnv(tmp_path, monkeypatch)
+    yield env
+    env.close()
+
+
+class TestStoryLedgerIntegration:
+    """Test per il riuso delle storie già elaborate tra esecuzioni"""
+
+    @pytest.mark.asyncio
+    async def test_second_run_skips_processed_stories(self, pipeline_env):
+        """Verifica che una storia già elaborata non venga riscaricata né rielaborata"""
+        await download_and_send_stories(pipeline_env.cl)
+        first_sent = pipeline_env.sent_images()
+        pipeline_env.telegram.send_media_group.reset_mock()
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 1
+        assert pipeline_env.render.call_count == 2
+        assert pipeline_env.fetch_images.await_count == 1
+        # Le immagini della storia vengono comunque inviate di nuovo
+        assert pipeline_env.sent_images() == first_sent
+        assert len(first_sent) == 2
+
+    @pytest.mark.asyncio
+    async def test_only_new_stories_are_processed(self, pipeline_env):
+        """Verifica che venga elaborata solo la storia nuova"""
+        pipeline_env.distinct_menus()
+        await download_and_send_stories(pipeline_env.cl)
+        pipeline_env.stories = pipeline_env.stories + [make_story("2")]
+        pipeline_env.telegram.send_media_group.reset_mock()
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        new_stories = pipeline_env.fetch_images.await_args[0][0]
+        assert [s.id for s in new_stories] == ["2"]
+        assert pipeline_env.fetch_images.await_count == 2
+        assert len(pipeline_env.sent_images()) == 4
+
+    @pytest.mark.asyncio
+    async def test_story_without_text_is_not_reprocessed(self, tmp_path, monkeypatch):
+        """Verifica che anche le storie senza testo vengano registrate"""
+        env = PipelineEnv(tmp_path, monkeypatch, ocr_text="")
+
+        await download_and_send_stories(env.cl)
+        await download_and_send_stories(env.cl)
+
+        assert env.ocr.call_count == 1
+        env.telegram.send_media_group.assert_not_called()
+        env.close()
+
+
+class TestInMemoryPipeline:
+    """Test per il passaggio in memoria tra download e OCR"""
+
+    @pytest.mark.asyncio
+    async def test_ocr_reads_downloaded_bytes(self, pipeline_env, monkeypatch):
+        """Verifica che l'OCR non rilegga la miniatura dal disco"""
+        imread = Mock(side_effect=AssertionError("non deve leggere dal disco"))
+        monkeypatch.setattr('core.ocr.cv2.imread', imread)
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 1
+        assert len(pipeline_env.sent_images()) == 2
+
+    @pytest.mark.asyncio
+    async def test_rendered_images_sent_from_memory(self, pipeline_env):
+        """Verifica che le immagini appena create vengano inviate senza rileggerle dal disco"""
+        await download_and_send_stories(pipeline_env.cl)
+
+        sent = pipeline_env.telegram.send_media_group.call_args_list[0][0][1]
+        assert sent == [b"MENU DEL GIORNO", b"MENU DEL GIORNO (en)"]
+        # Salvate comunque su disco per le esecuzioni successive
+        rendered = StoryLedger().get("1")["rendered"]
+        assert [open(path, "rb").read() for path in rendered] == sent
+
+    @pytest.mark.asyncio
+    async def test_combined_layout_sends_one_image(self, pipeline_env, monkeypatch):
+        """Verifica che con RENDER_LAYOUT combinato ogni storia produca e invii una sola immagine"""
+        monkeypatch.setattr('core.story_processor.RENDER_LAYOUT', "stacked")
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        pipeline_env.render.assert_called_once()
+        kwargs = pipeline_env.render.call_args.kwargs
+        assert kwargs["text"] == "MENU DEL GIORNO"
+        assert kwargs["translated_text"] == "MENU DEL GIORNO (en)"
+        assert kwargs["layout"] == "stacked"
+        assert len(pipeline_env.sent_images()) == 1
+        assert len(StoryLedger().get("1")["rendered"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_long_menu_falls_back_to_separate_images(self, pipeline_env, monkeypatch):
+        """Verifica che un menu troppo lungo per l'immagine combinata produca due immagini"""
+        monkeypatch.setattr('core.story_processor.RENDER_LAYOUT', "stacked")
+        pipeline_env.ocr.side_effect = lambda *args, **kwargs: "\n".join(f"PIATTO {i}" for i in range(20))
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert pipeline_env.render.call_count == 2
+        assert all("translated_text" not in call.kwargs for call in pipeline_env.render.call_args_list)
+        assert len(pipeline_env.sent_images()) == 2
+
+    @pytest.mark.asyncio
+    async def test_rendered_images_stored_once_in_render_cache(self, pipeline_env):
+        """Verifica che le immagini create vengano salvate solo nella cache di rendering"""
+        await download_and_send_stories(pipeline_env.cl)
+
+        rendered = StoryLedger().get("1")["rendered"]
+        render_cache = pipeline_env.tmp_path / "render_cache"
+        assert all(os.path.dirname(path) == str(render_cache) for path in rendered)
+        assert len(os.listdir(render_cache)) == 2
+        assert not os.listdir(pipeline_env.tmp_path / "created")
+
+    @pytest.mark.asyncio
+    async def test_cached_images_sent_by_path(self, pipeline_env):
+        """Verifica che un'immagine già in cache non venga ridisegnata né riletta prima dell'invio"""
+        await download_and_send_stories(pipeline_env.cl)
+        pipeline_env.stories = [make_story("2")]
+        pipeline_env.telegram.send_media_group.reset_mock()
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert pipeline_env.render.call_count == 2
+        sent = pipeline_env.telegram.send_media_group.call_args_list[0][0][1]
+        assert sent == StoryLedger().get("1")["rendered"]
+
+    @pytest.mark.asyncio
+    async def test_thumbnail_persisted_in_background(self, pipeline_env):
+        """Verifica che la miniatura venga comunque salvata su disco e registrata"""
+        await download_and_send_stories(pipeline_env.cl)
+
+        path = pipeline_env.tmp_path / "stories" / "mensa_1.jpg"
+        assert path.exists()
+        assert StoryLedger().get("1")["image_path"] == str(path)
+
+    @pytest.mark.asyncio
+    async def test_persistence_can_be_disabled(self, pipeline_env, monkeypatch):
+        """Verifica che senza PERSIST_DOWNLOADS la miniatura non venga scritta"""
+        monkeypatch.setattr('core.story_processor.PERSIST_DOWNLOADS', False)
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert not (pipeline_env.tmp_path / "stories" / "mensa_1.jpg").exists()
+        assert StoryLedger().get("1")["image_path"] is None
+        assert len(pipeline_env.sent_images()) == 2
+
+
+class TestNearDuplicateStories:
+    """Test per il riconoscimento delle storie ripubblicate"""
+
+    @staticmethod
+    def repost_of(env, original_id):
+        """Fa scaricare per "2" l'immagine di `original_id` con uno sticker in un angolo"""
+        image = cv2.imdecode(np.frombuffer(env.story_image(original_id), dtype=np.uint8), cv2.IMREAD_COLOR)
+        image[:4, :4] = 255
+        repost = cv2.imencode(".png", image)[1].tobytes()
+
+        async def _fetch(stories, client=None):
+            return [(s, repost if s.id == "2" else env.story_image(s.id)) for s in stories]
+        env.fetch_images.side_effect = _fetch
+
+    @pytest.mark.asyncio
+    async def test_duplicate_in_same_run_sent_once(self, pipeline_env):
+        """Verifica che due storie quasi identiche nella stessa esecuzione vengano inviate una sola volta"""
+        pipeline_env.stories = [make_story("1"), make_story("2")]
+        self.repost_of(pipeline_env, "1")
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        # L'originale non è ancora pronto: la copia viene elaborata, ma porta alle stesse immagini
+        assert len(pipeline_env.sent_images()) == 2
+        assert StoryLedger().get("2")["rendered"] == StoryLedger().get("1")["rendered"]
+        assert StoryLedger().get("2")["duplicate_of"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_across_runs_not_resent(self, pipeline_env):
+        """Verifica che una ripubblicazione successiva riusi l'elaborazione della prima storia"""
+        await download_and_send_stories(pipeline_env.cl)
+        pipeline_env.stories = [make_story("1"), make_story("2")]
+        self.repost_of(pipeline_env, "1")
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        entry = StoryLedger().get("2")
+        assert entry["duplicate_of"] == "1"
+        assert entry["translated_text"] == "MENU DEL GIORNO (en)"
+        # L'OCR conferma che il testo è lo stesso; traduzione e rendering non vengono ripetuti
+        assert pipeline_env.ocr.call_count == 2
+        assert pipeline_env.render.call_count == 2
+        # Seconda esecuzione: solo le immagini della storia originale
+        assert len(pipeline_env.sent_images()) == 4
+
+    @pytest.mark.asyncio
+    async def test_identical_repost_skips_ocr(self, pipeline_env):
+        """Verifica che la stessa immagine ripubblicata non passi nemmeno dall'OCR"""
+        await download_and_send_stories(pipeline_env.cl)
+        pipeline_env.stories = [make_story("1"), make_story("2")]
+
+        async def _fetch(stories, client=None):
+            return [(s, pipeline_env.story_image("1")) for s in stories]
+        pipeline_env.fetch_images.side_effect = _fetch
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert StoryLedger().get("2")["duplicate_of"] == "1"
+        assert pipeline_env.ocr.call_count == 1
+        assert len(pipeline_env.sent_images()) == 4
+
+    @pytest.mark.asyncio
+    async def test_different_menu_on_same_template_is_processed(self, pipeline_env):
+        """Verifica che un menu diverso sullo stesso sfondo non venga scambiato per un duplicato"""
+        pipeline_env.ocr.side_effect = ["PASTA AL POMODORO", "RISOTTO AI FUNGHI"]
+        await download_and_send_stories(pipeline_env.cl)
+        pipeline_env.stories = [make_story("1"), make_story("2")]
+        self.repost_of(pipeline_env, "1")
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert "duplicate_of" not in StoryLedger().get("2")
+        assert pipeline_env.sent_images()[-2:] == [b"RISOTTO AI FUNGHI", b"RISOTTO AI FUNGHI (en)"]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_sent_after_original_expires(self, pipeline_env):
+        """Verifica che il menu resti disponibile quando resta pubblicata solo la ripubblicazione"""
+        await download_and_send_stories(pipeline_env.cl)
+        pipeline_env.stories = [make_story("2")]
+        self.repost_of(pipeline_env, "1")
+
+        await download_and_send_stories(pipeline_env.cl)
+        assert len(pipeline_env.sent_images()) == 4
+
+        # L'originale scade e viene rimosso dal registro: il duplicato conserva le immagini
+        ledger = StoryLedger()
+        ledger.get("1")["expires_at"] = time.time() - 1
+        ledger.save()
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert StoryLedger().get("1") is None
+        assert pipeline_env.sent_images()[4:] == [b"MENU DEL GIORNO", b"MENU DEL GIORNO (en)"]
+
+    @pytest.mark.asyncio
+    async def test_distinct_stories_both_processed(self, pipeline_env):
+        """Verifica che storie diverse non vengano scambiate per duplicati"""
+        pipeline_env.distinct_menus()
+        pipeline_env.stories = [make_story("1"), make_story("2")]
+
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 2
+        assert len(pipeline_env.sent_images()) == 4
+
+
+class TestMenuGateRejections:
+    """Test per le storie scartate dal filtro pre-OCR"""
+
+    @pytest.mark.asyncio
+    async def test_rejected_story_is_retried(self, pipeline_env, monkeypatch):
+        """Verifica che una storia scartata non sia definitiva e venga elaborata se il filtro cambia idea"""
+        pipeline_env.ocr_executor.gate = True
+        # Con la cache OCR dell'applicazione: la decisione di scarto non deve restare in cache
+        pipeline_env.ocr_executor.cache = SQLiteCache(":memory:", table="ocr")
+        monkeypatch.setattr('core.ocr.classify_story', Mock(return_value=False))
+        await poll_stories(pipeline_env.cl)
+
+        assert StoryLedger().get("1")["gate_rejected"] is True
+        pipeline_env.ocr.assert_not_called()
+
+        monkeypatch.setattr('core.ocr.classify_story', Mock(return_value=True))
+        await download_and_send_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 1
+        assert len(pipeline_env.sent_images()) == 2
+        assert "gate_rejected" not in StoryLedger().get("1")
+
+
+class TestStreamingDelivery:
+    """Test per l'invio progressivo delle storie pronte"""
+
+    @pytest.mark.asyncio
+    async def test_first_story_sent_before_last_is_rendered(self, tmp_path, monkeypatch):
+        """Verifica che la prima storia venga inviata prima che l'ultima sia elaborata"""
+        monkeypatch.setattr('core.story_processor.PIPELINE_DELIVER_BATCH', 1)
+        env = PipelineEnv(tmp_path, monkeypatch, delay=0.05,
+                          stories=[make_story(str(i)) for i in range(4)])
+        env.distinct_menus()
+        events = []
+        send = env.telegram.send_media_group.side_effect
+        render = env.render.side_effect
+        env.telegram.send_media_group.side_effect = lambda *a: events.append("send") or send(*a)
+        env.render.side_effect = lambda text, **kw: events.append("render") or render(text, **kw)
+
+        await download_and_send_stories(env.cl)
+
+        # Almeno un rendering avviene dopo il primo invio
+        assert events.index("send") < len(events) - 1 - events[::-1].index("render")
+        assert len(env.sent_images()) == 8
+        env.close()
+
+    @pytest.mark.asyncio
+    async def test_stories_sent_in_instagram_order(self, tmp_path, monkeypatch):
+        """Verifica che una storia lenta non venga superata da quelle pubblicate dopo"""
+        monkeypatch.setattr('core.story_processor.PIPELINE_DELIVER_BATCH', 1)
+        env = PipelineEnv(tmp_path, monkeypatch, stories=[make_story(str(i)) for i in range(4)])
+        env.distinct_menus()
+
+        async def _fetch(stories, client=None):
+            if stories[0].id == "0":
+                await asyncio.sleep(0.2)
+            return [(story, env.story_image(story.id)) for story in stories]
+        env.fetch_images.side_effect = _fetch
+
+        await download_and_send_stories(env.cl)
+
+        ledger = StoryLedger()
+        texts = [ledger.get(str(i))["ocr_text"].encode() for i in range(4)]
+        assert env.sent_images()[::2] == texts
+        env.close()
+
+    @pytest.mark.asyncio
+    async def test_dropped_story_does_not_hold_back_later_ones(self, tmp_path, monkeypatch):
+        """Verifica che una storia scartata non blocchi l'invio di quelle successive"""
+        monkeypatch.setattr('core.story_processor.PIPELINE_DELIVER_BATCH', 1)
+        env = PipelineEnv(tmp_path, monkeypatch, stories=[make_story(str(i)) for i in range(3)])
+        env.ocr.side_effect = ["MENU UNO", "", "MENU TRE"]
+
+        await download_and_send_stories(env.cl)
+
+        assert env.sent_images()[::2] == [b"MENU UNO", b"MENU TRE"]
+        env.close()
+
+
+class TestPrepareAndDeliver:
+    """Test per le fasi separate di preparazione e invio"""
+
+    @pytest.mark.asyncio
+    async def test_prepare_renders_without_sending(self, pipeline_env):
+        """Verifica che la preparazione crei le immagini senza inviarle"""
+        ready = await prepare_stories(pipeline_env.cl)
+
+        assert ready == 2
+        assert pipeline_env.render.call_count == 2
+        pipeline_env.telegram.send_media_group.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_deliver_sends_prepared_images_only(self, pipeline_env):
+        """Verifica che l'invio usi le immagini preparate senza rielaborare le storie"""
+        await prepare_stories(pipeline_env.cl)
+
+        await deliver_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 1
+        assert pipeline_env.fetch_images.await_count == 1
+        assert len(pipeline_env.sent_images()) == 2
+        assert pipeline_env.telegram.send_media_group.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_deliver_processes_stories_posted_after_prepare(self, pipeline_env):
+        """Verifica che una storia pubblicata dopo la preparazione venga elaborata e inviata"""
+        pipeline_env.distinct_menus()
+        await prepare_stories(pipeline_env.cl)
+        pipeline_env.stories = pipeline_env.stories + [make_story("2")]
+
+        await deliver_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 2
+        assert pipeline_env.cl.user_stories.call_count == 2
+        assert len(pipeline_env.sent_images()) == 4
+
+    @pytest.mark.asyncio
+    async def test_deliver_skips_stories_no_longer_published(self, pipeline_env):
+        """Verifica che le storie ancora nel registro ma tolte da Instagram non vengano inviate"""
+        await prepare_stories(pipeline_env.cl)
+        pipeline_env.stories = [make_story("2")]
+        await prepare_stories(pipeline_env.cl)
+
+        await deliver_stories(pipeline_env.cl)
+
+        assert pipeline_env.sent_images() == [b"MENU DEL GIORNO", b"MENU DEL GIORNO (en)"]
+        assert StoryLedger().get("1") is not None
+
+    @pytest.mark.asyncio
+    async def test_deliver_waits_for_running_prepare(self, tmp_path, monkeypatch):
+        """Verifica che l'invio aspetti la preparazione in corso invece di leggere un registro vecchio"""
+        env = PipelineEnv(tmp_path, monkeypatch, delay=0.1)
+
+        run = asyncio.create_task(prepare_stories(env.cl))
+        await asyncio.sleep(0.05)
+        await deliver_stories(env.cl)
+        await run
+
+        assert env.ocr.call_count == 1
+        assert len(env.sent_images()) == 2
+        env.close()
+
+    @pytest.mark.asyncio
+    async def test_deliver_uses_ledger_when_instagram_fails(self, pipeline_env):
+        """Verifica che se Instagram non risponde vengano inviate le storie preparate"""
+        await prepare_stories(pipeline_env.cl)
+        pipeline_env.cl.user_stories.side_effect = RuntimeError("instagram giù")
+
+        await deliver_stories(pipeline_env.cl)
+
+        assert len(pipeline_env.sent_images()) == 2
+
+    @pytest.mark.asyncio
+    async def test_deliver_falls_back_to_full_pipeline(self, pipeline_env):
+        """Verifica che senza preparazione l'invio esegua l'intero pipeline"""
+        await deliver_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 1
+        assert len(pipeline_env.sent_images()) == 2
+
+    @pytest.mark.asyncio
+    async def test_prepare_skips_processed_stories(self, pipeline_env):
+        """Verifica che una seconda preparazione non rielabori le storie già pronte"""
+        await prepare_stories(pipeline_env.cl)
+        ready = await prepare_stories(pipeline_env.cl)
+
+        assert ready == 2
+        assert pipeline_env.ocr.call_count == 1
+        assert pipeline_env.fetch_images.await_count == 1
+
+
+class TestStoryPolling:
+    """Test per il controllo periodico delle storie"""
+
+    @pytest.mark.asyncio
+    async def test_poll_processes_only_new_stories(self, pipeline_env):
+        """Verifica che ogni controllo elabori solo le storie non ancora viste"""
+        await poll_stories(pipeline_env.cl)
+        pipeline_env.stories = pipeline_env.stories + [make_story("2")]
+        await poll_stories(pipeline_env.cl)
+        await poll_stories(pipeline_env.cl)
+
+        assert pipeline_env.ocr.call_count == 2
+        assert pipeline_env.fetch_images.await_count == 2
+        pipeline_env.telegram.send_media_group.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_user_lookup_is_cached(self, pipeline_env):
+        """Verifica che l'utente Instagram venga cercato una sola volta"""
+        await poll_stories(pipeline_env.cl)
+        await poll_stories(pipeline_env.cl)
+
+        assert pipeline_env.cl.user_info_by_username.call_count == 1
+        assert pipeline_env.cl.user_stories.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_poll_skipped_while_pipeline_running(self, tmp_path, monkeypatch):
+        """Verifica che un controllo non si sovrapponga a un pipeline in corso"""
+        env = PipelineEnv(tmp_path, monkeypatch, delay=0.1)
+
+        run = asyncio.create_task(prepare_stories(env.cl))
+        await asyncio.sleep(0.05)
+        skipped = await poll_stories(env.cl)
+        await run
+
+        assert skipped is None
+        assert env.cl.user_stories.call_count == 1
+        env.close()
+
+    @pytest.mark.asyncio
+    async def test_deliver_after_poll_reads_cache(self, pipeline_env):
+        """Verifica che dopo il polling l'invio non rielabori nulla"""
+        await poll_stories(pipeline_env.cl)
+
+        await deliver_stories(pipeline_env.cl)
+
+        assert pipeline_env.fetch_images.await_count == 1
+        assert pipeline_env.ocr.call_count == 1
+        assert len(pipeline_env.sent_images()) == 2
+
+
+class TestBatchedTranslationStage:
+    """Test per lo stadio di traduzione a batch"""
+
+    @pytest.mark.asyncio
+    async def test_stories_translated_together(self, tmp_path, monkeypatch):
+        """Verifica che le storie pronte insieme vengano tradotte con una sola chiamata"""
+        env = PipelineEnv(tmp_path, monkeypatch, stories=[make_story(str(i)) for i in range(3)])
+        calls = []
+
+        class RecordingTranslator(FakeTranslator):
+            async def translate_many(self, texts, dest="en"):
+                calls.append(list(texts))
+                return await super().translate_many(texts, dest)
+
+        monkeypatch.setattr('core.story_processor.TranslationService', RecordingTranslator)
+
+        await download_and_send_stories(env.cl)
+
+        assert sum(len(texts) for texts in calls) == 3
+        assert len(calls) < 3
+        env.close()
+
+
+class TestEventLoopResponsiveness:
+    """Test che il pipeline non blocchi l'event loop condiviso con gli handler del bot"""
+
+    @pytest.fixture
+    def slow_pipeline_env(self, tmp_path, monkeypatch):
+        """Sostituisce servizi esterni con versioni bloccanti lente"""
+        env = PipelineEnv(tmp_path, monkeypatch, delay=0.3)
+        yield env
+        env.close()
+
+    @pytest.mark.asyncio
+    async def test_handlers_stay_responsive_during_run(self, slow_pipeline_env):
+        """Verifica che /help risponda rapidamente mentre il pipeline è in esecuzione"""
+        cl, telegram = slow_pipeline_env.cl, slow_pipeline_env.telegram
+
+        update = Mock(spec=Update)
+        update.effective_chat = Mock(spec=Chat)
+        update.effective_chat.id = 12345
+        update.message = Mock(spec=Message)
+        update.message.reply_text = AsyncMock()
+
+        latencies = []
+        run = asyncio.create_task(download_and_send_stories(cl))
+        while not run.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            await help_command(update, Mock())
+            latencies.append(time.perf_counter() - start)
+        await run
+
+        # Il pipeline è arrivato fino all'invio, passando da tutti i passi bloccanti
+        assert telegram.send_media_group.call_count == 2
+        assert len(latencies) > 10
+        # Ogni passo bloccante dura 0.3s: se girasse sull'event loop la latenza lo supererebbe
+        assert max(latencies) < 0.15
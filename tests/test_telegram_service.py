@@ -1,8 +1,10 @@
 """
 Test suite per services.telegram_service
 """
+import json
 import pytest
 from unittest.mock import Mock, patch, mock_open, MagicMock
+from data.sqlite_cache import SQLiteCache
 from services.telegram_service import TelegramService
 
 
@@ -237,3 +239,194 @@ class TestSendBatch:
         assert result["success"] is False
         assert result["rate_limited"] is True
         assert "retry_after" in result
+
+
+def media_group_response(*file_ids):
+    """Crea una risposta sendMediaGroup con i file_id indicati"""
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {
+        "ok": True,
+        "result": [
+            {"photo": [{"file_id": f"{file_id}_small"}, {"file_id": file_id}]}
+            for file_id in file_ids
+        ]
+    }
+    return response
+
+
+class TestFileIdReuse:
+    """Test per il riuso dei file_id dopo il primo caricamento"""
+    
+    @pytest.fixture
+    def images(self, tmp_path):
+        """Due immagini reali su disco"""
+        paths = []
+        for name in ("a.jpg", "b.jpg"):
+            path = tmp_path / name
+            path.write_bytes(name.encode() * 100)
+            paths.append(str(path))
+        return paths
+    
+    @patch('services.telegram_service.requests.post')
+    def test_second_chat_sends_by_file_id(self, mock_post, telegram_service, images):
+        """Verifica che dopo il primo invio le immagini non vengano ricaricate"""
+        mock_post.return_value = media_group_response("ID_A", "ID_B")
+        
+        assert telegram_service.send_media_group("1", images) is True
+        assert telegram_service.send_media_group("2", images) is True
+        
+        first_call, second_call = mock_post.call_args_list
+        assert len(first_call[1]['files']) == 2
+        assert not second_call[1]['files']
+        media = json.loads(second_call[1]['data']['media'])
+        assert [m['media'] for m in media] == ["ID_A", "ID_B"]
+    
+    @patch('services.telegram_service.requests.post')
+    def test_file_ids_persist_across_instances(self, mock_post, images, tmp_path):
+        """Verifica che i file_id vengano riusati in esecuzioni successive"""
+        store = SQLiteCache(str(tmp_path / "file_ids.sqlite3"), table="file_ids")
+        mock_post.return_value = media_group_response("ID_A", "ID_B")
+        TelegramService(token="t", file_id_store=store).send_media_group("1", images)
+        
+        TelegramService(token="t", file_id_store=store).send_media_group("2", images)
+        
+        assert not mock_post.call_args_list[1][1]['files']
+        store.close()
+    
+    @patch('services.telegram_service.requests.post')
+    @patch('time.sleep')
+    def test_rejected_file_id_falls_back_to_upload(self, mock_sleep, mock_post, telegram_service, images):
+        """Verifica che un file_id rifiutato venga scartato e l'immagine ricaricata"""
+        telegram_service.file_ids = {
+            telegram_service._digest(images[0]): "STALE",
+            telegram_service._digest(images[1]): "STALE",
+        }
+        rejected = Mock(status_code=400, text="wrong file identifier")
+        mock_post.side_effect = [rejected, media_group_response("ID_A", "ID_B")]
+        
+        assert telegram_service.send_media_group("1", images) is True
+        
+        assert len(mock_post.call_args_list[1][1]['files']) == 2
+        assert telegram_service.file_ids[telegram_service._digest(images[0])] == "ID_A"
+    
+    @patch('services.telegram_service.requests.post')
+    @patch('time.sleep')
+    def test_blocked_chat_keeps_file_ids(self, mock_sleep, mock_post, images, tmp_path):
+        """Verifica che un 403 (bot bloccato) non cancelli i file_id e non venga ritentato"""
+        store = SQLiteCache(str(tmp_path / "file_ids.sqlite3"), table="file_ids")
+        mock_post.return_value = media_group_response("ID_A", "ID_B")
+        TelegramService(token="t", file_id_store=store).send_media_group("1", images)
+        
+        mock_post.reset_mock()
+        mock_post.return_value = Mock(status_code=403, text="Forbidden: bot was blocked by the user")
+        assert TelegramService(token="t", file_id_store=store).send_media_group("2", images) is False
+        
+        mock_post.assert_called_once()
+        assert len(store) == 2
+        store.close()
+    
+    @patch('services.telegram_service.requests.post')
+    @patch('time.sleep')
+    def test_other_bad_request_keeps_file_ids(self, mock_sleep, mock_post, telegram_service, images):
+        """Verifica che un 400 non legato ai file_id non li faccia dimenticare"""
+        digest = telegram_service._digest(images[0])
+        telegram_service.file_ids = {digest: "ID_A"}
+        mock_post.return_value = Mock(status_code=400, text="Bad Request: chat not found")
+        
+        assert telegram_service.send_media_group("1", images) is False
+        
+        assert telegram_service.file_ids == {digest: "ID_A"}
+
+
+class TestInMemoryImages:
+    """Test per l'invio di immagini già in memoria"""
+    
+    @pytest.fixture
+    def images(self):
+        """Due immagini JPEG finte in memoria"""
+        return [b"jpeg-a" * 100, b"jpeg-b" * 100]
+    
+    @patch('services.telegram_service.requests.post')
+    @patch('builtins.open')
+    def test_uploads_without_touching_disk(self, mock_file, mock_post, telegram_service, mock_response, images):
+        """Verifica che i buffer vengano caricati senza aprire file"""
+        mock_post.return_value = mock_response
+        
+        assert telegram_service.send_media_group("1", images) is True
+        
+        mock_file.assert_not_called()
+        files = mock_post.call_args[1]['files']
+        assert files["file0"][1] is images[0]
+        assert files["file1"][1] is images[1]
+    
+    @patch('services.telegram_service.requests.post')
+    def test_same_buffer_shared_across_chats(self, mock_post, telegram_service, mock_response, images):
+        """Verifica che lo stesso buffer venga riusato, senza copie, per ogni chat"""
+        mock_post.return_value = mock_response
+        
+        telegram_service.send_media_group("1", images)
+        telegram_service.send_media_group("2", images)
+        
+        first_call, second_call = mock_post.call_args_list
+        assert first_call[1]['files']["file0"][1] is second_call[1]['files']["file0"][1]
+    
+    @patch('services.telegram_service.requests.post')
+    def test_reuses_file_id_for_buffers(self, mock_post, telegram_service, images):
+        """Verifica il riuso dei file_id anche per le immagini in memoria"""
+        mock_post.return_value = media_group_response("ID_A", "ID_B")
+        
+        telegram_service.send_media_group("1", images)
+        telegram_service.send_media_group("2", images)
+        
+        assert not mock_post.call_args_list[1][1]['files']
+    
+    @patch('services.telegram_service.requests.post')
+    def test_upload_declares_image_format(self, mock_post, telegram_service, mock_response):
+        """Verifica nome file e tipo MIME coerenti con il formato dell'immagine"""
+        mock_post.return_value = mock_response
+        
+        telegram_service.send_media_group("1", [b"\x89PNG\r\n\x1a\n" + b"0" * 100])
+        
+        name, _, mime_type = mock_post.call_args[1]['files']["file0"]
+        assert name == "file0.png"
+        assert mime_type == "image/png"
+    
+    def test_digest_matches_file_content(self, telegram_service, images, tmp_path):
+        """Verifica che buffer e file con lo stesso contenuto abbiano la stessa impronta"""
+        path = tmp_path / "a.jpg"
+        path.write_bytes(images[0])
+        
+        assert telegram_service._digest(images[0]) == telegram_service._digest(str(path))
+
+
+class TestRateLimiting:
+    """Test per l'integrazione con il rate limiter"""
+    
+    @patch('services.telegram_service.requests.post')
+    @patch('builtins.open', new_callable=mock_open, read_data=b'test_data')
+    def test_acquires_before_each_request(self, mock_file, mock_post, mock_response):
+        """Verifica che ogni richiesta passi dal rate limiter, contando ogni foto dell'album"""
+        limiter = Mock()
+        service = TelegramService(token="t", rate_limiter=limiter)
+        mock_post.return_value = mock_response
+        
+        service.send_media_group("-100", [f"img{i}.jpg" for i in range(15)])
+        
+        assert [c.args for c in limiter.acquire.call_args_list] == [("-100", 10), ("-100", 5)]
+    
+    @patch('services.telegram_service.requests.post')
+    @patch('builtins.open', new_callable=mock_open, read_data=b'test_data')
+    @patch('time.sleep')
+    def test_retry_after_pauses_limiter(self, mock_sleep, mock_file, mock_post, mock_response):
+        """Verifica che il retry_after di Telegram sospenda tutti gli invii"""
+        limiter = Mock()
+        service = TelegramService(token="t", rate_limiter=limiter)
+        rate_limited = Mock(status_code=429)
+        rate_limited.json.return_value = {"parameters": {"retry_after": 12}}
+        mock_post.side_effect = [rate_limited, mock_response]
+        
+        assert service.send_media_group("1", ["img.jpg"]) is True
+        
+        limiter.backoff.assert_called_once_with(12)
+        mock_sleep.assert_called_once_with(12)
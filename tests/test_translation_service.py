@@ -0,0 +1,217 @@
+"""
+Test suite per services.translation_service e data.translation_cache
+"""
+import pytest
+from unittest.mock import Mock, AsyncMock
+from data.sqlite_cache import SQLiteCache
+from data.translation_cache import TranslationCache
+from services.translation_service import TranslationService
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Cache SQLite temporanea per le traduzioni"""
+    store = SQLiteCache(str(tmp_path / "translations.sqlite3"), table="translations")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def mock_translator():
+    """Mock del traduttore googletrans"""
+    translator = Mock()
+    translator.translate = AsyncMock(
+        side_effect=lambda text, dest: Mock(text=f"[{dest}] {text}")
+    )
+    return translator
+
+
+class TestTranslationCache:
+    """Test per TranslationCache"""
+
+    def test_normalizes_whitespace(self):
+        """Verifica che spazi e righe vuote non cambino la chiave"""
+        cache = TranslationCache()
+
+        assert cache.key("PASTA  AL\n\n POMODORO ", "en") == cache.key("PASTA AL\nPOMODORO", "en")
+
+    def test_key_depends_on_language(self):
+        """Verifica chiavi diverse per lingue diverse"""
+        cache = TranslationCache()
+
+        assert cache.key("PASTA", "en") != cache.key("PASTA", "fr")
+
+    def test_memory_hit(self):
+        """Verifica hit in memoria"""
+        cache = TranslationCache()
+        cache.set("PASTA", "en", "PASTA EN")
+
+        assert cache.get("PASTA", "en") == "PASTA EN"
+        assert cache.stats["memory_hits"] == 1
+
+    def test_disk_hit_after_restart(self, store):
+        """Verifica che una nuova istanza trovi le traduzioni su disco"""
+        TranslationCache(store).set("PASTA", "en", "PASTA EN")
+        cache = TranslationCache(store)
+
+        assert cache.get("PASTA", "en") == "PASTA EN"
+        assert cache.stats == {"hits": 1, "memory_hits": 0, "disk_hits": 1, "misses": 0}
+
+        # Dopo il primo accesso la voce è promossa in memoria
+        cache.get("PASTA", "en")
+        assert cache.stats["memory_hits"] == 1
+
+    def test_lru_evicts_least_recent(self):
+        """Verifica che la LRU scarti la voce usata meno di recente"""
+        cache = TranslationCache(max_size=2)
+        cache.set("A", "en", "a")
+        cache.set("B", "en", "b")
+        cache.get("A", "en")
+        cache.set("C", "en", "c")
+
+        assert cache.get("B", "en") is None
+        assert cache.get("A", "en") == "a"
+        assert cache.get("C", "en") == "c"
+
+    def test_counts_misses(self):
+        """Verifica conteggio dei miss"""
+        cache = TranslationCache()
+
+        assert cache.get("ASSENTE", "en") is None
+        assert cache.stats["misses"] == 1
+
+
+class TestTranslationService:
+    """Test per TranslationService"""
+
+    @pytest.mark.asyncio
+    async def test_translates_and_caches(self, mock_translator):
+        """Verifica che la seconda traduzione dello stesso testo non usi la rete"""
+        service = TranslationService(cache=TranslationCache(), translator=mock_translator)
+
+        async with service:
+            first = await service.translate("PASTA AL POMODORO", dest="en")
+            second = await service.translate("PASTA  AL POMODORO\n", dest="en")
+
+        assert first == second == "[en] PASTA AL POMODORO"
+        mock_translator.translate.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_uses_persisted_translations(self, store, mock_translator):
+        """Verifica che dopo un riavvio le traduzioni arrivino dal disco"""
+        TranslationCache(store).set("POLLO", "en", "CHICKEN")
+        service = TranslationService(cache=TranslationCache(store), translator=mock_translator)
+
+        async with service:
+            result = await service.translate("POLLO", dest="en")
+
+        assert result == "CHICKEN"
+        mock_translator.translate.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_disk_cache_accessed_in_batches(self, store, mock_translator):
+        """Verifica una lettura per livello e una sola scrittura su disco per chiamata, fuori dall'event loop"""
+        store = Mock(wraps=store)
+        service = TranslationService(cache=TranslationCache(store), translator=mock_translator)
+
+        async with service:
+            await service.translate_many(["PASTA\nPOLLO", "RISO\nPASTA", "PESCE"], dest="en")
+
+        assert store.get_many.call_count == 2
+        store.get.assert_not_called()
+        store.set_many.assert_called_once()
+        store.set.assert_not_called()
+        # 4 righe uniche + 3 testi, di cui "PESCE" coincide con la sua unica riga
+        assert len(store.set_many.call_args[0][0]) == 6
+
+    @pytest.mark.asyncio
+    async def test_requires_context_manager_on_miss(self):
+        """Verifica errore se usato fuori dal context manager"""
+        service = TranslationService(cache=TranslationCache(), translator=None)
+
+        with pytest.raises(RuntimeError):
+            await service.translate("PASTA")
+
+
+class TestBatchedTranslation:
+    """Test per TranslationService.translate_many"""
+
+    @pytest.mark.asyncio
+    async def test_single_request_for_all_texts(self, mock_translator):
+        """Verifica che più testi vengano tradotti con una sola richiesta"""
+        service = TranslationService(cache=TranslationCache(), translator=mock_translator)
+
+        async with service:
+            result = await service.translate_many(["PASTA\nPOLLO", "RISO"], dest="en")
+
+        mock_translator.translate.assert_awaited_once()
+        assert mock_translator.translate.await_args[0][0] == "PASTA\nPOLLO\nRISO"
+        assert result == ["[en] PASTA\nPOLLO", "RISO"]
+
+    @pytest.mark.asyncio
+    async def test_deduplicates_lines_across_texts(self):
+        """Verifica che le righe ripetute tra storie diverse vengano tradotte una volta"""
+        translator = Mock()
+        translator.translate = AsyncMock(
+            side_effect=lambda text, dest: Mock(text="\n".join(f"{line} EN" for line in text.split("\n")))
+        )
+        service = TranslationService(cache=TranslationCache(), translator=translator)
+
+        async with service:
+            result = await service.translate_many(["PRIMI\nPASTA", "PRIMI\nRISO"], dest="en")
+
+        assert translator.translate.await_args[0][0] == "PRIMI\nPASTA\nRISO"
+        assert result == ["PRIMI EN\nPASTA EN", "PRIMI EN\nRISO EN"]
+
+    @pytest.mark.asyncio
+    async def test_cached_lines_are_not_sent(self, mock_translator):
+        """Verifica che le righe già in cache non vengano ritradotte"""
+        cache = TranslationCache()
+        cache.set("PASTA", "en", "PASTA EN")
+        service = TranslationService(cache=cache, translator=mock_translator)
+
+        async with service:
+            result = await service.translate_many(["PASTA\nPOLLO"], dest="en")
+
+        assert mock_translator.translate.await_args[0][0] == "POLLO"
+        assert result == ["PASTA EN\n[en] POLLO"]
+
+    @pytest.mark.asyncio
+    async def test_preserves_blank_lines(self, mock_translator):
+        """Verifica che le righe vuote restino al loro posto"""
+        service = TranslationService(cache=TranslationCache(), translator=mock_translator)
+
+        async with service:
+            result = await service.translate("PRIMI\n\nSECONDI", dest="en")
+
+        assert result == "[en] PRIMI\n\nSECONDI"
+
+    @pytest.mark.asyncio
+    async def test_chunks_long_batches(self, mock_translator, monkeypatch):
+        """Verifica la suddivisione in blocchi rispettando il limite di caratteri"""
+        monkeypatch.setattr('services.translation_service.TRANSLATION_CHUNK_CHARS', 12)
+        service = TranslationService(cache=TranslationCache(), translator=mock_translator)
+
+        async with service:
+            await service.translate_many(["AAAAA\nBBBBB\nCCCCC"], dest="en")
+
+        chunks = [call[0][0] for call in mock_translator.translate.await_args_list]
+        assert chunks == ["AAAAA\nBBBBB", "CCCCC"]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_lines_misaligned(self):
+        """Verifica il ripiego riga per riga se il blocco tradotto ha un numero di righe diverso"""
+        def translate(text, dest):
+            if isinstance(text, list):
+                return [Mock(text=f"{line} EN") for line in text]
+            return Mock(text="TUTTO SU UNA RIGA")
+
+        translator = Mock()
+        translator.translate = AsyncMock(side_effect=translate)
+        service = TranslationService(cache=TranslationCache(), translator=translator)
+
+        async with service:
+            result = await service.translate("PASTA\nPOLLO", dest="en")
+
+        assert result == "PASTA EN\nPOLLO EN"
+        assert translator.translate.await_count == 2
@@ -2,12 +2,28 @@
 Utilities package
 """
 from .logger import setup_logger
-from .file_operations import save_bytes_to_file, clean_directory
-from .image_processing import create_long_image
+from .file_operations import (
+    save_bytes_to_file, read_bytes_from_file, clean_directory, hash_bytes, hash_file
+)
+from .image_processing import (
+    create_long_image, render_many, render_key, fits_combined_layout, encode_image, image_format
+)
+from .perceptual_hash import dhash, dhash_bytes, hamming_distance
 
 __all__ = [
     'setup_logger',
     'save_bytes_to_file',
+    'read_bytes_from_file',
     'clean_directory',
+    'hash_bytes',
+    'hash_file',
     'create_long_image',
+    'render_many',
+    'render_key',
+    'fits_combined_layout',
+    'encode_image',
+    'image_format',
+    'dhash',
+    'dhash_bytes',
+    'hamming_distance',
 ]
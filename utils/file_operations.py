@@ -2,6 +2,8 @@
 Utilities per operazioni su file
 """
 import os
+import time
+import hashlib
 from typing import List
 
 
@@ -17,7 +19,52 @@ def save_bytes_to_file(bts: bytes, path: str) -> None:
         f.write(bts)
 
 
-def clean_directory(directory: str, extensions: List[str] | None = None) -> int:
+def read_bytes_from_file(path: str) -> bytes:
+    """
+    Legge il contenuto binario di un file.
+    
+    Args:
+        path: Percorso del file
+    
+    Returns:
+        Contenuto del file
+    """
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def hash_bytes(bts: bytes) -> str:
+    """
+    Calcola l'impronta SHA-256 di un contenuto binario.
+    
+    Args:
+        bts: Contenuto binario
+    
+    Returns:
+        Digest esadecimale
+    """
+    return hashlib.sha256(bts).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """
+    Calcola l'impronta SHA-256 del contenuto di un file.
+    
+    Args:
+        path: Percorso del file
+    
+    Returns:
+        Digest esadecimale
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def clean_directory(
+    directory: str,
+    extensions: List[str] | None = None,
+    max_age: float | None = None
+) -> int:
     """
     Pulisce una directory rimuovendo tutti i file (opzionalmente filtrati per estensione).
     
@@ -25,6 +72,7 @@ def clean_directory(directory: str, extensions: List[str] | None = None) -> int:
         directory: Percorso della directory da pulire
         extensions: Lista di estensioni da rimuovere (es: ['.jpg', '.png']). 
                    Se None, rimuove tutti i file.
+        max_age: Se indicato, rimuove solo i file modificati da più di max_age secondi
     
     Returns:
         Numero di file rimossi
@@ -32,6 +80,7 @@ def clean_directory(directory: str, extensions: List[str] | None = None) -> int:
     if not os.path.exists(directory):
         return 0
     
+    now = time.time()
     count = 0
     for filename in os.listdir(directory):
         file_path = os.path.join(directory, filename)
@@ -42,6 +91,10 @@ def clean_directory(directory: str, extensions: List[str] | None = None) -> int:
         if extensions and not any(filename.endswith(ext) for ext in extensions):
             continue
         
+        # Filtra per età se specificato
+        if max_age is not None and now - os.path.getmtime(file_path) <= max_age:
+            continue
+        
         try:
             os.remove(file_path)
             count += 1
@@ -2,18 +2,118 @@
 Utilities per elaborazione immagini
 """
 import os
+import io
+import json
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
-from typing import Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional, Union
 from config.constants import (
     IMAGE_WIDTH, IMAGE_HEIGHT, MIN_FONT_SIZE, 
-    MAX_FONT_SIZE, BG_COLOR, TEXT_COLOR, IMAGE_MARGIN
+    MAX_FONT_SIZE, BG_COLOR, TEXT_COLOR, IMAGE_MARGIN, DIVIDER_WIDTH, RENDER_WORKERS,
+    RENDER_ENCODINGS, RENDER_ADAPTIVE_ENCODINGS, RENDER_BYTE_BUDGET, RENDER_MIN_QUALITY
 )
+from config.settings import RENDER_ENCODING
 try:
     import cairosvg
     SVG_SUPPORT = True
 except ImportError:
     SVG_SUPPORT = False
 
+# Font in grassetto provati in ordine; se nessuno è disponibile si usa il font di default di PIL
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "arialbd.ttf",
+)
+
+
+@lru_cache(maxsize=None)
+def _font_path() -> Optional[str]:
+    """Primo font di FONT_CANDIDATES caricabile, cercato una sola volta per processo"""
+    for path in FONT_CANDIDATES:
+        try:
+            ImageFont.truetype(path, MIN_FONT_SIZE)
+            return path
+        except OSError:
+            continue
+    return None
+
+
+# Font caricati, uno per thread: FreeType non consente di usare la stessa faccia da più thread
+_fonts = threading.local()
+
+
+def get_font(size: int) -> ImageFont.ImageFont:
+    """
+    Restituisce il font per una data dimensione, caricandolo da disco solo la prima volta.
+    
+    Args:
+        size: Dimensione del font
+    
+    Returns:
+        Font TrueType, o il font di default di PIL se nessun candidato è disponibile
+    """
+    fonts = getattr(_fonts, "by_size", None)
+    if fonts is None:
+        fonts = _fonts.by_size = {}
+    
+    font = fonts.get(size)
+    if font is None:
+        path = _font_path()
+        font = ImageFont.load_default() if path is None else ImageFont.truetype(path, size)
+        fonts[size] = font
+    return font
+
+
+@lru_cache(maxsize=1024)
+def measure_text(text: str, size: int) -> Tuple[int, int]:
+    """
+    Misura il testo multilinea centrato con il font della dimensione data.
+    
+    Args:
+        text: Testo da misurare
+        size: Dimensione del font
+    
+    Returns:
+        Tupla (larghezza, altezza) in pixel
+    """
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    bbox = draw.multiline_textbbox((0, 0), text, font=get_font(size), align="center")
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+def fit_font_size(text: str, max_width: int, max_height: int, min_font: int, max_font: int) -> int:
+    """
+    Cerca per bisezione la dimensione di font più grande con cui il testo entra nell'area.
+    
+    Args:
+        text: Testo da visualizzare
+        max_width: Larghezza disponibile
+        max_height: Altezza disponibile
+        min_font: Dimensione minima font
+        max_font: Dimensione massima font
+    
+    Returns:
+        Dimensione del font (min_font se il testo non entra nemmeno così)
+    """
+    if _font_path() is None:
+        # Il font di default ha dimensione fissa: non c'è niente da cercare
+        return min_font
+    
+    low, high, best = min_font, max_font, min_font
+    while low <= high:
+        size = (low + high) // 2
+        text_width, text_height = measure_text(text, size)
+        if text_width <= max_width and text_height <= max_height:
+            best, low = size, size + 1
+        else:
+            high = size - 1
+    return best
+
 
 def add_watermark(
     image: Image.Image,
@@ -57,7 +157,6 @@ def add_watermark(
             if watermark_image_path.lower().endswith('.svg'):
                 if SVG_SUPPORT:
                     # Converti SVG in PNG in memoria
-                    import io
                     png_data = cairosvg.svg2png(url=watermark_image_path)
                     if png_data:
                         logo = Image.open(io.BytesIO(png_data))
@@ -114,16 +213,7 @@ def add_watermark(
         draw = ImageDraw.Draw(watermark_layer)
         
         # Carica font per il watermark
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-        except:
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf", font_size)
-            except:
-                try:
-                    font = ImageFont.truetype("arialbd.ttf", font_size)
-                except:
-                    font = ImageFont.load_default()
+        font = get_font(font_size)
         
         # Calcola dimensioni del testo
         bbox = draw.textbbox((0, 0), watermark_text, font=font)
@@ -157,9 +247,402 @@ def add_watermark(
     return watermarked
 
 
+@lru_cache(maxsize=16)
+def _base_canvas(
+    width: int,
+    height: int,
+    bg_color: Tuple[int, int, int],
+    logo_text: Optional[str],
+    logo_image_path: Optional[str],
+    logo_mtime: Optional[float],
+    logo_position: str
+) -> Image.Image:
+    """Sfondo con il logo già composto; logo_mtime fa parte della chiave per accorgersi di un logo modificato"""
+    image = Image.new("RGB", (width, height), color=bg_color)
+    if logo_text or logo_image_path:
+        # Il fondo è opaco: dopo la composizione il canale alpha è pieno e si può scartare
+        image = add_watermark(
+            image,
+            watermark_text=logo_text,
+            watermark_image_path=logo_image_path,
+            position=logo_position
+        ).convert("RGB")
+    return image
+
+
+def base_canvas(
+    width: int,
+    height: int,
+    bg_color: Tuple[int, int, int],
+    logo_text: Optional[str] = None,
+    logo_image_path: Optional[str] = None,
+    logo_position: str = "bottom-right"
+) -> Image.Image:
+    """
+    Restituisce una copia dello sfondo con il logo, rasterizzato e composto una sola volta
+    per combinazione di dimensioni, colore e logo.
+    
+    Args:
+        width: Larghezza immagine
+        height: Altezza immagine
+        bg_color: Colore sfondo RGB
+        logo_text: Testo del logo (usato se logo_image_path è None)
+        logo_image_path: Percorso dell'immagine logo (ha priorità su logo_text)
+        logo_position: Posizione del logo
+    
+    Returns:
+        Immagine RGB su cui è possibile disegnare
+    """
+    logo_mtime = None
+    if logo_image_path and os.path.exists(logo_image_path):
+        logo_mtime = os.path.getmtime(logo_image_path)
+    return _base_canvas(
+        width, height, tuple(bg_color), logo_text, logo_image_path, logo_mtime, logo_position
+    ).copy()
+
+
+def _encode(image: Image.Image, options: Dict[str, Any]) -> bytes:
+    """Codifica l'immagine con le opzioni di una voce di RENDER_ENCODINGS"""
+    options = dict(options)
+    image_format = options.pop("format")
+    colors = options.pop("colors", None)
+    if colors:
+        image = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def encode_image(
+    image: Image.Image,
+    encoding: Optional[str] = None,
+    byte_budget: Optional[int] = None
+) -> bytes:
+    """
+    Codifica un'immagine creata. In modalità "adaptive" prova le codifiche di
+    RENDER_ADAPTIVE_ENCODINGS e tiene la più piccola; se nessuna rientra nel budget
+    abbassa la qualità JPEG fino a RENDER_MIN_QUALITY.
+    
+    Args:
+        image: Immagine RGB
+        encoding: Nome di una voce di RENDER_ENCODINGS o "adaptive" (default: RENDER_ENCODING)
+        byte_budget: Byte massimi in modalità "adaptive" (default: RENDER_BYTE_BUDGET)
+    
+    Returns:
+        Contenuto dell'immagine codificata
+    
+    Raises:
+        ValueError: Se la codifica non esiste
+    """
+    encoding = encoding or RENDER_ENCODING
+    if encoding != "adaptive":
+        if encoding not in RENDER_ENCODINGS:
+            raise ValueError(
+                f"Codifica sconosciuta: {encoding} (disponibili: {', '.join(RENDER_ENCODINGS)}, adaptive)"
+            )
+        return _encode(image, RENDER_ENCODINGS[encoding])
+    
+    byte_budget = byte_budget or RENDER_BYTE_BUDGET
+    best = min((_encode(image, RENDER_ENCODINGS[name]) for name in RENDER_ADAPTIVE_ENCODINGS), key=len)
+    quality = 75
+    while len(best) > byte_budget and quality >= RENDER_MIN_QUALITY:
+        data = _encode(image, {"format": "JPEG", "quality": quality, "optimize": True, "progressive": True})
+        best = min(best, data, key=len)
+        quality -= 5
+    return best
+
+
+def image_format(data: bytes) -> str:
+    """
+    Riconosce il formato di un'immagine codificata dai primi byte.
+    
+    Args:
+        data: Contenuto dell'immagine
+    
+    Returns:
+        Estensione del formato ("png", "webp" o "jpg")
+    """
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "jpg"
+
+
+def render_cache_key(text: str, **params: Any) -> str:
+    """
+    Calcola la chiave di cache di un'immagine: stesso testo e stessi parametri producono la stessa immagine.
+    Del logo su disco conta anche la data di modifica.
+    
+    Args:
+        text: Testo da visualizzare (già normalizzato)
+        **params: Parametri di rendering
+    
+    Returns:
+        Digest esadecimale
+    """
+    logo_path = params.get("logo_image_path")
+    if logo_path and os.path.exists(logo_path):
+        params["logo_mtime"] = os.path.getmtime(logo_path)
+    payload = json.dumps([text, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _render_params(
+    text: str,
+    translated_text: Optional[str],
+    add_logo: bool,
+    logo_text: Optional[str],
+    logo_image_path: Optional[str],
+    encoding: Optional[str] = None,
+    byte_budget: Optional[int] = None
+) -> Tuple[str, Optional[str], Optional[str], str, Optional[int]]:
+    """
+    Normalizza i parametri come li usa il disegno: testi in maiuscolo, logo di default,
+    codifica e budget risolti. Chiave di cache e immagine passano entrambe da qui.
+    
+    Returns:
+        Tupla (testo, traduzione, testo del logo, codifica, budget in byte)
+    """
+    text = text.strip().upper()
+    if translated_text is not None:
+        translated_text = translated_text.strip().upper()
+    if add_logo and not logo_image_path and not logo_text:
+        logo_text = "RUN POLITO MENSA"
+    encoding = encoding or RENDER_ENCODING
+    # Il budget conta solo per la codifica adattiva
+    byte_budget = (byte_budget or RENDER_BYTE_BUDGET) if encoding == "adaptive" else None
+    return text, translated_text, logo_text, encoding, byte_budget
+
+
+def render_key(
+    text: str,
+    width: int = IMAGE_WIDTH,
+    height: int = IMAGE_HEIGHT,
+    min_font: int = MIN_FONT_SIZE,
+    max_font: int = MAX_FONT_SIZE,
+    bg_color: Tuple[int, int, int] = BG_COLOR,
+    text_color: Tuple[int, int, int] = TEXT_COLOR,
+    margin: int = IMAGE_MARGIN,
+    add_logo: bool = True,
+    logo_text: Optional[str] = None,
+    logo_image_path: Optional[str] = None,
+    logo_position: str = "bottom-right",
+    encoding: Optional[str] = None,
+    byte_budget: Optional[int] = None,
+    translated_text: Optional[str] = None,
+    layout: str = "stacked"
+) -> str:
+    """
+    Chiave di cache dell'immagine che create_long_image produrrebbe con gli stessi parametri,
+    calcolata senza disegnarla. I parametri sono quelli di create_long_image.
+    
+    Returns:
+        Digest esadecimale
+    """
+    text, translated_text, logo_text, encoding, byte_budget = _render_params(
+        text, translated_text, add_logo, logo_text, logo_image_path, encoding, byte_budget
+    )
+    # Le immagini combinate hanno chiavi proprie; quelle singole restano come prima
+    combined = {} if translated_text is None else {"translated_text": translated_text, "layout": layout}
+    return render_cache_key(
+        text, width=width, height=height, min_font=min_font, max_font=max_font,
+        bg_color=bg_color, text_color=text_color, margin=margin, add_logo=add_logo,
+        logo_text=logo_text, logo_image_path=logo_image_path, logo_position=logo_position,
+        encoding=encoding, byte_budget=byte_budget, **combined
+    )
+
+
+def _wrap_text(text: str, font_size: int, max_width: int) -> str:
+    """Va a capo tra le parole nelle righe più larghe di max_width (una parola troppo lunga resta intera)"""
+    lines = []
+    for line in text.split("\n"):
+        current = ""
+        for word in line.split(" "):
+            candidate = f"{current} {word}" if current else word
+            if current and measure_text(candidate, font_size)[0] > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        lines.append(current)
+    return "\n".join(lines)
+
+
+def _draw_text_block(
+    draw: ImageDraw.ImageDraw,
+    text: str,
+    box: Tuple[int, int, int, int],
+    font_size: int,
+    text_color: Tuple[int, int, int]
+) -> None:
+    """Disegna il testo centrato nel riquadro (left, top, right, bottom)"""
+    left, top, right, bottom = box
+    text_width, text_height = measure_text(text, font_size)
+    x = left + (right - left - text_width) // 2
+    y = top + (bottom - top - text_height) // 2
+    draw.multiline_text((x, y), text, fill=text_color, font=get_font(font_size), align="center")
+
+
+def render_text_image(
+    text: str,
+    width: int = IMAGE_WIDTH,
+    height: int = IMAGE_HEIGHT,
+    min_font: int = MIN_FONT_SIZE,
+    max_font: int = MAX_FONT_SIZE,
+    bg_color: Tuple[int, int, int] = BG_COLOR,
+    text_color: Tuple[int, int, int] = TEXT_COLOR,
+    margin: int = IMAGE_MARGIN,
+    add_logo: bool = True,
+    logo_text: Optional[str] = None,
+    logo_image_path: Optional[str] = None,
+    logo_position: str = "bottom-right",
+    translated_text: Optional[str] = None,
+    layout: str = "stacked"
+) -> Image.Image:
+    """
+    Disegna il testo centrato sullo sfondo con il logo, senza codificare l'immagine.
+    I parametri sono quelli di create_long_image.
+    
+    Returns:
+        Immagine RGB
+    
+    Raises:
+        ValueError: Se l'impaginazione combinata non esiste
+    """
+    text, translated_text, logo_text, _, _ = _render_params(
+        text, translated_text, add_logo, logo_text, logo_image_path
+    )
+    
+    # Sfondo + logo già composti: resta solo da disegnare il testo
+    image = base_canvas(
+        width, height, bg_color,
+        logo_text=logo_text if add_logo else None,
+        logo_image_path=logo_image_path if add_logo else None,
+        logo_position=logo_position
+    )
+    draw = ImageDraw.Draw(image)
+    
+    # Spazio riservato al logo in fondo all'immagine
+    logo_space = 60 if add_logo else 0
+    
+    if translated_text is None:
+        # Trova la dimensione font ottimale per l'area disponibile (con margini + spazio per logo)
+        font_size = fit_font_size(
+            text, width - (margin * 2), height - (margin * 2) - logo_space, min_font, max_font
+        )
+        _draw_text_block(draw, text, (0, 0, width, height), font_size, text_color)
+        return image
+    
+    # Originale e traduzione nella stessa immagine, separati da una linea
+    plan = _plan_combined(
+        text, translated_text, layout, width, height, min_font, max_font, margin, logo_space
+    )
+    if plan is None:
+        raise ValueError(f"Testo troppo lungo per l'impaginazione {layout}: usare immagini separate")
+    
+    font_size, blocks, boxes, divider = plan
+    for block, box in zip(blocks, boxes):
+        _draw_text_block(draw, block, box, font_size, text_color)
+    draw.line(divider, fill=text_color, width=DIVIDER_WIDTH)
+    return image
+
+
+def _plan_combined(
+    text: str,
+    translated_text: str,
+    layout: str,
+    width: int,
+    height: int,
+    min_font: int,
+    max_font: int,
+    margin: int,
+    logo_space: int
+) -> Optional[Tuple[int, List[str], List[Tuple[int, int, int, int]], List[Tuple[int, int]]]]:
+    """
+    Impagina testo e traduzione (già normalizzati) nelle due metà dell'immagine.
+    
+    Returns:
+        Tupla (dimensione font, testi andati a capo, riquadri, estremi della linea divisoria),
+        None se i testi non entrano nemmeno con il font minimo
+    
+    Raises:
+        ValueError: Se l'impaginazione non esiste
+    """
+    if layout == "stacked":
+        middle = height // 2
+        boxes = [(0, 0, width, middle), (0, middle, width, height - logo_space)]
+        divider = [(margin, middle), (width - margin, middle)]
+    elif layout == "split":
+        middle = width // 2
+        boxes = [(0, 0, middle, height - logo_space), (middle, 0, width, height - logo_space)]
+        divider = [(middle, margin), (middle, height - margin - logo_space)]
+    else:
+        raise ValueError(f"Impaginazione sconosciuta: {layout} (disponibili: stacked, split)")
+    
+    def layout_at(size: int) -> Optional[List[str]]:
+        """Testi andati a capo con il font dato, None se uno dei due esce dalla sua metà"""
+        blocks = []
+        for block, (left, top, right, bottom) in zip((text, translated_text), boxes):
+            # Le metà sono strette: le righe lunghe vanno a capo e l'altezza si misura dopo
+            block = _wrap_text(block, size, right - left - (margin * 2))
+            block_width, block_height = measure_text(block, size)
+            if block_width > right - left - (margin * 2) or block_height > bottom - top - (margin * 2):
+                return None
+            blocks.append(block)
+        return blocks
+    
+    # Stessa dimensione di font per le due metà, la più grande che va bene per entrambe
+    low, high, best = min_font, max_font, None
+    while low <= high:
+        size = (low + high) // 2
+        blocks = layout_at(size)
+        if blocks is not None:
+            best, low = (size, blocks), size + 1
+        else:
+            high = size - 1
+    if best is None:
+        return None
+    return best[0], best[1], boxes, divider
+
+
+def fits_combined_layout(
+    text: str,
+    translated_text: str,
+    layout: str = "stacked",
+    width: int = IMAGE_WIDTH,
+    height: int = IMAGE_HEIGHT,
+    min_font: int = MIN_FONT_SIZE,
+    max_font: int = MAX_FONT_SIZE,
+    margin: int = IMAGE_MARGIN,
+    add_logo: bool = True
+) -> bool:
+    """
+    Verifica se testo e traduzione entrano in un'unica immagine con l'impaginazione data.
+    
+    Args:
+        text: Testo originale
+        translated_text: Testo tradotto
+        layout: "stacked" o "split"
+        width: Larghezza immagine
+        height: Altezza immagine
+        min_font: Dimensione minima font
+        max_font: Dimensione massima font
+        margin: Margine dai bordi in pixel
+        add_logo: Se True, riserva lo spazio per il logo
+    
+    Returns:
+        False se servono due immagini separate
+    """
+    text, translated_text, _, _, _ = _render_params(text, translated_text, add_logo, None, None)
+    return _plan_combined(
+        text, translated_text, layout, width, height, min_font, max_font, margin, 60 if add_logo else 0
+    ) is not None
+
+
 def create_long_image(
     text: str, 
-    output_path: str, 
+    output_path: Optional[str] = None, 
     width: int = IMAGE_WIDTH,
     height: int = IMAGE_HEIGHT,
     min_font: int = MIN_FONT_SIZE,
@@ -170,15 +653,20 @@ def create_long_image(
     add_logo: bool = True,
     logo_text: Optional[str] = None,
     logo_image_path: Optional[str] = None,
-    logo_position: str = "bottom-right"
-) -> str:
+    logo_position: str = "bottom-right",
+    cache: Optional[Any] = None,
+    encoding: Optional[str] = None,
+    byte_budget: Optional[int] = None,
+    translated_text: Optional[str] = None,
+    layout: str = "stacked"
+) -> Union[str, bytes]:
     """
     Crea un'immagine verticale con testo centrato, adattando automaticamente
     la dimensione del font per far entrare tutto il contenuto con margini adeguati.
     
     Args:
         text: Testo da visualizzare
-        output_path: Percorso del file di output
+        output_path: Percorso del file di output (None = restituisce l'immagine codificata in memoria)
         width: Larghezza immagine (default: 1080)
         height: Altezza immagine (default: 1920)
         min_font: Dimensione minima font
@@ -190,80 +678,92 @@ def create_long_image(
         logo_text: Testo del logo (usato se logo_image_path è None)
         logo_image_path: Percorso dell'immagine logo (ha priorità su logo_text)
         logo_position: Posizione del logo ("top-left", "top-right", "bottom-left", "bottom-right")
+        cache: Cache di rendering (data.render_cache.RenderCache) da cui riusare un'immagine identica
+        encoding: Codifica dell'immagine, vedi encode_image (default: RENDER_ENCODING)
+        byte_budget: Byte massimi per la codifica "adaptive" (default: RENDER_BYTE_BUDGET)
+        translated_text: Traduzione da impaginare nella stessa immagine del testo (None = solo testo)
+        layout: Impaginazione di testo e traduzione: "stacked" (uno sopra l'altra) o "split" (affiancati)
     
     Returns:
-        Percorso del file salvato
-    """
-    text = text.strip().upper()
-    
-    # Crea immagine
-    image = Image.new("RGB", (width, height), color=bg_color)
-    draw = ImageDraw.Draw(image)
+        Percorso del file salvato, o il contenuto codificato se output_path è None
     
-    # Area disponibile per il testo (con margini + spazio per logo)
-    logo_space = 60 if add_logo else 0
-    available_width = width - (margin * 2)
-    available_height = height - (margin * 2) - logo_space
+    Raises:
+        ValueError: Se la codifica o l'impaginazione non esistono
+    """
+    text, translated_text, logo_text, encoding, byte_budget = _render_params(
+        text, translated_text, add_logo, logo_text, logo_image_path, encoding, byte_budget
+    )
     
-    # Trova la dimensione font ottimale
-    current_font_size = max_font
-    font = None
+    key = None
+    if cache is not None:
+        key = render_key(
+            text, width, height, min_font, max_font, bg_color, text_color, margin, add_logo,
+            logo_text, logo_image_path, logo_position, encoding, byte_budget, translated_text, layout
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            if output_path is None:
+                with open(cached, "rb") as f:
+                    return f.read()
+            shutil.copyfile(cached, output_path)
+            return output_path
     
-    while current_font_size >= min_font:
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", current_font_size)
-        except:
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf", current_font_size)
-            except:
-                try:
-                    font = ImageFont.truetype("arialbd.ttf", current_font_size)
-                except:
-                    font = ImageFont.load_default()
-                    break
-        
-        # Calcola dimensioni del testo con questo font
-        bbox = draw.multiline_textbbox((0, 0), text, font=font, align="center")
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        # Verifica se il testo entra nell'area disponibile
-        if text_width <= available_width and text_height <= available_height:
-            break
-        
-        # Riduci font size
-        current_font_size -= 2
+    image = render_text_image(
+        text, width, height, min_font, max_font, bg_color, text_color, margin,
+        add_logo, logo_text, logo_image_path, logo_position, translated_text, layout
+    )
     
-    # Calcola dimensioni finali del testo
-    bbox = draw.multiline_textbbox((0, 0), text, font=font, align="center")
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
+    # Codifica e salva immagine (su disco o in memoria)
+    data = encode_image(image, encoding, byte_budget)
+    if key is not None:
+        cache.put(key, data)
+    if output_path is None:
+        return data
     
-    # Centra il testo nell'immagine
-    x = (width - text_width) // 2
-    y = (height - text_height) // 2
+    with open(output_path, "wb") as f:
+        f.write(data)
+    return output_path
+
+
+_render_executor: Optional[ThreadPoolExecutor] = None
+_render_executor_lock = threading.Lock()
+
+
+def _get_render_executor() -> ThreadPoolExecutor:
+    """Pool di thread condiviso per il rendering, creato alla prima richiesta"""
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is None:
+            _render_executor = ThreadPoolExecutor(
+                max_workers=RENDER_WORKERS or os.cpu_count() or 1,
+                thread_name_prefix="render"
+            )
+        return _render_executor
+
+
+def render_many(jobs: List[Dict[str, Any]], **common: Any) -> List[Union[str, bytes]]:
+    """
+    Crea più immagini in parallelo su un pool di thread: Pillow rilascia il GIL
+    durante disegno e codifica JPEG. Sfondo, logo e misure del testo sono condivisi tra i job.
     
-    draw.multiline_text((x, y), text, fill=text_color, font=font, align="center")
+    Args:
+        jobs: Parametri di create_long_image per ogni immagine (almeno text)
+        **common: Parametri comuni a tutti i job (sovrascritti da quelli del singolo job)
     
-    # Aggiungi watermark/logo se richiesto
-    if add_logo:
-        # Se non è specificato né logo_image_path né logo_text, usa default
-        if not logo_image_path and not logo_text:
-            logo_text = "RUN POLITO MENSA"
-        
-        image = add_watermark(
-            image, 
-            watermark_text=logo_text, 
-            watermark_image_path=logo_image_path,
-            position=logo_position
-        )
+    Returns:
+        Percorsi dei file salvati (o contenuti codificati per i job senza output_path),
+        nello stesso ordine di `jobs`
     
-    # Converti in RGB se necessario (per salvare come JPEG)
-    if image.mode == 'RGBA':
-        rgb_image = Image.new('RGB', image.size, bg_color)
-        rgb_image.paste(image, mask=image.split()[3])  # Usa il canale alpha come maschera
-        image = rgb_image
+    Raises:
+        Exception: La prima eccezione sollevata da un job, dopo aver atteso tutti gli altri
+    """
+    if len(jobs) <= 1:
+        return [create_long_image(**{**common, **job}) for job in jobs]
     
-    # Salva immagine
-    image.save(output_path, "JPEG", quality=95)
-    return output_path
\ No newline at end of file
+    executor = _get_render_executor()
+    futures = [executor.submit(create_long_image, **{**common, **job}) for job in jobs]
+    errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
@@ -0,0 +1,60 @@
+"""
+Impronte percettive (dHash) per riconoscere storie quasi identiche
+"""
+import cv2
+import numpy as np
+
+from config import DEDUP_HASH_SIZE
+
+
+def dhash(image: np.ndarray, size: int = DEDUP_HASH_SIZE) -> str:
+    """
+    Calcola il difference hash di un'immagine: per ogni cella di una griglia size×size
+    registra se è più chiara della cella alla sua destra.
+
+    Args:
+        image: Immagine BGR o in scala di grigi
+        size: Lato della griglia (l'impronta ha size² bit)
+
+    Returns:
+        Impronta esadecimale
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return np.packbits(bits.flatten()).tobytes().hex()
+
+
+def dhash_bytes(bts: bytes, size: int = DEDUP_HASH_SIZE) -> str:
+    """
+    Calcola il difference hash di un'immagine codificata (JPEG/PNG).
+    La decodifica avviene già ridotta e in scala di grigi, l'impronta non richiede di più.
+
+    Args:
+        bts: Contenuto dell'immagine
+        size: Lato della griglia
+
+    Returns:
+        Impronta esadecimale
+
+    Raises:
+        ValueError: Se il contenuto non è un'immagine valida
+    """
+    image = cv2.imdecode(np.frombuffer(bts, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        raise ValueError("Immagine non valida")
+    return dhash(image, size)
+
+
+def hamming_distance(first: str, second: str) -> int:
+    """
+    Numero di bit diversi tra due impronte della stessa dimensione.
+
+    Args:
+        first: Impronta esadecimale
+        second: Impronta esadecimale
+
+    Returns:
+        Distanza di Hamming
+    """
+    return (int(first, 16) ^ int(second, 16)).bit_count()
@@ -0,0 +1,144 @@
+"""
+Rate limiting a token bucket per le API Telegram
+"""
+import time
+import threading
+from typing import Callable, Dict, Optional, Union
+from config.constants import TELEGRAM_GLOBAL_RATE, TELEGRAM_GROUP_RATE, TELEGRAM_PRIVATE_RATE
+
+
+class TokenBucket:
+    """Token bucket thread-safe: ogni acquire consuma `count` token, ricaricati a `rate` token/s"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            rate: Token ricaricati al secondo
+            capacity: Token massimi accumulabili (default: max(1, rate))
+            clock: Orologio monotono (sostituibile nei test)
+            sleep: Funzione di attesa (sostituibile nei test)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, count: int = 1) -> float:
+        """
+        Prenota `count` token senza attendere. Oltre la capacità il bucket va in debito:
+        la richiesta parte appena il bucket è pieno e le successive aspettano il recupero.
+
+        Args:
+            count: Token da consumare (es. foto di un album)
+
+        Returns:
+            Secondi da attendere prima di poter usare i token prenotati
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            needed = min(count, self.capacity)
+            wait = (needed - self._tokens) / self.rate if self._tokens < needed else 0.0
+            self._tokens -= count
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self, count: int = 1) -> float:
+        """
+        Attende finché non sono disponibili `count` token.
+
+        Args:
+            count: Token da consumare
+
+        Returns:
+            Secondi effettivamente attesi
+        """
+        wait = self.reserve(count)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Blocca il bucket per `seconds` secondi (es. dopo un 429 con retry_after).
+
+        Args:
+            seconds: Durata del blocco
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+
+class TelegramRateLimiter:
+    """Applica i limiti Telegram: globale per bot e per singola chat (gruppi più restrittivi)"""
+
+    def __init__(
+        self,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        group_rate: float = TELEGRAM_GROUP_RATE,
+        private_rate: float = TELEGRAM_PRIVATE_RATE,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            global_rate: Messaggi al secondo per l'intero bot
+            group_rate: Messaggi al secondo per singolo gruppo
+            private_rate: Messaggi al secondo per singola chat privata
+            clock: Orologio monotono (sostituibile nei test)
+            sleep: Funzione di attesa (sostituibile nei test)
+        """
+        self.group_rate = group_rate
+        self.private_rate = private_rate
+        self._clock = clock
+        self._sleep = sleep
+        self.global_bucket = TokenBucket(global_rate, clock=clock, sleep=sleep)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_group(chat_id: Union[int, str]) -> bool:
+        """I gruppi e i canali Telegram hanno chat_id negativi"""
+        return str(chat_id).startswith("-")
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        key = str(chat_id)
+        with self._lock:
+            if key not in self._chat_buckets:
+                rate = self.group_rate if self.is_group(chat_id) else self.private_rate
+                # Capacità 1: niente raffiche verso la stessa chat
+                self._chat_buckets[key] = TokenBucket(rate, capacity=1, clock=self._clock, sleep=self._sleep)
+            return self._chat_buckets[key]
+
+    def acquire(self, chat_id: Union[int, str], count: int = 1) -> float:
+        """
+        Attende il permesso di inviare `count` messaggi alla chat indicata.
+        Telegram conta ogni elemento di un album come un messaggio.
+
+        Args:
+            chat_id: Chat destinataria
+            count: Messaggi inviati con la richiesta (elementi del media group)
+
+        Returns:
+            Secondi complessivamente attesi
+        """
+        return self._chat_bucket(chat_id).acquire(count) + self.global_bucket.acquire(count)
+
+    def backoff(self, seconds: float) -> None:
+        """
+        Sospende tutti gli invii dopo un 429 di Telegram.
+
+        Args:
+            seconds: retry_after indicato da Telegram
+        """
+        self.global_bucket.pause(seconds)